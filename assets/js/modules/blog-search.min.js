@@ -0,0 +1,7 @@
+import{fetchJson}from'/assets/js/modules/shared.min.js';const blogSearch=(()=>{const PREFIX_LENGTH=2;const STOP_WORDS=new Set(['a','an','and','are','as','at','be','but','by','for','from','has','have','i','if','in','into','is','it','its','of','on','or','so','that','the','their','then','there','these','this','to','was','we','were','will','with','you']);const STEM_SUFFIXES=[['ational','ate'],['ization','ize'],['fulness','ful'],['iveness','ive'],['ousness','ous'],['ations','ate'],['ation','ate'],['ments',''],['ment',''],['ness',''],['ingly',''],['ings',''],['ing',''],['edly',''],['ies','y'],['ied','y'],['ed',''],['ly',''],['s','']];const stem=(word)=>{if(word.length<=3||/^\d+$/.test(word))return word;for(const[suffix,replacement]of STEM_SUFFIXES){if(word.endsWith(suffix)&&word.length-suffix.length>=3){if(suffix==='s'&&/(ss|us|is)$/.test(word))return word;return word.slice(0,-suffix.length)+replacement;}}
+return word;};const completes=(word,key)=>key.startsWith(word)||STEM_SUFFIXES.some(([suffix,replacement])=>{const base=key.slice(0,key.length-replacement.length);return key.endsWith(replacement)&&word.length>base.length&&word.startsWith(base)&&suffix.startsWith(word.slice(base.length));});const words=(text)=>(text.toLowerCase().match(/[a-z0-9]+/g)||[]).filter(word=>word.length>=PREFIX_LENGTH&&!STOP_WORDS.has(word));let docsRequest=null;const shardRequests=new Map();const loadDocs=()=>{if(!docsRequest)docsRequest=fetchJson('/assets/data/search/docs.json');return docsRequest;};const loadShard=(prefix)=>{if(!shardRequests.has(prefix)){shardRequests.set(prefix,fetchJson(`/assets/data/search/${prefix}.json`));}
+return shardRequests.get(prefix);};const search=async(query)=>{const queryWords=words(query);if(!queryWords.length)return[];const{shards,docs}=await loadDocs();const available=new Set(shards);let scores=null;for(const[index,word]of queryWords.entries()){const term=stem(word);const isLast=index===queryWords.length-1;const prefix=word.slice(0,PREFIX_LENGTH);const shard=available.has(prefix)?await loadShard(prefix):{};const matches=new Map();for(const[key,postings]of Object.entries(shard)){if(key!==term&&!(isLast&&completes(word,key)))continue;let docId=0;for(let i=0;i<postings.length;i+=2){docId+=postings[i];matches.set(docId,Math.max(matches.get(docId)||0,postings[i+1]));}}
+scores=scores===null?matches:new Map([...scores].filter(([docId])=>matches.has(docId)).map(([docId,score])=>[docId,score+matches.get(docId)]));if(!scores.size)break;}
+return[...scores].sort((a,b)=>b[1]-a[1]||a[0]-b[0]).map(([docId])=>docs[docId]).filter(Boolean);};return{search};})();export const init=(input)=>{const list=document.querySelector('[data-blog-list]');const results=document.querySelector('[data-blog-search-results]');const emptyMessage=document.querySelector('[data-blog-search-empty]');if(!list||!results||!emptyMessage)return;const resultsList=results.querySelector('ul');let debounceTimer;let latestQuery=0;const renderResults=(docs)=>{resultsList.innerHTML='';docs.forEach(([slug,title,date])=>{const li=document.createElement('li');li.className='pf-v6-c-simple-list__item';const link=document.createElement('a');link.className='pf-v6-c-simple-list__item-link';link.href=`/blogs/${slug}/`;const content=document.createElement('div');content.className='pf-v6-c-simple-list__item-content';const titleSpan=document.createElement('span');titleSpan.className='pf-v6-c-simple-list__item-title';titleSpan.textContent=title;content.appendChild(titleSpan);link.appendChild(content);if(date){const dateSpan=document.createElement('span');dateSpan.className='pf-v6-c-simple-list__item-date';dateSpan.textContent=date;link.appendChild(dateSpan);}
+li.appendChild(link);resultsList.appendChild(li);});};input.addEventListener('input',()=>{clearTimeout(debounceTimer);debounceTimer=setTimeout(async()=>{const query=input.value.trim();const queryId=++latestQuery;if(!query){list.hidden=false;results.hidden=true;emptyMessage.hidden=true;return;}
+try{const docs=await blogSearch.search(query);if(queryId!==latestQuery)return;renderResults(docs);list.hidden=true;results.hidden=docs.length===0;emptyMessage.hidden=docs.length>0;}catch(error){console.error('Error searching blogs:',error);}},150);});};
\ No newline at end of file
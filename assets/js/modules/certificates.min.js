@@ -0,0 +1,5 @@
+import{fetchJson,initTiltEffect,showSkeleton}from'/assets/js/modules/shared.min.js';export const init=(certificatesGrid)=>{if(certificatesGrid.hasAttribute('data-prerendered')){setTimeout(initTiltEffect,500);return;}
+showSkeleton(certificatesGrid,6,'200px');fetchJson('/assets/data/certificates.json').then(data=>{certificatesGrid.innerHTML='';data.forEach((cert,index)=>{const certificateItem=document.createElement('div');certificateItem.className='certificate-item fade-in-up';certificateItem.style.animationDelay=`${index*0.05}s`;certificateItem.innerHTML=`<a href="${cert.url}"target="_blank"rel="noopener noreferrer"><img
+src="${cert.image}"
+alt="${cert.title}"
+loading="lazy"></a><div class="certificate-content"><h3 class="h4 certificate-title">${cert.title}</h3><p class="certificate-issuer">${cert.issuer}</p><time class="certificate-date">${cert.date}</time></div>`;certificatesGrid.appendChild(certificateItem);});setTimeout(initTiltEffect,500);}).catch(error=>console.error('Error fetching certificates data:',error));};
\ No newline at end of file
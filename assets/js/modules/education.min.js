@@ -0,0 +1 @@
+import{fetchJson,showSkeleton}from'/assets/js/modules/shared.min.js';export const init=(educationList)=>{showSkeleton(educationList,3,'80px');fetchJson('/assets/data/education.json').then(data=>{educationList.innerHTML='';data.forEach((edu,index)=>{const item=document.createElement('li');item.className='timeline-item fade-in-up';item.style.animationDelay=`${index*0.1}s`;item.innerHTML=`<h4 class="h4 timeline-item-title">${edu.institution}</h4><span>${edu.duration}</span><p class="timeline-text">${edu.description}</p>`;educationList.appendChild(item);});}).catch(error=>console.error('Error fetching education data:',error));};
\ No newline at end of file
@@ -0,0 +1,2 @@
+import{fetchJson,initializeProjectFilter,initTiltEffect}from'/assets/js/modules/shared.min.js';export const init=(eventsList)=>{if(eventsList.hasAttribute('data-prerendered')){initializeProjectFilter();setTimeout(initTiltEffect,500);return;}
+fetchJson('/assets/data/events.json').then(data=>{data.forEach((event,index)=>{const item=document.createElement('li');item.className='event-post-item active fade-in-up';item.style.animationDelay=`${index*0.1}s`;item.setAttribute("data-filter-item","");item.setAttribute("data-category",event.type?event.type.toLowerCase():"organized");item.innerHTML=`<a href="${event.url}"><figure class="event-banner-box"><img src="${event.image}"alt="${event.title}"loading="lazy"></figure><div class="event-content"><div class="event-meta"><p class="event-category">${event.category}</p><span class="dot"></span><time datetime="${event.date}">${event.formattedDate}</time></div><h3 class="h3 event-item-title">${event.title}</h3><p class="event-text">${event.description}</p></div></a>`;eventsList.appendChild(item);});initializeProjectFilter();setTimeout(initTiltEffect,500);}).catch(error=>console.error('Error fetching events data:',error));};
\ No newline at end of file
@@ -0,0 +1 @@
+import{fetchJson}from'/assets/js/modules/shared.min.js';export const init=(experienceList)=>{fetchJson('/assets/data/experience.json').then(data=>{data.forEach((exp,index)=>{const item=document.createElement('li');item.className='timeline-item fade-in-up';item.style.animationDelay=`${index*0.1}s`;item.innerHTML=`<h4 class="h4 timeline-item-title">${exp.role}</h4><span>${exp.date}</span><p class="timeline-text">${exp.description}</p>`;experienceList.appendChild(item);});}).catch(error=>console.error('Error fetching experience data:',error));};
\ No newline at end of file
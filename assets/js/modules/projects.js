@@ -0,0 +1,125 @@
+// Project list: relative dates, filters and tilt, plus the cards when they were not prerendered.
+
+import { initializeProjectFilter, initTiltEffect, showSkeleton } from '/assets/js/modules/shared.js';
+
+// Helper function to calculate relative time
+const timeAgo = (dateString) => {
+  if (!dateString) return '';
+  const diff = (new Date() - new Date(dateString)) / 1000;
+  if (diff < 60) return 'just now';
+  const units = [['year', 31536000], ['month', 2592000], ['day', 86400], ['hour', 3600], ['minute', 60]];
+  const [unit, secs] = units.find(([, s]) => diff >= s);
+  return new Intl.RelativeTimeFormat('en', { numeric: 'auto' }).format(-Math.floor(diff / secs), unit);
+};
+
+/**
+ * Populates the project list by combining data from local JSON files.
+ */
+export const init = async (projectList) => {
+  if (projectList.hasAttribute('data-prerendered')) {
+    // Cards are built at deploy time, only the relative dates depend on the visit
+    projectList.querySelectorAll('time[data-time-ago]').forEach(time => {
+      time.textContent = timeAgo(time.getAttribute('datetime'));
+    });
+    initializeProjectFilter();
+    setTimeout(initTiltEffect, 500);
+    return;
+  }
+
+  showSkeleton(projectList, 4, '150px');
+
+  try {
+    const [projectsResponse, updatesResponse] = await Promise.all([
+      fetch("/assets/data/projects.json"),
+      fetch("/assets/data/last_updated.json")
+    ]);
+
+    if (!projectsResponse.ok) {
+      throw new Error(`Failed to load projects.json: ${projectsResponse.statusText}`);
+    }
+
+    const projects = await projectsResponse.json();
+    const updates = updatesResponse.ok ? await updatesResponse.json() : {};
+
+    const projectsWithUpdates = projects.map(project => {
+      const lastUpdated = project.github ? updates[project.github] : null;
+      return { ...project, updated_at: lastUpdated };
+    });
+
+    projectsWithUpdates.sort((a, b) => {
+      if (a.updated_at && b.updated_at) {
+        return new Date(b.updated_at) - new Date(a.updated_at);
+      }
+      if (a.updated_at) return -1;
+      if (b.updated_at) return 1;
+      return 0;
+    });
+
+    projectList.innerHTML = ''; // Clear skeletons
+    projectsWithUpdates.forEach((project, index) => {
+      const li = document.createElement("li");
+      li.className = `project-item active fade-in-up ${index === 0 ? 'featured' : ''}`;
+      li.style.animationDelay = `${index * 0.1}s`;
+      li.setAttribute("data-filter-item", "");
+      li.setAttribute("data-category", project.category.toLowerCase());
+
+      const tagsHtml = project.tags
+        .map((tag) => `<span class="tag">${tag}</span>`)
+        .join("");
+
+      const updatedHtml = project.updated_at
+        ? '<p class="project-category">Last updated: ' + timeAgo(project.updated_at) + '</p>'
+        : "";
+
+      li.innerHTML = `
+              <a href="${project.url}" target="_blank" rel="noopener noreferrer" style="display: block; height: 100%;">
+                  <figure class="project-img">
+                      <div class="project-item-icon-box">
+                          <ion-icon name="eye-outline"></ion-icon>
+                      </div>
+                      <img src="${project.image}" alt="${project.alt}" loading="lazy">
+                  </figure>
+                  <div class="project-info">
+                      <h3 class="project-title">${project.title}</h3>
+                      <p class="project-category">${project.category_desc}</p>
+                      ${updatedHtml}
+                      <div class="project-tags">${tagsHtml}</div>
+                  </div>
+              </a>
+          `;
+
+      projectList.appendChild(li);
+    });
+
+    const counts = { all: projectsWithUpdates.length };
+    projectsWithUpdates.forEach(project => {
+      const cat = project.category.toLowerCase();
+      counts[cat] = (counts[cat] || 0) + 1;
+    });
+
+    const filterBtns = document.querySelectorAll("[data-filter-btn]");
+    filterBtns.forEach(btn => {
+      let baseText = btn.innerText.replace(/\s*\(\d+\)$/, '').trim();
+      const cat = baseText.toLowerCase();
+      if (counts[cat] !== undefined) {
+        btn.innerHTML = `${baseText}&nbsp;(${counts[cat]})`;
+      }
+    });
+
+    const selectItems = document.querySelectorAll("[data-select-item]");
+    selectItems.forEach(item => {
+      let baseText = item.innerText.replace(/\s*\(\d+\)$/, '').trim();
+      const cat = baseText.toLowerCase();
+      if (counts[cat] !== undefined) {
+        item.innerHTML = `${baseText}&nbsp;(${counts[cat]})`;
+      }
+    });
+
+    initializeProjectFilter();
+    setTimeout(initTiltEffect, 500);
+
+  } catch (error) {
+    console.error("Error loading or processing projects:", error);
+    projectList.innerHTML = '<li><p>Could not load projects. Please try again later.</p></li>';
+  }
+};
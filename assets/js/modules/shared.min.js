@@ -0,0 +1,5 @@
+export const elementToggleFunc=function(elem){elem.classList.toggle("active");}
+export const fetchJson=(url)=>fetch(url).then(response=>{if(!response.ok)throw new Error(`HTTP ${response.status}while fetching ${url}`);return response.json();});export const showSkeleton=(container,count=3,height='100px')=>{container.innerHTML='';for(let i=0;i<count;i++){const div=document.createElement('div');div.classList.add('skeleton');div.style.height=height;div.style.marginBottom='20px';container.appendChild(div);}};export const initTiltEffect=()=>{const cards=document.querySelectorAll('.project-item, .certificate-item, .events-post-item');cards.forEach(card=>{card.classList.add('tilt-effect');card.addEventListener('mousemove',(e)=>{const rect=card.getBoundingClientRect();const x=e.clientX-rect.left;const y=e.clientY-rect.top;const centerX=rect.width/2;const centerY=rect.height/2;const rotateX=((y-centerY)/centerY)*-5;const rotateY=((x-centerX)/centerX)*5;card.style.transform=`perspective(1000px)rotateX(${rotateX}deg)rotateY(${rotateY}deg)scale3d(1.02,1.02,1.02)`;});card.addEventListener('mouseleave',()=>{card.style.transform='perspective(1000px) rotateX(0) rotateY(0) scale3d(1, 1, 1)';});});};export const initializeProjectFilter=()=>{const select=document.querySelector("[data-select]");const selectItems=document.querySelectorAll("[data-select-item]");const selectValue=document.querySelector("[data-selecct-value]");const filterBtns=document.querySelectorAll("[data-filter-btn]");const filterItems=document.querySelectorAll("[data-filter-item]");const filterFunc=function(selectedValue){for(let i=0;i<filterItems.length;i++){if(selectedValue==="all"||selectedValue===filterItems[i].dataset.category){filterItems[i].classList.add("active");}else{filterItems[i].classList.remove("active");}}}
+let lastClickedBtn=filterBtns.length>0?filterBtns[0]:null;if(lastClickedBtn){for(let i=0;i<filterBtns.length;i++){filterBtns[i].addEventListener("click",function(){let selectedValue=this.innerText.replace(/\s*\(\d+\)$/,'').toLowerCase().trim();if(selectValue)selectValue.innerText=this.innerText;filterFunc(selectedValue);lastClickedBtn.classList.remove("active");this.classList.add("active");lastClickedBtn=this;});}}
+if(select){select.addEventListener("click",function(){elementToggleFunc(this);});for(let i=0;i<selectItems.length;i++){selectItems[i].addEventListener("click",function(){let selectedCat=this.innerText.replace(/\s*\(\d+\)$/,'').toLowerCase().trim();if(selectValue){selectValue.innerText=this.innerText;}
+elementToggleFunc(select);filterFunc(selectedCat);});}}};
\ No newline at end of file
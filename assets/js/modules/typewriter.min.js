@@ -0,0 +1,4 @@
+export const init=(titleElement)=>{const roles=["Data Scientist","Python Developer","Problem Solver","Analyst"];let roleIndex=0;let charIndex=0;let isDeleting=false;let typeSpeed=100;titleElement.classList.add('typewriter-cursor');function type(){const currentRole=roles[roleIndex];if(isDeleting){titleElement.textContent=currentRole.substring(0,charIndex-1);charIndex--;typeSpeed=50;}else{titleElement.textContent=currentRole.substring(0,charIndex+1);charIndex++;typeSpeed=150;}
+if(!isDeleting&&charIndex===currentRole.length){isDeleting=true;typeSpeed=2000;}else if(isDeleting&&charIndex===0){isDeleting=false;roleIndex=(roleIndex+1)%roles.length;typeSpeed=500;}
+setTimeout(type,typeSpeed);}
+type();};
\ No newline at end of file
@@ -0,0 +1,330 @@
+"""
+This script audits the weight of every page of the built site against a budget.
+
+For each page it adds up what a first visit downloads, by type: the HTML,
+stylesheets, scripts, images and the JSON script.js fetches to fill sections
+that were not prerendered. Scripts include every module they import,
+statically or with import(), followed the way service_worker.py follows them:
+the section modules script.js loads on demand count against the page. Text files are measured gzipped, as they are
+served, images as stored. It also counts render-blocking resources (style
+sheets and synchronous scripts in the <head>) and lists the largest images.
+
+The limits live in budget.json: per-page limits in KB matched by path
+pattern, and per-file limits for assets. The report is saved in .cache/ and
+compared with the previous one, so growth shows up in the build that caused
+it; the deploy workflow restores .cache/audit_report.json from the Actions
+cache of the last successful deploy for that. The script exits with 1 when a
+limit is exceeded.
+"""
+
+import argparse
+import fnmatch
+import gzip
+import json
+import os
+import re
+from html.parser import HTMLParser
+
+import instrumentation
+from instrumentation import Profiler
+from prerender_sections import SECTION_DATA
+from site_pages import BASE_DIR, SITE_DIR, add_root_argument, find_pages, resolve_url
+
+BUDGET_PATH = os.path.join(BASE_DIR, 'budget.json')
+REPORT_PATH = os.path.join(BASE_DIR, '.cache', 'audit_report.json')
+TEXT_EXTENSIONS = ('.html', '.css', '.js', '.json', '.svg', '.webmanifest')
+RESOURCE_TYPES = ('html', 'css', 'js', 'images', 'json')
+LARGEST_IMAGES = 3
+
+# Module specifiers of static imports, re-exports and import() calls
+IMPORT_RE = re.compile(r'''(?:\bimport\s*\(\s*|\bfrom\s*|\bimport\s*)(["'])([^"'\n]+?\.m?js)\1''')
+
+
+class _ResourceCollector(HTMLParser):
+    """
+    Collects the resources a page loads and which of them block rendering.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.in_head = False
+        self.in_noscript = False
+        self.resources = []  # (type, url, render blocking)
+        self.sections = {}  # container id -> prerendered
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'head':
+            self.in_head = True
+        elif tag == 'body':
+            self.in_head = False
+        elif tag == 'noscript':
+            self.in_noscript = True
+
+        if self.in_noscript:
+            # Fallbacks that only load without JavaScript
+            return
+
+        if attrs.get('id') in SECTION_DATA:
+            self.sections[attrs['id']] = 'data-prerendered' in attrs
+
+        if tag == 'link':
+            rel = (attrs.get('rel') or '').lower().split()
+            href = attrs.get('href')
+            if 'stylesheet' in rel and href:
+                blocking = self.in_head and attrs.get('media', 'all') not in ('print', 'none') and 'disabled' not in attrs
+                self.resources.append(('css', href, blocking))
+            elif 'preload' in rel and href and attrs.get('as') == 'fetch':
+                self.resources.append(('json', href, False))
+            elif 'preload' in rel and href and attrs.get('as') == 'style':
+                # Stylesheets loaded asynchronously, see critical_css.py
+                self.resources.append(('css', href, False))
+            elif 'icon' in rel and href:
+                self.resources.append(('images', href, False))
+        elif tag == 'script' and attrs.get('src') and 'nomodule' not in attrs:
+            # nomodule scripts are fallbacks that current browsers never download
+            blocking = (self.in_head and 'async' not in attrs and 'defer' not in attrs
+                        and attrs.get('type') != 'module')
+            self.resources.append(('js', attrs['src'], blocking))
+        elif tag == 'img' and attrs.get('src'):
+            self.resources.append(('images', attrs['src'], False))
+
+    def handle_endtag(self, tag):
+        if tag == 'head':
+            self.in_head = False
+        elif tag == 'noscript':
+            self.in_noscript = False
+
+
+class _Sizes:
+    """
+    Transfer sizes of files, gzipped for text, memoized across pages.
+    """
+
+    def __init__(self):
+        self._sizes = {}
+
+    def __call__(self, path: str) -> int:
+        if path not in self._sizes:
+            with open(path, 'rb') as f:
+                data = f.read()
+            if path.lower().endswith(TEXT_EXTENSIONS):
+                data = gzip.compress(data, compresslevel=6, mtime=0)
+            self._sizes[path] = len(data)
+        return self._sizes[path]
+
+
+def _imports(script_path: str) -> list:
+    with open(script_path, 'r', encoding='utf-8') as f:
+        return [match.group(2) for match in IMPORT_RE.finditer(f.read())]
+
+
+def audit_page(page_path: str, root: str, sizes: _Sizes) -> dict:
+    """
+    Measures what a first visit to a page downloads.
+
+    :param page_path: Path of the page
+    :param root: Root directory of the site
+    :param sizes: Shared size lookup
+    :return: Page report with bytes per type, request counts, render-blocking count and largest images
+    """
+    with open(page_path, 'r', encoding='utf-8') as f:
+        collector = _ResourceCollector()
+        collector.feed(f.read())
+
+    # (type, url, render blocking, path the url is relative to)
+    resources = [(kind, url, blocking, page_path) for kind, url, blocking in collector.resources]
+    # Sections left to script.js fetch their data on load
+    for container_id, prerendered in collector.sections.items():
+        if not prerendered:
+            resources.extend(('json', f'/assets/data/{filename}', False, page_path)
+                             for filename in SECTION_DATA[container_id])
+
+    report = {'bytes': {kind: 0 for kind in RESOURCE_TYPES}, 'requests': 1, 'third_party_requests': 0,
+              'render_blocking': 0, 'missing': [], 'largest_images': []}
+    report['bytes']['html'] = sizes(page_path)
+    seen = set()
+    images = []
+    while resources:
+        kind, url, blocking, base = resources.pop(0)
+        report['render_blocking'] += blocking
+        path = resolve_url(url, base, root)
+        if path is None:
+            if url.startswith(('http:', 'https:', '//')):
+                report['third_party_requests'] += 1
+            continue
+        if path in seen:
+            continue
+        seen.add(path)
+        if not os.path.isfile(path):
+            report['missing'].append(os.path.relpath(path, root).replace(os.sep, '/'))
+            continue
+        size = sizes(path)
+        report['bytes'][kind] += size
+        report['requests'] += 1
+        if kind == 'images':
+            images.append((size, os.path.relpath(path, root).replace(os.sep, '/')))
+        elif kind == 'js':
+            resources.extend(('js', module, False, path) for module in _imports(path))
+
+    report['bytes']['total'] = sum(report['bytes'].values())
+    report['largest_images'] = [[path, size] for size, path in sorted(images, reverse=True)[:LARGEST_IMAGES]]
+    return report
+
+
+def audit_site(root: str = SITE_DIR) -> dict:
+    """
+    Audits every page and asset of the built site.
+
+    :param root: Root directory of the built site
+    :return: Report with 'pages' (page path -> page report) and 'assets' (file path -> bytes)
+    """
+    sizes = _Sizes()
+    pages = {}
+    for page_path in find_pages(root):
+        pages[os.path.relpath(page_path, root).replace(os.sep, '/')] = audit_page(page_path, root, sizes)
+
+    assets = {}
+    for directory, _, filenames in os.walk(os.path.join(root, 'assets')):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            assets[os.path.relpath(path, root).replace(os.sep, '/')] = sizes(path)
+    return {'pages': pages, 'assets': dict(sorted(assets.items()))}
+
+
+def _first_match(rules: list, path: str) -> dict:
+    for rule in rules:
+        if fnmatch.fnmatch(path, rule['path']):
+            return rule
+    return None
+
+
+def check_budget(report: dict, budget: dict) -> list:
+    """
+    Compares a report with the budget.
+
+    :param report: Report from audit_site()
+    :param budget: Parsed budget.json; page limits are in KB except 'requests' and 'render_blocking'
+    :return: Violations as readable lines
+    """
+    violations = []
+    for page, page_report in report['pages'].items():
+        rule = _first_match(budget.get('pages', []), page)
+        if not rule:
+            continue
+        for kind in RESOURCE_TYPES + ('total',):
+            if kind in rule and page_report['bytes'][kind] > rule[kind] * 1024:
+                violations.append(f"{page}: {kind} {page_report['bytes'][kind] / 1024:.1f} KB > {rule[kind]} KB")
+        for count in ('requests', 'render_blocking'):
+            if count in rule and page_report[count] > rule[count]:
+                violations.append(f"{page}: {count} {page_report[count]} > {rule[count]}")
+        for missing in page_report['missing']:
+            violations.append(f"{page}: references missing file {missing}")
+
+    for path, size in report['assets'].items():
+        rule = _first_match(budget.get('files', []), path)
+        if rule and size > rule['max'] * 1024:
+            violations.append(f"{path}: {size / 1024:.1f} KB > {rule['max']} KB")
+    return violations
+
+
+def _signed_kb(delta: int) -> str:
+    return f"{'+' if delta > 0 else ''}{delta / 1024:.1f} KB"
+
+
+def diff_reports(previous: dict, current: dict) -> list:
+    """
+    Describes how page weights and assets changed since the previous report.
+
+    :param previous: Earlier report
+    :param current: New report
+    :return: Readable lines, empty when nothing changed
+    """
+    lines = []
+    for page in sorted(previous['pages'].keys() | current['pages'].keys()):
+        before = previous['pages'].get(page)
+        after = current['pages'].get(page)
+        if before is None:
+            lines.append(f"  + {page}: {after['bytes']['total'] / 1024:.1f} KB")
+        elif after is None:
+            lines.append(f"  - {page}")
+        elif before['bytes'] != after['bytes'] or before['render_blocking'] != after['render_blocking']:
+            changes = [f"{kind} {_signed_kb(after['bytes'][kind] - before['bytes'][kind])}"
+                       for kind in RESOURCE_TYPES + ('total',) if after['bytes'][kind] != before['bytes'][kind]]
+            if before['render_blocking'] != after['render_blocking']:
+                changes.append(f"render-blocking {before['render_blocking']} -> {after['render_blocking']}")
+            lines.append(f"  ~ {page}: {', '.join(changes)}")
+
+    before_assets = previous['assets']
+    after_assets = current['assets']
+    added = after_assets.keys() - before_assets.keys()
+    removed = before_assets.keys() - after_assets.keys()
+    changed = [path for path in after_assets.keys() & before_assets.keys() if after_assets[path] != before_assets[path]]
+    if added or removed or changed:
+        total = sum(after_assets.values()) - sum(before_assets.values())
+        lines.append(f"  assets: {len(added)} added, {len(removed)} removed, {len(changed)} changed, "
+                     f"{_signed_kb(total)} in total")
+        biggest = sorted(changed, key=lambda p: -abs(after_assets[p] - before_assets[p]))[:5]
+        for path in biggest:
+            lines.append(f"    {path}: {_signed_kb(after_assets[path] - before_assets[path])}")
+    return lines
+
+
+def print_report(report: dict) -> None:
+    print(f"{'Page':<52}{'HTML':>8}{'CSS':>8}{'JS':>8}{'Images':>9}{'JSON':>8}{'Total':>9}{'Blocking':>10}")
+    for page, page_report in report['pages'].items():
+        kb = {kind: f"{size / 1024:.1f}" for kind, size in page_report['bytes'].items()}
+        print(f"{page:<52}{kb['html']:>8}{kb['css']:>8}{kb['js']:>8}{kb['images']:>9}{kb['json']:>8}"
+              f"{kb['total']:>9}{page_report['render_blocking']:>10}")
+    print("(KB transferred, text gzipped)")
+
+    images = {}
+    for page_report in report['pages'].values():
+        images.update(dict(page_report['largest_images']))
+    print("\nLargest images:")
+    for path, size in sorted(images.items(), key=lambda item: -item[1])[:LARGEST_IMAGES * 2]:
+        print(f"  {path} ({size / 1024:.1f} KB)")
+
+
+def load_json(path: str) -> dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Audit page weights of the built site against budget.json.")
+    add_root_argument(parser, edited=False)
+    parser.add_argument('--budget', default=BUDGET_PATH, help="Budget file")
+    parser.add_argument('--report', default=REPORT_PATH,
+                        help="Where the report is saved; the report already there is the baseline of the diff")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+
+    with Profiler.from_args('audit_budget', args) as profiler:
+        with profiler.phase('audit pages'):
+            site_report = audit_site(args.root)
+        print_report(site_report)
+
+        previous_report = load_json(args.report)
+        if previous_report:
+            diff = diff_reports(previous_report, site_report)
+            print("\nChanges since the previous audit:")
+            print("\n".join(diff) if diff else "  none")
+        os.makedirs(os.path.dirname(os.path.abspath(args.report)), exist_ok=True)
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(site_report, f, indent=2)
+
+        budget = load_json(args.budget)
+        problems = check_budget(site_report, budget) if budget is not None else []
+    if budget is None:
+        print(f"\nNo budget at {args.budget}, nothing to check.")
+    elif problems:
+        print(f"\nOver budget ({len(problems)}):")
+        for problem in problems:
+            print(f"  {problem}")
+        raise SystemExit(1)
+    else:
+        print("\nAll pages are within budget.")
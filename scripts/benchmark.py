@@ -0,0 +1,302 @@
+"""
+This script benchmarks the build scripts against synthetic corpora.
+
+For every scale it generates a throwaway site in a temporary directory: N
+Markdown posts with front matter, code blocks and tables, a set of PNG/JPEG
+images of varied sizes and a large stylesheet. The real scripts are copied
+next to them and run there, cold and then warm (incremental), measuring wall
+time, CPU time, throughput and the peak memory of the process tree.
+
+Results are written as JSON. Given a baseline, any benchmark whose wall time
+or peak memory grew by more than the threshold fails the run.
+
+Peak memory comes from os.wait4(), so the script needs a Unix system.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS_DIR = os.path.join(BASE_DIR, 'scripts')
+RESULTS_PATH = os.path.join(BASE_DIR, '.cache', 'benchmark.json')
+BASELINE_PATH = os.path.join(BASE_DIR, '.cache', 'benchmark_baseline.json')
+DEFAULT_SCALES = (10, 1000)
+# Image encoding dominates everything else, so the image corpus stops growing here
+MAX_IMAGES = 200
+CSS_RULES_PER_POST = 20
+THRESHOLD = 0.2
+# Differences below this many seconds are noise, whatever the ratio
+MIN_TIME_DELTA = 0.05
+
+# Runs the measured command from a fresh, small interpreter. On Linux a process
+# starts with the peak RSS of the process it was spawned from, which would
+# otherwise be the benchmark itself, holding the generated corpus.
+LAUNCHER = """
+import json, os, subprocess, sys, time
+started = time.perf_counter()
+process = subprocess.Popen(sys.argv[2:])
+_, status, usage = os.wait4(process.pid, 0)
+with open(sys.argv[1], 'w') as f:
+    json.dump({'wall': time.perf_counter() - started, 'exit': os.waitstatus_to_exitcode(status),
+               'cpu': usage.ru_utime + usage.ru_stime, 'maxrss': usage.ru_maxrss}, f)
+"""
+
+WORDS = ('data model python build cache index search page image stream token parser graph query metric '
+         'latency budget render layout pipeline vector feature sample signal noise average paradox '
+         'entropy commit branch deploy network request response header worker process thread').split()
+LANGUAGES = ('python', 'javascript', 'bash', 'sql')
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def generate_post(rng: random.Random, index: int) -> str:
+    """
+    Generates a Markdown post with front matter, headings, a code block, a table and a list.
+
+    :param rng: Seeded random generator
+    :param index: Number of the post, used in its title
+    :return: Markdown source
+    """
+    tags = rng.sample(WORDS, 4)
+    lines = [
+        '---',
+        f'title: "Synthetic post {index}: {_sentence(rng, 4)[:-1]}"',
+        'published: true',
+        f'date: "20{rng.randint(18, 26)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"',
+        f'description: "{_sentence(rng, 14)}"',
+        f'tags: {json.dumps(tags)}',
+        '---',
+        '',
+    ]
+    for section in range(rng.randint(2, 4)):
+        lines += [f'## {section + 1}. {_sentence(rng, 5)[:-1]}', '']
+        for _ in range(rng.randint(2, 4)):
+            lines += [' '.join(_sentence(rng, rng.randint(8, 20)) for _ in range(rng.randint(2, 5))), '']
+        language = rng.choice(LANGUAGES)
+        lines += [f'```{language}'] + [f'value_{i} = compute("{rng.choice(WORDS)}", {i})  # {rng.choice(WORDS)}'
+                                       for i in range(rng.randint(3, 12))] + ['```', '']
+        lines += ['| Metric | Before | After |', '| --- | --- | --- |']
+        lines += [f'| {rng.choice(WORDS)} | {rng.randint(1, 999)} | {rng.randint(1, 999)} |' for _ in range(4)] + ['']
+        lines += [f'- **{rng.choice(WORDS)}**: {_sentence(rng, 8)}' for _ in range(3)] + ['']
+    return '\n'.join(lines)
+
+
+def generate_css(rng: random.Random, rules: int) -> str:
+    """
+    Generates a stylesheet with comments, custom properties, strings, url(), calc() and media queries.
+
+    :param rng: Seeded random generator
+    :param rules: Number of rules
+    :return: CSS source
+    """
+    parts = ['/* synthetic stylesheet */', ':root {', '  --gap: 12px;', '  --accent: hsl(99, 76%, 56%);', '}', '']
+    for index in range(rules):
+        selector = f'.{rng.choice(WORDS)}-{index} > .{rng.choice(WORDS)}:hover'
+        parts += [
+            f'{selector} {{',
+            f'  margin: 0px {rng.randint(0, 40)}px;',
+            f'  width: calc(100% - {rng.randint(1, 64)}px);',
+            f'  color: #{rng.choice(("ffffff", "AABBCC", "76E340", "2b2b2c"))};',
+            f'  opacity: 0.{rng.randint(10, 99)}0;',
+            f'  background: url("../images/{rng.choice(WORDS)}.webp") no-repeat;',
+            f'  content: "{rng.choice(WORDS)} ; {{ }}";',
+            '}',
+            ''
+        ]
+        if index % 25 == 24:
+            parts += [f'@media (min-width: {rng.choice((450, 580, 768, 1024))}px) {{',
+                      f'  .{rng.choice(WORDS)}-{index} {{ padding: var(--gap) 0px; }}', '}', '']
+    return '\n'.join(parts)
+
+
+def generate_images(rng: random.Random, directory: str, count: int) -> None:
+    """
+    Writes PNG and JPEG images of varied sizes, with noise so they do not compress to nothing.
+
+    :param rng: Seeded random generator
+    :param directory: Directory to write into
+    :param count: Number of images
+    """
+    from PIL import Image
+
+    os.makedirs(directory, exist_ok=True)
+    for index in range(count):
+        width = rng.choice((320, 640, 1200, 1920, 2400))
+        height = width * rng.choice((9, 10, 12)) // 16
+        noise = Image.effect_noise((width, height), rng.randint(20, 80))
+        gradient = Image.linear_gradient('L').resize((width, height))
+        image = Image.merge('RGB', (noise, gradient, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+        extension = 'png' if index % 2 else 'jpg'
+        image.save(os.path.join(directory, f'synthetic-{index}.{extension}'))
+
+
+def create_site(root: str, posts: int, images: int, seed: int = 0) -> None:
+    """
+    Creates a synthetic site: the real scripts, template and JavaScript sources plus generated content.
+
+    :param root: Empty directory to create the site in
+    :param posts: Number of posts
+    :param images: Number of images
+    :param seed: Seed of the generator, so runs compare like with like
+    """
+    rng = random.Random(seed)
+    shutil.copytree(SCRIPTS_DIR, os.path.join(root, 'scripts'), ignore=shutil.ignore_patterns('__pycache__'))
+    shutil.copy2(os.path.join(BASE_DIR, 'index.html'), os.path.join(root, 'index.html'))
+    os.makedirs(os.path.join(root, 'assets', 'js'))
+    shutil.copy2(os.path.join(BASE_DIR, 'assets', 'js', 'script.js'), os.path.join(root, 'assets', 'js', 'script.js'))
+    shutil.copytree(os.path.join(BASE_DIR, 'assets', 'js', 'modules'), os.path.join(root, 'assets', 'js', 'modules'),
+                    ignore=shutil.ignore_patterns('*.min.js'))
+
+    blogs_dir = os.path.join(root, '_blogs')
+    os.makedirs(blogs_dir)
+    for index in range(posts):
+        with open(os.path.join(blogs_dir, f'synthetic-post-{index}.md'), 'w', encoding='utf-8') as f:
+            f.write(generate_post(rng, index))
+
+    os.makedirs(os.path.join(root, 'assets', 'css'))
+    with open(os.path.join(root, 'assets', 'css', 'style.css'), 'w', encoding='utf-8') as f:
+        f.write(generate_css(rng, posts * CSS_RULES_PER_POST))
+
+    generate_images(rng, os.path.join(root, 'assets', 'images', 'blogs'), images)
+
+
+def measure(root: str, script: str, args: list, items: int) -> dict:
+    """
+    Runs a script of the synthetic site and measures it.
+
+    :param root: Root of the synthetic site
+    :param script: Script name in scripts/
+    :param args: Command line arguments
+    :param items: Number of items the run processes, for the throughput
+    :return: Measurements: wall and CPU seconds, items per second and peak RSS in MB
+    """
+    result_path = os.path.join(root, '.benchmark_result.json')
+    with tempfile.TemporaryFile() as log:
+        # wait4 reports the CPU time and peak RSS of the whole process tree, pool workers included
+        subprocess.run([sys.executable, '-c', LAUNCHER, result_path,
+                        sys.executable, os.path.join(root, 'scripts', script), *args],
+                       cwd=root, stdout=log, stderr=subprocess.STDOUT, check=False)
+        with open(result_path, 'r', encoding='utf-8') as f:
+            usage = json.load(f)
+        if usage['exit'] != 0:
+            log.seek(0)
+            raise RuntimeError(f"{script} failed:\n{log.read().decode('utf-8', 'replace')[-2000:]}")
+
+    wall = usage['wall']
+    return {
+        'items': items,
+        'wall_seconds': round(wall, 4),
+        'cpu_seconds': round(usage['cpu'], 4),
+        'items_per_second': round(items / wall, 2) if wall else None,
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        'peak_rss_mb': round(usage['maxrss'] / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    }
+
+
+def run_benchmarks(scales: list, jobs: int, max_images: int = MAX_IMAGES) -> dict:
+    """
+    Runs every benchmark at every scale.
+
+    :param scales: Numbers of posts to benchmark with
+    :param jobs: Worker processes passed to build_blogs and optimize_images
+    :param max_images: Upper bound of the image corpus
+    :return: Mapping of benchmark name (e.g. 'blogs.cold@1000') to its measurements
+    """
+    results = {}
+    for scale in scales:
+        images = min(scale, max_images)
+        with tempfile.TemporaryDirectory(prefix='portfolio-bench-') as root:
+            print(f"Generating a site with {scale} posts and {images} images...")
+            create_site(root, scale, images)
+            runs = [
+                ('blogs.cold', 'build_blogs.py', ['--force', '--jobs', str(jobs)], scale),
+                ('blogs.warm', 'build_blogs.py', ['--jobs', str(jobs)], scale),
+                ('css.minify', 'minify_assets.py', [], scale * CSS_RULES_PER_POST),
+                ('images.cold', 'optimize_images.py', ['--force', '--jobs', str(jobs)], images),
+                ('images.warm', 'optimize_images.py', ['--jobs', str(jobs)], images),
+            ]
+            for name, script, args, items in runs:
+                key = f'{name}@{scale}'
+                results[key] = measure(root, script, args, items)
+                print(f"  {key:<22}{results[key]['wall_seconds']:>9.3f}s "
+                      f"{results[key]['items_per_second'] or 0:>11.1f}/s {results[key]['peak_rss_mb']:>8.1f} MB")
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Lists the benchmarks that regressed against a baseline.
+
+    :param results: Measurements of this run
+    :param baseline: Measurements of the baseline run
+    :param threshold: Allowed relative growth of wall time and peak memory, e.g. 0.2 for 20%
+    :return: Human-readable regression descriptions
+    """
+    regressions = []
+    for key, current in sorted(results.items()):
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        old_wall, new_wall = previous['wall_seconds'], current['wall_seconds']
+        if new_wall > old_wall * (1 + threshold) and new_wall - old_wall > MIN_TIME_DELTA:
+            regressions.append(f"{key}: wall time {old_wall:.3f}s -> {new_wall:.3f}s "
+                               f"(+{(new_wall / old_wall - 1) * 100:.0f}%)")
+        old_rss, new_rss = previous['peak_rss_mb'], current['peak_rss_mb']
+        if new_rss > old_rss * (1 + threshold):
+            regressions.append(f"{key}: peak memory {old_rss:.1f} MB -> {new_rss:.1f} MB "
+                               f"(+{(new_rss / old_rss - 1) * 100:.0f}%)")
+    return regressions
+
+
+def _write_json(path: str, data: dict) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the build scripts on synthetic corpora.")
+    parser.add_argument('--scales', type=int, nargs='+', default=list(DEFAULT_SCALES),
+                        help="Numbers of posts to benchmark with, e.g. --scales 10 1000 10000")
+    parser.add_argument('--jobs', '-j', type=int, default=1, help="Worker processes for blogs and images")
+    parser.add_argument('--max-images', type=int, default=MAX_IMAGES, help="Upper bound of the image corpus")
+    parser.add_argument('--output', default=RESULTS_PATH, help="Where to write the results")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline to compare against, if it exists")
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the new baseline")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help="Allowed relative growth before a benchmark counts as a regression")
+    args = parser.parse_args()
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'jobs': args.jobs,
+        'results': run_benchmarks(args.scales, args.jobs, args.max_images)
+    }
+    _write_json(args.output, report)
+    print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        _write_json(args.baseline, report)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report['results'], baseline['results'], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
@@ -0,0 +1,315 @@
+"""
+This script builds the site by running the other scripts as stages.
+
+Each stage declares the files it reads, the files it writes and the stages
+it depends on. Independent stages (images, blogs, CSS/JS) run concurrently,
+and a stage whose inputs, options and outputs are unchanged since its last
+successful run is skipped. Input files are compared by size and mtime first
+and only re-hashed when those differ, so a no-op build takes well under a
+second.
+
+The network stages (--fetch) and the deploy-time page rewrites (--deploy)
+always run when selected, their results can not be predicted from local files.
+The rewrites edit pages in place, so they never touch the working tree: the
+site stage copies it into the output directory (--site, default _site/) and
+the rewrites run there. Selecting prerender selects the site stage too.
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import instrumentation
+from instrumentation import NULL_PROFILER, PROFILE_DIR, Profiler
+from site_pages import SITE_DIR
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS_DIR = os.path.join(BASE_DIR, 'scripts')
+STATE_PATH = os.path.join(BASE_DIR, '.cache', 'build_state.json')
+
+
+class Stage:
+    """
+    A build step: a script run with arguments, its inputs, outputs and dependencies.
+    """
+
+    def __init__(self, name: str, script: str, args: list = (), inputs=None, outputs: list = (),
+                 deps: list = (), always: bool = False):
+        """
+        :param name: Stage name used on the command line and in the timing table
+        :param script: Script in scripts/ that runs the stage
+        :param args: Command line arguments of the script
+        :param inputs: Callable returning the absolute paths the stage reads
+        :param outputs: Paths relative to BASE_DIR the stage writes, checked for existence
+        :param deps: Names of the stages that must finish first
+        :param always: Run on every build instead of comparing inputs
+        """
+        self.name = name
+        self.script = script
+        self.args = list(args)
+        self.inputs = inputs or (lambda: [])
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+        self.always = always
+
+    def command(self, profile: bool = False) -> list:
+        """
+        :param profile: Make the script write its own trace to trace_path()
+        :return: Command line running the stage
+        """
+        extra = ['--profile', self.trace_path()] if profile else []
+        return [sys.executable, os.path.join(SCRIPTS_DIR, self.script), *self.args, *extra]
+
+    def trace_path(self) -> str:
+        return os.path.join(PROFILE_DIR, f'stage-{self.name}.trace.json')
+
+
+def _files(*patterns: str):
+    """
+    Returns a callable listing the files matching glob patterns relative to BASE_DIR.
+    """
+    def collect():
+        paths = set()
+        for pattern in patterns:
+            paths.update(p for p in glob.glob(os.path.join(BASE_DIR, pattern), recursive=True) if os.path.isfile(p))
+        return sorted(paths)
+    return collect
+
+
+def _image_inputs():
+    # The optimizer decides which files are sources, WebP outputs of PNG/JPEG sources are not inputs
+    sys.path.insert(0, SCRIPTS_DIR)
+    from optimize_images import find_images
+    return find_images() + [os.path.join(SCRIPTS_DIR, 'optimize_images.py')]
+
+
+def _asset_inputs(*patterns: str):
+    # Every JS source is an input, the .min.js files written next to the modules are not
+    files = _files(*patterns)
+
+    def collect():
+        sys.path.insert(0, SCRIPTS_DIR)
+        from minify_assets import js_sources
+        return sorted(set(files()) | set(js_sources(os.path.join(BASE_DIR, 'assets'))))
+    return collect
+
+
+def define_stages(jobs: int, prune: bool, avif: bool, site_dir: str = SITE_DIR) -> dict:
+    """
+    Declares every stage of the build.
+
+    :param jobs: Worker processes for the images and blogs stages
+    :param prune: Prune unused CSS selectors, which makes the assets stage read the built pages
+    :param avif: Also write AVIF images
+    :param site_dir: Copy of the site the deploy stages rewrite
+    :return: Mapping of stage name to Stage, in a valid run order
+    """
+    asset_inputs = ['assets/css/style.css', 'scripts/minify_assets.py', 'scripts/css_minifier.py']
+    if prune:
+        asset_inputs += ['index.html', '*/index.html', 'blogs/**/index.html', 'scripts/site_pages.py']
+    # The deploy stages rewrite the exported copy, never the working tree
+    root = ['--root', site_dir]
+
+    stages = [
+        Stage('credly', 'fetch_credly_data.py', inputs=_files('index.html'),
+              outputs=['assets/images/badges'], always=True),
+        Stage('github', 'fetch_github_activity.py', args=['--graphql'],
+              outputs=['assets/data/projects.json', 'assets/data/last_updated.json'], always=True),
+        Stage('images', 'optimize_images.py', args=['--jobs', str(jobs)] + (['--avif'] if avif else []),
+              inputs=_image_inputs, outputs=['assets/images/manifest.json'], deps=['credly']),
+        Stage('blogs', 'build_blogs.py', args=['--jobs', str(jobs)],
+              inputs=_files('_blogs/*.md', 'index.html', 'scripts/build_blogs.py', 'scripts/search_index.py',
+                            'scripts/code_highlight.py'),
+              outputs=['blogs/index.html', 'assets/data/blogs.json', 'assets/data/search/docs.json',
+                       'assets/css/highlight.min.css']),
+        Stage('assets', 'minify_assets.py', args=['--prune'] if prune else [],
+              inputs=_asset_inputs(*asset_inputs),
+              outputs=['assets/css/style.min.css', 'assets/js/script.min.js', 'assets/js/modules/shared.min.js'],
+              deps=['blogs'] if prune else []),
+        Stage('site', 'export_site.py', args=['--out', site_dir],
+              deps=['credly', 'github', 'images', 'blogs', 'assets'], always=True),
+        Stage('prerender', 'prerender_sections.py', args=root, deps=['site'], always=True),
+        Stage('responsive', 'responsive_images.py', args=root, deps=['prerender'], always=True),
+        Stage('critical', 'critical_css.py', args=root, deps=['responsive'], always=True),
+        Stage('fingerprint', 'fingerprint_assets.py', args=root, deps=['critical'], always=True),
+        Stage('sw', 'service_worker.py', args=root, deps=['fingerprint'], always=True),
+        Stage('html', 'minify_html.py', args=root, deps=['sw'], always=True),
+        Stage('audit', 'audit_budget.py', args=root, deps=['html'], always=True),
+    ]
+    return {stage.name: stage for stage in stages}
+
+
+DEFAULT_STAGES = ['images', 'blogs', 'assets']
+FETCH_STAGES = ['credly', 'github']
+DEPLOY_STAGES = ['site', 'prerender', 'responsive', 'critical', 'fingerprint', 'sw', 'html', 'audit']
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_inputs(paths: list, previous: dict) -> dict:
+    """
+    Records the size, mtime and content hash of every input.
+
+    :param paths: Absolute input paths
+    :param previous: Snapshot of the last successful run, whose hashes are reused for unchanged stats
+    :return: Mapping of relative path to [size, mtime_ns, sha256]
+    """
+    snapshot = {}
+    for path in paths:
+        rel = os.path.relpath(path, BASE_DIR).replace(os.sep, '/')
+        stat = os.stat(path)
+        known = previous.get(rel)
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+            snapshot[rel] = known
+        else:
+            snapshot[rel] = [stat.st_size, stat.st_mtime_ns, _hash_file(path)]
+    return snapshot
+
+
+def _load_state() -> dict:
+    try:
+        with open(STATE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_state(state: dict) -> None:
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    with open(STATE_PATH, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+
+def _is_current(stage: Stage, snapshot: dict, previous: dict) -> bool:
+    if not previous or previous.get('args') != stage.args:
+        return False
+    if {rel: entry[2] for rel, entry in snapshot.items()} != {rel: entry[2] for rel, entry in previous['inputs'].items()}:
+        return False
+    return all(os.path.exists(os.path.join(BASE_DIR, output)) for output in stage.outputs)
+
+
+def run_stage(stage: Stage, previous: dict, force: bool, profiler: Profiler = NULL_PROFILER) -> dict:
+    """
+    Runs a stage unless its inputs are unchanged.
+
+    :param stage: Stage to run
+    :param previous: State recorded by the stage's last successful run
+    :param force: Run even if the inputs are unchanged
+    :param profiler: Records the stage, and makes its script write a trace of its own
+    :return: Result with 'status' ('ran', 'skipped' or 'failed'), 'seconds', 'output' and the new 'state'
+    """
+    started = time.perf_counter()
+    with profiler.item('check', stage.name):
+        snapshot = {} if stage.always else snapshot_inputs(stage.inputs(), (previous or {}).get('inputs', {}))
+    if not (force or stage.always) and _is_current(stage, snapshot, previous):
+        return {'status': 'skipped', 'seconds': time.perf_counter() - started, 'output': '', 'state': previous}
+
+    with profiler.item('stage', stage.name) as trace:
+        process = subprocess.run(stage.command(profile=profiler.enabled), cwd=BASE_DIR,
+                                 capture_output=True, text=True)
+        trace['returncode'] = process.returncode
+    if profiler.enabled:
+        profiler.include(stage.trace_path(), stage.name)
+    status = 'ran' if process.returncode == 0 else 'failed'
+    return {
+        'status': status,
+        'seconds': time.perf_counter() - started,
+        'output': process.stdout + process.stderr,
+        'state': {'args': stage.args, 'inputs': snapshot} if status == 'ran' else None
+    }
+
+
+def build(selected: list, stages: dict, force: bool = False, profiler: Profiler = NULL_PROFILER) -> bool:
+    """
+    Runs the selected stages, each as soon as the stages it depends on are done.
+
+    :param selected: Names of the stages to run, dependencies outside it are ignored
+    :param stages: Every stage from define_stages()
+    :param force: Run every stage even if its inputs are unchanged
+    :param profiler: Records every stage and merges the traces of the stage scripts into its own
+    :return: True if no stage failed
+    """
+    started = time.perf_counter()
+    state = _load_state()
+    results = {}
+    pending = [name for name in stages if name in selected]
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, len(pending))) as executor:
+        while pending or running:
+            for name in list(pending):
+                deps = [dep for dep in stages[name].deps if dep in selected]
+                if any(results.get(dep, {}).get('status') in ('failed', 'blocked') for dep in deps):
+                    results[name] = {'status': 'blocked', 'seconds': 0.0, 'output': ''}
+                    pending.remove(name)
+                elif all(dep in results for dep in deps):
+                    running[executor.submit(run_stage, stages[name], state.get(name), force, profiler)] = name
+                    pending.remove(name)
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                result = future.result()
+                results[name] = result
+                if result['output'].strip():
+                    print(f"[{name}]\n{result['output'].rstrip()}\n")
+                if result['status'] == 'ran':
+                    state[name] = result['state']
+                    _save_state(state)
+                elif result['status'] == 'failed':
+                    state.pop(name, None)
+                    _save_state(state)
+
+    print(f"{'Stage':<14}{'Status':<10}{'Time':>9}")
+    for name in stages:
+        if name in results:
+            print(f"{name:<14}{results[name]['status']:<10}{results[name]['seconds']:>8.2f}s")
+    print(f"{'total':<24}{time.perf_counter() - started:>8.2f}s")
+    return all(result['status'] in ('ran', 'skipped') for result in results.values())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the site, running only the stages whose inputs changed.")
+    parser.add_argument('stages', nargs='*',
+                        help=f"Stages to run (default: {', '.join(DEFAULT_STAGES)})")
+    parser.add_argument('--fetch', action='store_true', help=f"Also run the network stages: {', '.join(FETCH_STAGES)}")
+    parser.add_argument('--deploy', action='store_true',
+                        help=f"Also export the site and run the deploy-time rewrites on it: {', '.join(DEPLOY_STAGES)}")
+    parser.add_argument('--site', default=SITE_DIR,
+                        help="Output directory of the site stage, rewritten by the deploy stages (default: _site)")
+    parser.add_argument('--force', action='store_true', help="Run every selected stage even if its inputs are unchanged")
+    parser.add_argument('--jobs', '-j', type=int, default=0,
+                        help="Worker processes for the images and blogs stages (0 uses every CPU core)")
+    parser.add_argument('--prune', action='store_true', help="Prune unused CSS selectors in the assets stage")
+    parser.add_argument('--avif', action='store_true', help="Also write AVIF images in the images stage")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+
+    site_dir = os.path.abspath(args.site)
+    if site_dir == BASE_DIR:
+        parser.error("--site must not be the repository root, the deploy stages would rewrite the sources")
+    all_stages = define_stages(args.jobs or os.cpu_count(), args.prune, args.avif, site_dir)
+    unknown = [name for name in args.stages if name not in all_stages]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}; choose from {', '.join(all_stages)}")
+    selected = args.stages or (DEFAULT_STAGES + (FETCH_STAGES if args.fetch else [])
+                               + (DEPLOY_STAGES if args.deploy else []))
+    if 'prerender' in selected and 'site' not in selected:
+        selected = ['site'] + selected
+    with Profiler.from_args('build', args) as profiler:
+        succeeded = build(selected, all_stages, force=args.force, profiler=profiler)
+    sys.exit(0 if succeeded else 1)
@@ -1,215 +1,666 @@
-import os
+"""
+This script builds the blog pages in blogs/ from the Markdown sources in _blogs/.
+
+A manifest of content hashes is kept between runs so that only posts whose
+source, front matter or page template changed are converted and rewritten.
+
+Post data for the browser is split into a compact, paginated index
+(assets/data/blogs.json) and one JSON shard per post holding its body.
+The full-text search index in assets/data/search/ is updated together with
+the posts, see search_index.py. Code blocks are highlighted through an
+on-disk cache and styled by one shared stylesheet, see code_highlight.py.
+
+Posts are streamed: each one is read, rendered and written by a worker and
+only its metadata comes back, so memory does not grow with the post bodies.
+The /blogs/ listing is paginated the same way, /blogs/ holds the newest
+posts and /blogs/page/N/ the older ones.
+"""
+
+import argparse
 import glob
+import hashlib
 import json
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
 import frontmatter
 import markdown
 from bs4 import BeautifulSoup
-import re
+from bs4.formatter import HTMLFormatter
+
+import code_highlight
+import instrumentation
+from code_highlight import CachedHighlightExtension
+from instrumentation import NULL_PROFILER, Profiler, timed
+from search_index import SearchIndex, extract_terms
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BLOGS_DIR = os.path.join(BASE_DIR, '_blogs')
+OUTPUT_DIR = os.path.join(BASE_DIR, 'blogs')
+TEMPLATE_PATH = os.path.join(BASE_DIR, 'index.html')
+DATA_PATH = os.path.join(BASE_DIR, 'assets', 'data', 'blogs.json')
+DATA_DIR = os.path.join(BASE_DIR, 'assets', 'data', 'blogs')
+DATA_URL = '/assets/data/blogs'
+SEARCH_DIR = os.path.join(BASE_DIR, 'assets', 'data', 'search')
+MANIFEST_PATH = os.path.join(BASE_DIR, '.cache', 'blogs_manifest.json')
+
+# Bump whenever the rendering code changes so every output is regenerated.
+BUILD_VERSION = 6
+
+# Number of posts per page of the blogs.json index.
+INDEX_PAGE_SIZE = 50
+
+# Number of posts per page of the /blogs/ listing.
+LISTING_PAGE_SIZE = 20
+
+# Directory of the older listing pages under blogs/, no post can take it as its slug.
+LISTING_PAGES_DIR = 'page'
+
+
+def _hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _hash_front_matter(metadata: dict) -> str:
+    return _hash_bytes(json.dumps(metadata, sort_keys=True, default=str).encode('utf-8'))
+
+
+def load_manifest(path: str) -> dict:
+    """
+    Loads the build manifest written by a previous run.
+
+    :param path: Path to the manifest file
+    :return: The manifest, or an empty one if it is missing or unreadable
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {'posts': {}}
+    if manifest.get('version') != BUILD_VERSION:
+        return {'posts': {}}
+    return manifest
+
+
+def save_manifest(path: str, manifest: dict) -> None:
+    """
+    Persists the build manifest for the next run.
+
+    :param path: Path to the manifest file
+    :param manifest: Manifest to write
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def _write_json(path: str, data) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+
+
+def _shard_path(slug: str) -> str:
+    return os.path.join(DATA_DIR, 'posts', f'{slug}.json')
+
+
+def _content_hash(meta: dict, html_content: str) -> str:
+    data = json.dumps(meta, sort_keys=True, default=str) + html_content
+    return _hash_bytes(data.encode('utf-8'))[:12]
+
+
+def _listing_path(number: int) -> str:
+    if number == 1:
+        return os.path.join(OUTPUT_DIR, 'index.html')
+    return os.path.join(OUTPUT_DIR, LISTING_PAGES_DIR, str(number), 'index.html')
 
-def build_blogs():
-    blogs_dir = '_blogs'
-    output_dir = 'blogs'
-    base_template_path = 'index.html'
-    
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-        
-    md = markdown.Markdown(extensions=['fenced_code', 'codehilite', 'tables'])
-    
-    with open(base_template_path, 'r', encoding='utf-8') as f:
-        base_html = f.read()
-        
-    blogs = []
-    
-    # Process each markdown file
-    for filepath in glob.glob(os.path.join(blogs_dir, '*.md')):
-        with open(filepath, 'r', encoding='utf-8') as f:
-            post = frontmatter.load(f)
-            
-        slug = os.path.splitext(os.path.basename(filepath))[0]
-        title = post.get('title', slug)
-        date = post.get('date', '')
-        description = post.get('description', '')
-        tags = post.get('tags', [])
-        
-        # Convert markdown to html
-        html_content = md.convert(post.content)
-        
-        blogs.append({
-            'slug': slug,
-            'title': title,
-            'date': date,
-            'description': description,
-            'tags': tags,
-            'html_content': html_content
+
+def _listing_url(number: int) -> str:
+    return '/blogs/' if number == 1 else f'/blogs/{LISTING_PAGES_DIR}/{number}/'
+
+
+def write_blog_index(blogs: list, page_size: int) -> None:
+    """
+    Writes the blogs.json index, split into pages of page_size posts.
+
+    The first page lives at blogs.json and every page links to the next one,
+    so clients only download as much of the index as they need.
+
+    :param blogs: Index entries of every post, already sorted
+    :param page_size: Maximum number of posts per page
+    """
+    pages_dir = os.path.join(DATA_DIR, 'pages')
+    pages = [blogs[i:i + page_size] for i in range(0, len(blogs), page_size)] or [[]]
+
+    for number, posts in enumerate(pages, start=1):
+        path = DATA_PATH if number == 1 else os.path.join(pages_dir, f'{number}.json')
+        _write_json(path, {
+            'page': number,
+            'pages': len(pages),
+            'total': len(blogs),
+            'next': f'{DATA_URL}/pages/{number + 1}.json' if number < len(pages) else None,
+            'posts': posts
         })
-        
-        # Create individual blog endpoint
-        blog_output_dir = os.path.join(output_dir, slug)
-        if not os.path.exists(blog_output_dir):
-            os.makedirs(blog_output_dir)
-            
+
+    # Drop pages left over from a larger index
+    for path in glob.glob(os.path.join(pages_dir, '*.json')):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if not name.isdigit() or not 1 < int(name) <= len(pages):
+            os.remove(path)
+
+
+class PageTemplate:
+    """
+    The index.html template, parsed once and split into literal HTML and named slots.
+
+    Rendering a page only escapes the slot values and joins the pieces, so
+    no HTML is parsed or walked per page.
+    """
+
+    _SLOT_RE = re.compile('"\x00a:(\\w+)\x00"|\x00([tr]):(\\w+)\x00')
+    _FORMATTER = HTMLFormatter.REGISTRY['minimal']
+
+    def __init__(self, base_html: str):
         soup = BeautifulSoup(base_html, 'html.parser')
-        
+
         # Update title and meta
         if soup.title:
-            soup.title.string = f"{title} | Asif Sayyed Portfolio"
-            
-        # Update meta tags
+            soup.title.string = self._slot('t', 'title')
+
         for meta in soup.find_all('meta'):
             if meta.get('name') in ['title', 'twitter:title']:
-                meta['content'] = f"{title} | Asif Sayyed Portfolio"
+                meta['content'] = self._slot('a', 'title')
             elif meta.get('property') == 'og:title':
-                meta['content'] = f"{title} | Asif Sayyed Portfolio"
+                meta['content'] = self._slot('a', 'title')
             elif meta.get('name') in ['description', 'twitter:description']:
-                meta['content'] = description
+                meta['content'] = self._slot('a', 'description')
             elif meta.get('property') == 'og:description':
-                meta['content'] = description
+                meta['content'] = self._slot('a', 'description')
             elif meta.get('property') == 'og:url':
-                meta['content'] = f"https://sayyedasif.com/blogs/{slug}/"
-                
+                meta['content'] = self._slot('a', 'url')
+
         # Update canonical
         canonical = soup.find('link', rel='canonical')
         if canonical:
-            canonical['href'] = f"https://sayyedasif.com/blogs/{slug}/"
-        
-        # Update active nav link
-        for nav_link in soup.find_all('a', class_='navbar-link'):
-            nav_link['class'] = [c for c in nav_link.get('class', []) if c != 'active']
-            if nav_link.text.lower() == 'events': # Temp, we'll replace the nav entirely later
-                pass
-                
-        # Inject blog content
+            canonical['href'] = self._slot('a', 'url')
+
+        # Extra tags for the head, e.g. the highlight stylesheet of posts with code
+        if soup.head:
+            soup.head.append(self._slot('r', 'head'))
+
+        # Each nav link gets a slot for its class list, filled per page
+        self.nav_links = {}
+        for index, nav_link in enumerate(soup.find_all('a', class_='navbar-link')):
+            slot = f'nav_{index}'
+            classes = [c for c in nav_link.get('class', []) if c != 'active']
+            self.nav_links[slot] = (nav_link.text.lower(), classes)
+            nav_link['class'] = self._slot('a', slot)
+
+        # The article becomes the blog container
         article = soup.find('article')
         if article:
             article['class'] = 'blogs active'
-            article['data-page'] = 'blog-post'
+            article['data-page'] = self._slot('a', 'page')
             article.clear()
-            
-            header = soup.new_tag('header')
-            h2 = soup.new_tag('h2', attrs={'class': 'h2 article-title'})
-            h2.string = 'Blogs'
-            header.append(h2)
-            
-            section = soup.new_tag('section', attrs={'class': 'blog-content-section'})
-            
-            h1 = soup.new_tag('h1', attrs={'class': 'blog-post-title'})
-            h1.string = title
-            section.append(h1)
-            
-            # The back button
-            back_btn = soup.new_tag('a', href='/blogs/', attrs={'class': 'blog-back-btn', 'style': 'display: inline-block; margin-bottom: 20px; color: var(--vibrant-green); text-decoration: none;'})
-            back_btn.string = '← Back to Blogs'
-            section.append(back_btn)
-            
-            if date:
-                date_div = soup.new_tag('div', attrs={'style': 'color: var(--light-gray-70); font-size: 14px; margin-bottom: 20px;'})
-                date_div.string = f"Published: {date}"
-                section.append(date_div)
-            
-            # The content
-            content_div = soup.new_tag('div', attrs={'class': 'blog-post-content'})
-            content_div.append(BeautifulSoup(html_content, 'html.parser'))
-            section.append(content_div)
-            
-            article.append(header)
-            article.append(section)
-            
-        blog_html = str(soup).replace('./assets/', '../../assets/')
-            
-        with open(os.path.join(blog_output_dir, 'index.html'), 'w', encoding='utf-8') as f:
-            f.write(blog_html)
-            
-    # Sort blogs by date descending
-    blogs.sort(key=lambda x: x.get('date', ''), reverse=True)
-
-    # Now generate the main /blogs/index.html
-    soup = BeautifulSoup(base_html, 'html.parser')
-    
-    # Update title and meta
-    if soup.title:
-        soup.title.string = "Blogs | Asif Sayyed Portfolio"
-        
-    for meta in soup.find_all('meta'):
-        if meta.get('name') in ['title', 'twitter:title']:
-            meta['content'] = "Blogs | Asif Sayyed Portfolio"
-        elif meta.get('property') == 'og:title':
-            meta['content'] = "Blogs | Asif Sayyed Portfolio"
-        elif meta.get('name') in ['description', 'twitter:description']:
-            meta['content'] = "Read Asif Sayyed's latest articles and blogs on data science, machine learning, and programming."
-        elif meta.get('property') == 'og:description':
-            meta['content'] = "Read Asif Sayyed's latest articles and blogs on data science, machine learning, and programming."
-        elif meta.get('property') == 'og:url':
-            meta['content'] = "https://sayyedasif.com/blogs/"
-            
-    canonical = soup.find('link', rel='canonical')
-    if canonical:
-        canonical['href'] = "https://sayyedasif.com/blogs/"
-        
-    # Update active nav link
-    for nav_link in soup.find_all('a', class_='navbar-link'):
-        nav_link['class'] = [c for c in nav_link.get('class', []) if c != 'active']
-        if 'blogs' in nav_link.text.lower():
-            nav_link['class'].append('active')
-    
-    article = soup.find('article')
-    if article:
-        article['class'] = 'blogs active'
-        article['data-page'] = 'blogs'
-        article.clear()
-        
-        header = soup.new_tag('header')
-        h2 = soup.new_tag('h2', attrs={'class': 'h2 article-title'})
-        h2.string = 'Blogs'
-        header.append(h2)
-        
-        section = soup.new_tag('section', attrs={'class': 'blogs'})
-        
-        list_container = soup.new_tag('div', attrs={'class': 'pf-v6-c-simple-list'})
-        ul = soup.new_tag('ul', attrs={'class': 'pf-v6-c-simple-list__list', 'role': 'list'})
-        
-        for blog in blogs:
-            li = soup.new_tag('li', attrs={'class': 'pf-v6-c-simple-list__item'})
-            a_tag = soup.new_tag('a', href=f"../blogs/{blog['slug']}/", attrs={
-                'class': 'pf-v6-c-simple-list__item-link'
-            })
-            content_wrapper = soup.new_tag('div', attrs={'class': 'pf-v6-c-simple-list__item-content'})
-            
-            title_span = soup.new_tag('span', attrs={'class': 'pf-v6-c-simple-list__item-title'})
-            title_span.string = blog['title']
-            content_wrapper.append(title_span)
-            
-            if blog.get('tags'):
-                tags_div = soup.new_tag('div', attrs={'class': 'project-tags'})
-                for tag in blog['tags']:
-                    tag_span = soup.new_tag('span', attrs={'class': 'tag'})
-                    tag_span.string = tag
-                    tags_div.append(tag_span)
-                content_wrapper.append(tags_div)
-                
-            a_tag.append(content_wrapper)
-            
-            if blog['date']:
-                date_span = soup.new_tag('span', attrs={'class': 'pf-v6-c-simple-list__item-date'})
-                date_span.string = blog['date']
-                a_tag.append(date_span)
-            li.append(a_tag)
-            ul.append(li)
-            
-        list_container.append(ul)
-        section.append(list_container)
-        
-        article.append(header)
-        article.append(section)
-        
-    with open(os.path.join(output_dir, 'index.html'), 'w', encoding='utf-8') as f:
-        f.write(str(soup).replace('./assets/', '../assets/'))
-        
-    # Write JSON for dynamic loading if needed
-    os.makedirs('assets/data', exist_ok=True)
-    with open('assets/data/blogs.json', 'w', encoding='utf-8') as f:
-        # Avoid saving full HTML to json if it gets big, but for dynamic popout it might be easiest
-        json.dump(blogs, f, indent=4)
+            article.append(self._slot('r', 'article'))
+
+        self.segments = []
+        html = str(soup)
+        position = 0
+        for match in self._SLOT_RE.finditer(html):
+            self.segments.append(html[position:match.start()])
+            if match.group(1):
+                self.segments.append(('a', match.group(1)))
+            else:
+                self.segments.append((match.group(2), match.group(3)))
+            position = match.end()
+        self.segments.append(html[position:])
+
+    @staticmethod
+    def _slot(kind: str, name: str) -> str:
+        return f'\x00{kind}:{name}\x00'
+
+    def render(self, title: str, description: str, url: str, page: str, article_html: str,
+               active_nav: str = None, head_html: str = '') -> str:
+        """
+        Fills the slots of the template.
+
+        :param title: Page title used for <title> and the title meta tags
+        :param description: Meta description
+        :param url: Canonical and og:url of the page
+        :param page: Value of the article's data-page attribute
+        :param article_html: Serialized HTML placed inside the article
+        :param active_nav: Text of the nav link to mark active, if any
+        :param head_html: Serialized HTML appended to the head
+        :return: HTML of the page
+        """
+        values = {'title': title, 'description': description, 'url': url, 'page': page, 'article': article_html,
+                  'head': head_html}
+        for slot, (text, classes) in self.nav_links.items():
+            active = active_nav is not None and active_nav in text
+            values[slot] = ' '.join(classes + ['active'] if active else classes)
+
+        parts = []
+        for segment in self.segments:
+            if isinstance(segment, str):
+                parts.append(segment)
+                continue
+            kind, name = segment
+            value = values[name]
+            if kind == 'a':
+                parts.append(self._FORMATTER.quoted_attribute_value(self._FORMATTER.attribute_value(value)))
+            elif kind == 't':
+                parts.append(self._FORMATTER.substitute(value))
+            else:
+                parts.append(value)
+        return ''.join(parts)
+
+
+def render_post_page(template: PageTemplate, blog: dict) -> str:
+    """
+    Renders the standalone page of a single blog post.
+
+    :param template: Compiled page template
+    :param blog: Post metadata and rendered content
+    :return: HTML of the post page
+    """
+    slug = blog['slug']
+    title = blog['title']
+    date = blog['date']
+
+    soup = BeautifulSoup('', 'html.parser')
+
+    header = soup.new_tag('header')
+    h2 = soup.new_tag('h2', attrs={'class': 'h2 article-title'})
+    h2.string = 'Blogs'
+    header.append(h2)
+
+    section = soup.new_tag('section', attrs={'class': 'blog-content-section'})
+
+    h1 = soup.new_tag('h1', attrs={'class': 'blog-post-title'})
+    h1.string = title
+    section.append(h1)
+
+    # The back button
+    back_btn = soup.new_tag('a', href='/blogs/', attrs={'class': 'blog-back-btn', 'style': 'display: inline-block; margin-bottom: 20px; color: var(--vibrant-green); text-decoration: none;'})
+    back_btn.string = '← Back to Blogs'
+    section.append(back_btn)
+
+    if date:
+        date_div = soup.new_tag('div', attrs={'style': 'color: var(--light-gray-70); font-size: 14px; margin-bottom: 20px;'})
+        date_div.string = f"Published: {date}"
+        section.append(date_div)
+
+    # The content
+    content_div = soup.new_tag('div', attrs={'class': 'blog-post-content'})
+    content_div.append(BeautifulSoup(blog['html_content'], 'html.parser'))
+    section.append(content_div)
+
+    head_html = ''
+    if 'class="codehilite"' in blog['html_content']:
+        head_html = f'<link href="{code_highlight.STYLESHEET_URL}" rel="stylesheet"/>\n'
+
+    html = template.render(
+        title=f"{title} | Asif Sayyed Portfolio",
+        description=blog['description'],
+        url=f"https://sayyedasif.com/blogs/{slug}/",
+        page='blog-post',
+        article_html=str(header) + str(section),
+        head_html=head_html
+    )
+    return html.replace('./assets/', '../../assets/')
+
+
+def _pagination(soup: BeautifulSoup, number: int, pages: int) -> object:
+    """
+    Builds the newer/older links between the listing pages.
+    """
+    nav = soup.new_tag('nav', attrs={'class': 'blog-pagination', 'aria-label': 'Blog pages'})
+    if number > 1:
+        newer = soup.new_tag('a', href=_listing_url(number - 1), rel='prev', attrs={'class': 'blog-pagination-link'})
+        newer.string = '← Newer posts'
+        nav.append(newer)
+    status = soup.new_tag('span', attrs={'class': 'blog-pagination-status'})
+    status.string = f'Page {number} of {pages}'
+    nav.append(status)
+    if number < pages:
+        older = soup.new_tag('a', href=_listing_url(number + 1), rel='next', attrs={'class': 'blog-pagination-link'})
+        older.string = 'Older posts →'
+        nav.append(older)
+    return nav
+
+
+def render_listing_page(template: PageTemplate, blogs: list, number: int = 1, pages: int = 1) -> str:
+    """
+    Renders a page of the /blogs/ listing.
+
+    :param template: Compiled page template
+    :param blogs: Posts of this page, already sorted
+    :param number: Number of the page, 1 is /blogs/ itself
+    :param pages: Total number of listing pages
+    :return: HTML of the listing page
+    """
+    # Relative paths from /blogs/ or /blogs/page/N/ back to the site root
+    root = '../' if number == 1 else '../../../'
+    soup = BeautifulSoup('', 'html.parser')
+
+    header = soup.new_tag('header')
+    h2 = soup.new_tag('h2', attrs={'class': 'h2 article-title'})
+    h2.string = 'Blogs'
+    header.append(h2)
+
+    section = soup.new_tag('section', attrs={'class': 'blogs'})
+
+    # Search box, results are rendered by script.js from assets/data/search/
+    search_box = soup.new_tag('div', attrs={'class': 'blog-search'})
+    search_box.append(soup.new_tag('input', attrs={
+        'type': 'search',
+        'class': 'form-input',
+        'placeholder': 'Search posts',
+        'aria-label': 'Search posts',
+        'data-blog-search': ''
+    }))
+    section.append(search_box)
+
+    results_container = soup.new_tag('div', attrs={'class': 'pf-v6-c-simple-list', 'data-blog-search-results': '', 'hidden': ''})
+    results_container.append(soup.new_tag('ul', attrs={'class': 'pf-v6-c-simple-list__list', 'role': 'list'}))
+    section.append(results_container)
+
+    empty_message = soup.new_tag('p', attrs={'class': 'blog-search-empty', 'data-blog-search-empty': '', 'hidden': ''})
+    empty_message.string = 'No posts match your search.'
+    section.append(empty_message)
+
+    list_container = soup.new_tag('div', attrs={'class': 'pf-v6-c-simple-list', 'data-blog-list': ''})
+    ul = soup.new_tag('ul', attrs={'class': 'pf-v6-c-simple-list__list', 'role': 'list'})
+
+    for blog in blogs:
+        li = soup.new_tag('li', attrs={'class': 'pf-v6-c-simple-list__item'})
+        a_tag = soup.new_tag('a', href=f"{root}blogs/{blog['slug']}/", attrs={
+            'class': 'pf-v6-c-simple-list__item-link'
+        })
+        content_wrapper = soup.new_tag('div', attrs={'class': 'pf-v6-c-simple-list__item-content'})
+
+        title_span = soup.new_tag('span', attrs={'class': 'pf-v6-c-simple-list__item-title'})
+        title_span.string = blog['title']
+        content_wrapper.append(title_span)
+
+        if blog.get('tags'):
+            tags_div = soup.new_tag('div', attrs={'class': 'project-tags'})
+            for tag in blog['tags']:
+                tag_span = soup.new_tag('span', attrs={'class': 'tag'})
+                tag_span.string = tag
+                tags_div.append(tag_span)
+            content_wrapper.append(tags_div)
+
+        a_tag.append(content_wrapper)
+
+        if blog['date']:
+            date_span = soup.new_tag('span', attrs={'class': 'pf-v6-c-simple-list__item-date'})
+            date_span.string = blog['date']
+            a_tag.append(date_span)
+        li.append(a_tag)
+        ul.append(li)
+
+    list_container.append(ul)
+    if pages > 1:
+        # Inside the list, so it is hidden together with it while searching
+        list_container.append(_pagination(soup, number, pages))
+    section.append(list_container)
+
+    html = template.render(
+        title="Blogs | Asif Sayyed Portfolio" if number == 1 else f"Blogs, page {number} | Asif Sayyed Portfolio",
+        description="Read Asif Sayyed's latest articles and blogs on data science, machine learning, and programming.",
+        url=f"https://sayyedasif.com{_listing_url(number)}",
+        page='blogs',
+        article_html=str(header) + str(section),
+        active_nav='blogs'
+    )
+    return html.replace('./assets/', f'{root}assets/')
+
+
+def write_listing_pages(template: PageTemplate, blogs: list, page_size: int) -> int:
+    """
+    Writes the /blogs/ listing split into pages of page_size posts, one page at a time.
+
+    :param template: Compiled page template
+    :param blogs: Index entries of every post, already sorted
+    :param page_size: Maximum number of posts per listing page
+    :return: Number of listing pages
+    """
+    pages = max(1, -(-len(blogs) // page_size))
+    for number in range(1, pages + 1):
+        path = _listing_path(number)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(render_listing_page(template, blogs[(number - 1) * page_size:number * page_size], number, pages))
+
+    # Drop pages left over from a longer listing, and the directory once the listing fits on /blogs/
+    pages_dir = os.path.join(OUTPUT_DIR, LISTING_PAGES_DIR)
+    if os.path.isdir(pages_dir):
+        for name in os.listdir(pages_dir):
+            if not name.isdigit() or not 1 < int(name) <= pages:
+                shutil.rmtree(os.path.join(pages_dir, name), ignore_errors=True)
+        if not os.listdir(pages_dir):
+            os.rmdir(pages_dir)
+    return pages
+
+
+# Per-process state of the render workers, set up by _init_worker
+_worker = {}
+
+
+def _init_worker(template: PageTemplate) -> None:
+    """
+    Sets up a render worker with its own Markdown converter.
+
+    :param template: Compiled page template shared by every page
+    """
+    _worker['template'] = template
+    _worker['md'] = markdown.Markdown(extensions=['fenced_code', 'codehilite', 'tables', CachedHighlightExtension()])
+
+
+def _render_post(job: tuple) -> tuple:
+    """
+    Parses, converts and writes a single post. Runs inside a render worker.
+
+    :param job: Tuple of (slug, Markdown source path, output path)
+    :return: Tuple of (slug, front matter hash, post metadata, content hash, search terms)
+    """
+    slug, source_path, output_path = job
+    # Read here rather than shipped with the job, so no source is held while others render
+    with open(source_path, 'r', encoding='utf-8') as f:
+        post = frontmatter.loads(f.read())
+
+    # Convert markdown to html
+    md = _worker['md']
+    md.reset()
+    html_content = md.convert(post.content)
+
+    meta = {
+        'slug': slug,
+        'title': post.get('title', slug),
+        'date': post.get('date', ''),
+        'description': post.get('description', ''),
+        'tags': post.get('tags', [])
+    }
+
+    # Create individual blog endpoint
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(render_post_page(_worker['template'], dict(meta, html_content=html_content)))
+
+    # The post body is served separately from the index
+    content_hash = _content_hash(meta, html_content)
+    _write_json(_shard_path(slug), dict(meta, hash=content_hash, html_content=html_content))
+
+    return slug, _hash_front_matter(post.metadata), meta, content_hash, extract_terms(meta, html_content)
+
+
+def _render_posts(jobs: list, template: PageTemplate, workers: int):
+    """
+    Renders posts either in this process or across a process pool.
+
+    :param jobs: Render jobs as accepted by _render_post
+    :param template: Compiled page template
+    :param workers: Number of worker processes, 1 renders serially
+    :return: Generator of (result of _render_post, timing), in the order of jobs, as each post is done
+    """
+    if not jobs:
+        # Setting up a worker imports Pygments, which is wasted when nothing changed
+        return
+    render = partial(timed, _render_post)
+    if workers <= 1 or len(jobs) <= 1:
+        _init_worker(template)
+        yield from map(render, jobs)
+        return
+
+    workers = min(workers, len(jobs))
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(template,)) as executor:
+        yield from executor.map(render, jobs, chunksize=chunksize)
+
+
+def build_blogs(force: bool = False, workers: int = 1, index_page_size: int = INDEX_PAGE_SIZE,
+                listing_page_size: int = LISTING_PAGE_SIZE, profiler: Profiler = NULL_PROFILER) -> None:
+    """
+    Builds the blog post pages, the /blogs/ listing pages and the blog data files.
+
+    :param force: Ignore the manifest and rebuild every post
+    :param workers: Number of processes used to render posts
+    :param index_page_size: Number of posts per page of the blogs.json index
+    :param listing_page_size: Number of posts per page of the /blogs/ listing
+    :param profiler: Records the phases and the rendering of each post
+    """
+    if not os.path.exists(OUTPUT_DIR):
+        os.makedirs(OUTPUT_DIR)
+
+    with profiler.phase('load template'):
+        with open(TEMPLATE_PATH, 'r', encoding='utf-8') as f:
+            base_html = f.read()
+        template = PageTemplate(base_html)
+
+    if code_highlight.write_stylesheet():
+        print(f"Built highlight stylesheet: {code_highlight.STYLESHEET_PATH}")
+
+    template_hash = _hash_bytes(base_html.encode('utf-8'))
+    search = SearchIndex(SEARCH_DIR)
+    if force or not search.exists:
+        previous = {'posts': {}}
+    else:
+        previous = load_manifest(MANIFEST_PATH)
+    template_changed = previous.get('template') != template_hash
+    previous_posts = previous['posts']
+    if not previous_posts:
+        # Without a manifest the postings of the old index can't be traced back
+        search = SearchIndex(SEARCH_DIR, reset=True)
+
+    manifest = {'version': BUILD_VERSION, 'template': template_hash, 'posts': {}}
+    blogs_by_slug = {}
+    source_hashes = {}
+    jobs = []
+    listing_changed = template_changed
+
+    # Collect the posts that need rebuilding
+    with profiler.phase('scan sources'):
+        for filepath in sorted(glob.glob(os.path.join(BLOGS_DIR, '*.md'))):
+            with open(filepath, 'r', encoding='utf-8') as f:
+                source = f.read()
+
+            slug = os.path.splitext(os.path.basename(filepath))[0]
+            if slug == LISTING_PAGES_DIR:
+                raise SystemExit(f"{filepath}: the slug '{slug}' is reserved for the listing pages "
+                                 f"(/blogs/{LISTING_PAGES_DIR}/N/), rename the post.")
+            source_hash = _hash_bytes(source.encode('utf-8'))
+            blog_output_path = os.path.join(OUTPUT_DIR, slug, 'index.html')
+            entry = previous_posts.get(slug)
+
+            if (not template_changed and entry and entry['source'] == source_hash
+                    and os.path.exists(blog_output_path) and os.path.exists(_shard_path(slug))):
+                # Nothing this post depends on has changed, reuse the previous build
+                manifest['posts'][slug] = entry
+                blogs_by_slug[slug] = dict(entry['meta'], hash=entry['hash'])
+                continue
+
+            source_hashes[slug] = source_hash
+            jobs.append((slug, filepath, blog_output_path))
+
+    # Each post's search terms are indexed as soon as it is rendered, then dropped
+    with profiler.phase('render and index posts', posts=len(jobs), workers=workers):
+        for (slug, front_matter_hash, meta, content_hash, terms), timing in _render_posts(jobs, template, workers):
+            profiler.add_item('post', slug, timing)
+            entry = previous_posts.get(slug)
+            if not entry or entry['front_matter'] != front_matter_hash:
+                listing_changed = True
+
+            if entry:
+                search.remove(slug, entry.get('search_shards', []))
+            search_shards = search.add(slug, meta['title'], meta['date'], terms)
+
+            blogs_by_slug[slug] = dict(meta, hash=content_hash)
+            manifest['posts'][slug] = {
+                'source': source_hashes[slug],
+                'front_matter': front_matter_hash,
+                'hash': content_hash,
+                'search_shards': search_shards,
+                'meta': meta
+            }
+            print(f"Built post: {slug}")
+
+        # Remove the pages of posts whose source was deleted
+        for slug in sorted(previous_posts.keys() - manifest['posts'].keys()):
+            shutil.rmtree(os.path.join(OUTPUT_DIR, slug), ignore_errors=True)
+            if os.path.exists(_shard_path(slug)):
+                os.remove(_shard_path(slug))
+            search.remove(slug, previous_posts[slug].get('search_shards', []))
+            listing_changed = True
+            print(f"Removed post: {slug}")
+
+        if jobs or listing_changed or not search.exists:
+            search.save()
+
+    listing_path = _listing_path(1)
+    index_changed = previous.get('index_page_size') != index_page_size
+    if previous.get('listing_page_size') != listing_page_size:
+        listing_changed = True
+    manifest['index_page_size'] = index_page_size
+    manifest['listing_page_size'] = listing_page_size
+    if (not jobs and not listing_changed and not index_changed
+            and os.path.exists(listing_path) and os.path.exists(DATA_PATH)):
+        print("Blogs are up to date.")
+        save_manifest(MANIFEST_PATH, manifest)
+        return
+
+    with profiler.phase('write listing and index'):
+        # Sort blogs by date descending, ties keep slug order so the output is deterministic
+        blogs = [blogs_by_slug[slug] for slug in sorted(blogs_by_slug)]
+        blogs.sort(key=lambda x: x.get('date', ''), reverse=True)
+
+        # Now generate /blogs/index.html and the older pages
+        if listing_changed or not os.path.exists(listing_path):
+            pages = write_listing_pages(template, blogs, listing_page_size)
+            print(f"Built listing: {listing_path} ({pages} page{'s' if pages > 1 else ''})")
+
+        # Write the index for dynamic loading, post bodies are in the shards
+        write_blog_index(blogs, index_page_size)
+
+        save_manifest(MANIFEST_PATH, manifest)
+    print(f"Rebuilt {len(jobs)} of {len(blogs)} posts.")
+
 
 if __name__ == '__main__':
-    build_blogs()
+    parser = argparse.ArgumentParser(description="Build the blog pages from _blogs/*.md.")
+    parser.add_argument('--force', action='store_true', help="Ignore the build manifest and rebuild every post")
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help="Number of processes used to render posts (0 uses every CPU core)")
+    parser.add_argument('--index-page-size', type=int, default=INDEX_PAGE_SIZE,
+                        help="Number of posts per page of the blogs.json index")
+    parser.add_argument('--listing-page-size', type=int, default=LISTING_PAGE_SIZE,
+                        help="Number of posts per page of the /blogs/ listing")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    with Profiler.from_args('build_blogs', args) as profiler:
+        build_blogs(force=args.force, workers=args.jobs or os.cpu_count(), index_page_size=args.index_page_size,
+                    listing_page_size=args.listing_page_size, profiler=profiler)
@@ -0,0 +1,152 @@
+"""
+This module caches the Pygments highlighting of fenced code blocks.
+
+Highlighting is the slowest part of rendering a code-heavy post, and blocks
+without a language are first run through every lexer to guess one. The
+CachedHighlightExtension highlights fenced blocks exactly like fenced_code
+with codehilite would, but keeps the HTML of each block in .cache/highlight/,
+keyed on the language, the code, the Pygments version and the codehilite
+options. Unchanged snippets are never lexed again.
+
+Blocks with attributes or hl_lines are left to fenced_code. The colors come
+from one shared stylesheet, assets/css/highlight.min.css, written by
+write_stylesheet().
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import pygments
+from markdown.extensions import Extension
+from markdown.extensions.codehilite import CodeHilite, CodeHiliteExtension
+from markdown.extensions.fenced_code import FencedBlockPreprocessor
+from markdown.preprocessors import Preprocessor
+from pygments.formatters import HtmlFormatter
+
+import css_minifier
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(BASE_DIR, '.cache', 'highlight')
+STYLESHEET_PATH = os.path.join(BASE_DIR, 'assets', 'css', 'highlight.min.css')
+STYLESHEET_URL = './assets/css/highlight.min.css'
+# Pygments style of the shared stylesheet, the block background comes from style.css
+STYLE = 'monokai'
+
+
+class HighlightCache:
+    """
+    Highlighted HTML of code blocks, one file per block so render workers never write the same file.
+
+    :param cache_dir: Directory of the cache
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def key(lang: str, code: str, options: dict) -> str:
+        data = json.dumps([lang, code, pygments.__version__, options], sort_keys=True, default=str)
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> str:
+        try:
+            with open(os.path.join(self.cache_dir, key + '.html'), 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, html: str) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(html)
+        os.replace(tmp_path, os.path.join(self.cache_dir, key + '.html'))
+
+
+class CachedFencedCodePreprocessor(Preprocessor):
+    """
+    Stashes the highlighted HTML of plain fenced code blocks, from the cache when possible.
+    """
+
+    def __init__(self, md, cache: HighlightCache):
+        super().__init__(md)
+        self.cache = cache
+
+    def _options(self) -> dict:
+        for extension in self.md.registeredExtensions:
+            if isinstance(extension, CodeHiliteExtension):
+                return extension.getConfigs()
+        return None
+
+    def run(self, lines: list) -> list:
+        options = self._options()
+        if not options or not options['use_pygments']:
+            return lines
+
+        text = '\n'.join(lines)
+        index = 0
+        while True:
+            match = FencedBlockPreprocessor.FENCED_BLOCK_RE.search(text, index)
+            if not match:
+                break
+            if match.group('attrs') or match.group('hl_lines'):
+                # Left for fenced_code
+                index = match.end()
+                continue
+
+            lang = match.group('lang')
+            code = match.group('code')
+            key = self.cache.key(lang, code, options)
+            html = self.cache.get(key)
+            if html is None:
+                # Same call as fenced_code makes, so cached and uncached output are identical
+                config = dict(options)
+                html = CodeHilite(code, lang=lang, style=config.pop('pygments_style', 'default'),
+                                  **config).hilite(shebang=False)
+                self.cache.put(key, html)
+
+            placeholder = self.md.htmlStash.store(html)
+            text = f'{text[:match.start()]}\n{placeholder}\n{text[match.end():]}'
+            index = match.start() + 1 + len(placeholder)
+        return text.split('\n')
+
+
+class CachedHighlightExtension(Extension):
+    """
+    Markdown extension caching the highlighting of fenced code. Use together with fenced_code and codehilite.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, **kwargs):
+        self.cache = HighlightCache(cache_dir)
+        super().__init__(**kwargs)
+
+    def extendMarkdown(self, md) -> None:
+        # Runs just before fenced_code (priority 25)
+        md.preprocessors.register(CachedFencedCodePreprocessor(md, self.cache), 'cached_fenced_code', 26)
+
+
+def write_stylesheet(path: str = STYLESHEET_PATH, style: str = STYLE, css_class: str = 'codehilite') -> bool:
+    """
+    Writes the minified highlight stylesheet shared by every post.
+
+    :param path: Output path
+    :param style: Pygments style
+    :param css_class: Class of the highlighted blocks
+    :return: True if the file changed
+    """
+    formatter = HtmlFormatter(style=style)
+    # Only rules scoped to the block class, get_style_defs() would also restyle every <pre> of the page
+    scope = f'.{css_class}'
+    css = css_minifier.minify('\n'.join(formatter.get_background_style_defs(scope)
+                                        + formatter.get_token_style_defs(scope)))
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == css:
+                return False
+    except FileNotFoundError:
+        pass
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(css)
+    return True
@@ -0,0 +1,160 @@
+"""
+This script inlines the critical CSS of every built page and defers the rest.
+
+The first screen of a page is the sidebar, the navbar and the start of the
+active article. For each page the script collects the class names and ids
+of those elements, prunes style.min.css down to the rules that can match
+them (the same pruning minify_assets --prune does for the whole site) and
+inlines the result in a <style> in the <head>. The full stylesheet is then
+preloaded and applied once it arrives, with a <noscript> fallback.
+
+Tags are edited in place, leaving the rest of each page untouched, and
+running the script again is a no-op.
+"""
+
+import argparse
+import html
+import os
+from html.parser import HTMLParser
+
+import css_minifier
+import instrumentation
+from instrumentation import NULL_PROFILER, Profiler
+from site_pages import SITE_DIR, add_root_argument, find_pages, resolve_url
+
+STYLESHEET_PATH = os.path.join('assets', 'css', 'style.min.css')
+# Elements of the active article counted as the first screen, after that the page is below the fold
+FOLD_ELEMENTS = 60
+CRITICAL_ATTR = 'data-critical-css'
+
+
+class _FoldCollector(HTMLParser):
+    """
+    Collects the class names and ids above the fold and finds the stylesheet <link>.
+
+    :param stylesheet: Path of the stylesheet to defer
+    :param page_path: Path of the page, used to resolve the link
+    :param root: Root directory of the site
+    """
+
+    def __init__(self, stylesheet: str, page_path: str, root: str):
+        super().__init__(convert_charrefs=True)
+        self.stylesheet = stylesheet
+        self.page_path = page_path
+        self.root = root
+        self.names = set()
+        self.link = None  # ((line, column), tag text, href)
+        self.inlined = False
+        self._article_elements = None  # None until the first <article>
+        self._in_noscript = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'noscript':
+            self._in_noscript = True
+        elif tag == 'style' and CRITICAL_ATTR in attrs:
+            self.inlined = True
+        elif (tag == 'link' and not self._in_noscript and self.link is None
+              and 'stylesheet' in (attrs.get('rel') or '').lower().split()
+              and resolve_url(attrs.get('href') or '', self.page_path, self.root) == self.stylesheet):
+            self.link = (self.getpos(), self.get_starttag_text(), attrs['href'])
+
+        if tag == 'article' and self._article_elements is None:
+            self._article_elements = 0
+        if self._article_elements is not None:
+            self._article_elements += 1
+            if self._article_elements > FOLD_ELEMENTS:
+                return
+        for name in ('class', 'id'):
+            if attrs.get(name):
+                self.names.update(attrs[name].split())
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag == 'noscript':
+            self._in_noscript = False
+
+
+def deferred_link_html(href: str, critical_css: str) -> str:
+    """
+    Returns the inline critical CSS and the deferred loading of the full stylesheet.
+
+    :param href: URL of the full stylesheet, as written in the page
+    :param critical_css: Minified critical rules
+    :return: HTML replacing the original <link rel="stylesheet">
+    """
+    href = html.escape(href, quote=True)
+    # A '</' inside the rules would end the <style> element early
+    critical_css = critical_css.replace('</', '<\\/')
+    return (f'<style {CRITICAL_ATTR}>{critical_css}</style>'
+            f'<link rel="preload" href="{href}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+            f'<noscript><link rel="stylesheet" href="{href}"></noscript>')
+
+
+def rewrite_page(page_html: str, page_path: str, root: str, full_css: str, cache: dict) -> str:
+    """
+    Inlines the critical CSS of a page and defers its stylesheet.
+
+    :param page_html: HTML of the page
+    :param page_path: Path of the page
+    :param root: Root directory of the site
+    :param full_css: Content of the full stylesheet
+    :param cache: Critical CSS by set of names, shared between pages
+    :return: The rewritten HTML, unchanged if the page does not link the stylesheet or was already rewritten
+    """
+    collector = _FoldCollector(os.path.join(root, STYLESHEET_PATH), page_path, root)
+    collector.feed(page_html)
+    collector.close()
+    if collector.inlined or collector.link is None:
+        return page_html
+
+    names = frozenset(collector.names)
+    if names not in cache:
+        cache[names] = css_minifier.minify(full_css, set(names))
+
+    (line, column), tag_text, href = collector.link
+    start = sum(len(text) for text in page_html.splitlines(keepends=True)[:line - 1]) + column
+    if page_html[start:start + len(tag_text)] != tag_text:
+        return page_html
+    return page_html[:start] + deferred_link_html(href, cache[names]) + page_html[start + len(tag_text):]
+
+
+def inline_critical_css(root: str = SITE_DIR, profiler: Profiler = NULL_PROFILER) -> None:
+    """
+    Rewrites every page under root in place.
+
+    :param root: Root directory of the built site
+    :param profiler: Records the rewriting of each page
+    """
+    stylesheet_path = os.path.join(root, STYLESHEET_PATH)
+    if not os.path.exists(stylesheet_path):
+        print(f"No stylesheet at {stylesheet_path}, nothing to inline.")
+        return
+    with open(stylesheet_path, 'r', encoding='utf-8') as f:
+        full_css = f.read()
+
+    cache = {}
+    with profiler.phase('rewrite pages'):
+        for page_path in find_pages(root):
+            with profiler.item('page', os.path.relpath(page_path, root)) as item:
+                with open(page_path, 'r', encoding='utf-8') as f:
+                    page_html = f.read()
+                rewritten = rewrite_page(page_html, page_path, root, full_css, cache)
+                if rewritten != page_html:
+                    with open(page_path, 'w', encoding='utf-8') as f:
+                        f.write(rewritten)
+                    item['bytes'] = len(rewritten) - len(page_html)
+                    print(f"Inlined critical CSS in: {os.path.relpath(page_path, root)} "
+                          f"({len(rewritten) - len(page_html):,} bytes)")
+    print(f"{len(cache)} distinct critical stylesheet(s), full stylesheet is {len(full_css):,} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inline the critical CSS of every page and load style.min.css asynchronously.")
+    add_root_argument(parser)
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    with Profiler.from_args('critical_css', args) as profiler:
+        inline_critical_css(args.root, profiler=profiler)
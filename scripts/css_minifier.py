@@ -0,0 +1,442 @@
+"""
+This module minifies CSS with a small tokenizer and parser.
+
+Working on tokens rather than raw text keeps strings, url() values and calc()
+expressions intact. On top of whitespace and comment removal the minifier
+shortens values (numbers, hex colors, zero lengths, font weights), drops
+duplicate declarations and merges adjacent rules that share a selector or a
+declaration block. An optional pruning pass removes selectors whose classes
+or ids are not used by any page.
+"""
+
+import re
+
+# Token types, in the order they are tried
+TOKEN_RE = re.compile(r'''
+    (?P<ws>\s+)
+  | (?P<comment>/\*.*?(?:\*/|\Z))
+  | (?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+  | (?P<url>url\(\s*[^'"()\s]*\s*\))
+  | (?P<urange>[Uu]\+[0-9A-Fa-f?]+(?:-[0-9A-Fa-f]+)?)
+  | (?P<number>[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?(?:%|[a-zA-Z]+)?)
+  | (?P<at>@-?[a-zA-Z_][\w-]*)
+  | (?P<hash>\#[\w-]+)
+  | (?P<function>-?-?[a-zA-Z_\\][\w\\-]*\()
+  | (?P<ident>-?-?[a-zA-Z_\\](?:[\w-]|\\.)*|--[\w-]*)
+  | (?P<delim>.)
+''', re.S | re.X)
+
+NUMBER_RE = re.compile(r'^([+-]?)(\d*)(?:\.(\d*))?([eE][+-]?\d+)?(%|[a-zA-Z]+)?$')
+
+# At-rules whose block holds rules rather than declarations
+NESTED_AT_RULES = {'media', 'supports', 'document', '-moz-document', 'layer', 'container'}
+LENGTH_UNITS = {'px', 'em', 'rem', 'ex', 'ch', 'vw', 'vh', 'vmin', 'vmax', 'cm', 'mm', 'in', 'pt', 'pc', 'q'}
+FONT_WEIGHTS = {'normal': '400', 'bold': '700'}
+
+# Tokens whitespace can be dropped before / after, per context
+STRIP_BEFORE = {
+    'selector': {',', '>', '+', '~', ')', ']'},
+    'prelude': {',', ')'},
+    'value': {',', ')', '!', '/'},
+}
+STRIP_AFTER = {
+    'selector': {',', '>', '+', '~', '(', '['},
+    'prelude': {',', '(', ':'},
+    'value': {',', '(', '/'},
+}
+
+
+def tokenize(css: str) -> list:
+    """
+    Splits CSS into (type, text) tokens.
+
+    :param css: CSS source
+    :return: List of tokens, comments included
+    """
+    return [(match.lastgroup, match.group()) for match in TOKEN_RE.finditer(css)]
+
+
+def _split_block(tokens: list, start: int) -> tuple:
+    """
+    Returns the tokens between the '{' at start and its matching '}', and the index after it.
+    """
+    depth = 0
+    for index in range(start, len(tokens)):
+        kind, text = tokens[index]
+        if kind != 'delim':
+            continue
+        if text == '{':
+            depth += 1
+        elif text == '}':
+            depth -= 1
+            if depth == 0:
+                return tokens[start + 1:index], index + 1
+    return tokens[start + 1:], len(tokens)
+
+
+def _parse_declarations(tokens: list) -> list:
+    declarations = []
+    current = []
+    depth = 0
+    for token in tokens + [('delim', ';')]:
+        kind, text = token
+        if kind == 'delim' and text in '([':
+            depth += 1
+        elif kind == 'function':
+            depth += 1
+        elif kind == 'delim' and text in ')]':
+            depth -= 1
+        if kind == 'delim' and text == ';' and depth == 0:
+            colon = next((i for i, t in enumerate(current) if t == ('delim', ':')), None)
+            if colon is not None:
+                name = ''.join(t[1] for t in current[:colon] if t[0] not in ('ws', 'comment')).strip()
+                value = current[colon + 1:]
+                important = False
+                meaningful = [i for i, t in enumerate(value) if t[0] not in ('ws', 'comment')]
+                if (len(meaningful) >= 2 and value[meaningful[-2]] == ('delim', '!')
+                        and value[meaningful[-1]][1].lower() == 'important'):
+                    important = True
+                    value = value[:meaningful[-2]]
+                declarations.append({'property': name, 'value': value, 'important': important})
+            current = []
+            continue
+        current.append(token)
+    return declarations
+
+
+def parse(tokens: list) -> list:
+    """
+    Parses tokens into a list of rule nodes.
+
+    Qualified rules are {'type': 'rule', 'selector', 'declarations'}, at-rules
+    are {'type': 'at', 'name', 'prelude'} plus either 'rules', 'declarations'
+    or neither for statements such as @import.
+
+    :param tokens: Tokens from tokenize()
+    :return: List of nodes
+    """
+    nodes = []
+    index = 0
+    while index < len(tokens):
+        kind, text = tokens[index]
+        if kind in ('ws', 'comment') or (kind == 'delim' and text in ';}'):
+            index += 1
+            continue
+
+        prelude = []
+        while index < len(tokens) and not (tokens[index][0] == 'delim' and tokens[index][1] in '{;'):
+            prelude.append(tokens[index])
+            index += 1
+        terminator = tokens[index][1] if index < len(tokens) else ';'
+
+        if kind == 'at':
+            name = text[1:].lower()
+            node = {'type': 'at', 'name': name, 'prelude': prelude[1:]}
+            if terminator == '{':
+                block, index = _split_block(tokens, index)
+                if name in NESTED_AT_RULES or name.endswith('keyframes'):
+                    node['rules'] = parse(block)
+                else:
+                    node['declarations'] = _parse_declarations(block)
+            else:
+                index += 1
+            nodes.append(node)
+        elif terminator == '{':
+            block, index = _split_block(tokens, index)
+            nodes.append({'type': 'rule', 'selector': prelude, 'declarations': _parse_declarations(block)})
+        else:
+            # Stray tokens without a block are invalid CSS, browsers drop them too
+            index += 1
+    return nodes
+
+
+def _shorten_number(text: str, drop_zero_unit: bool) -> str:
+    match = NUMBER_RE.match(text)
+    if not match:
+        return text
+    sign, integer, fraction, exponent, unit = match.groups()
+    if exponent:
+        return text
+    integer = integer.lstrip('0')
+    fraction = (fraction or '').rstrip('0')
+    if not integer and not fraction:
+        if drop_zero_unit and unit and unit.lower() in LENGTH_UNITS:
+            unit = None
+        return '0' + (unit or '')
+    number = integer + ('.' + fraction if fraction else '')
+    return sign + number + (unit or '')
+
+
+def _shorten_hash(text: str) -> str:
+    digits = text[1:].lower()
+    if not re.fullmatch(r'[0-9a-f]{3,8}', digits):
+        return text
+    if len(digits) in (6, 8) and all(digits[i] == digits[i + 1] for i in range(0, len(digits), 2)):
+        digits = digits[::2]
+    return '#' + digits
+
+
+def serialize(tokens: list, context: str, shorten: bool = False, zero_lengths: bool = False) -> str:
+    """
+    Writes tokens back out with the least whitespace that keeps their meaning.
+
+    :param tokens: Tokens of a selector, at-rule prelude or declaration value
+    :param context: 'selector', 'prelude' or 'value'
+    :param shorten: Shorten numbers and hex colors (values only)
+    :param zero_lengths: Also drop the unit of zero lengths outside functions
+    :return: Minified text
+    """
+    strip_before = STRIP_BEFORE[context]
+    strip_after = STRIP_AFTER[context]
+    out = []
+    pending_space = False
+    depth = 0
+    for kind, text in tokens:
+        if kind == 'comment':
+            continue
+        if kind == 'ws':
+            pending_space = bool(out)
+            continue
+
+        if shorten:
+            if kind == 'number':
+                # Units only matter inside functions such as calc(), where 0 and 0px differ
+                text = _shorten_number(text, zero_lengths and depth == 0)
+            elif kind == 'hash':
+                text = _shorten_hash(text)
+
+        if pending_space:
+            previous = out[-1]
+            if not (text in strip_before or previous in strip_after or previous.endswith('(')):
+                out.append(' ')
+            pending_space = False
+        out.append(text)
+
+        if kind == 'function' or (kind == 'delim' and text == '('):
+            depth += 1
+        elif kind == 'delim' and text == ')':
+            depth = max(0, depth - 1)
+    return ''.join(out)
+
+
+def _declaration_text(declaration: dict) -> str:
+    prop = declaration['property']
+    custom = prop.startswith('--')
+    # Custom property values may end up in calc(), where a unitless zero is invalid
+    value = serialize(declaration['value'], 'value', shorten=True, zero_lengths=not custom)
+    if not custom and prop.lower() == 'font-weight':
+        value = FONT_WEIGHTS.get(value.lower(), value)
+    if not custom:
+        prop = prop.lower()
+    return f"{prop}:{value}{'!important' if declaration['important'] else ''}"
+
+
+def _dedupe_last(texts: list) -> list:
+    """
+    Keeps only the last of any exact duplicates, earlier ones can never win the cascade.
+    """
+    seen = set()
+    kept = []
+    for text in reversed(texts):
+        if text not in seen:
+            seen.add(text)
+            kept.append(text)
+    return kept[::-1]
+
+
+def _block_text(declarations: list) -> list:
+    return _dedupe_last([_declaration_text(d) for d in declarations])
+
+
+def split_selectors(selector: str) -> list:
+    """
+    Splits a selector list on its top-level commas.
+
+    :param selector: Minified selector list
+    :return: List of selectors
+    """
+    parts = []
+    depth = 0
+    current = ''
+    quote = None
+    for char in selector:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(current)
+            current = ''
+            continue
+        current += char
+    parts.append(current)
+    return parts
+
+
+def _can_merge_selectors(selector: str) -> bool:
+    # One unknown vendor pseudo-class invalidates the whole list it is merged into
+    return ':-' not in selector
+
+
+def _to_output(nodes: list) -> list:
+    """
+    Converts parsed nodes into serialized (header, body) nodes for merging.
+    """
+    output = []
+    for node in nodes:
+        if node['type'] == 'rule':
+            output.append({'kind': 'rule', 'selectors': split_selectors(serialize(node['selector'], 'selector')),
+                           'declarations': _block_text(node['declarations'])})
+            continue
+        prelude = serialize(node['prelude'], 'prelude')
+        header = f"@{node['name']}{' ' + prelude if prelude and not prelude.startswith('(') else prelude}"
+        if 'rules' in node:
+            output.append({'kind': 'nested', 'name': node['name'], 'header': header,
+                           'rules': _to_output(node['rules'])})
+        elif 'declarations' in node:
+            output.append({'kind': 'block', 'header': header, 'declarations': _block_text(node['declarations'])})
+        else:
+            output.append({'kind': 'statement', 'header': header})
+    return output
+
+
+def merge_rules(rules: list) -> list:
+    """
+    Merges adjacent rules that share their selectors or their declarations,
+    and adjacent at-rules with the same prelude. Only neighbours are merged so
+    the cascade order is unchanged.
+
+    :param rules: Output nodes from _to_output()
+    :return: Merged nodes
+    """
+    merged = []
+    for rule in rules:
+        previous = merged[-1] if merged else None
+        if rule['kind'] == 'nested':
+            rule['rules'] = merge_rules(rule['rules'])
+            if previous and previous['kind'] == 'nested' and previous['header'] == rule['header'] \
+                    and not rule['name'].endswith('keyframes'):
+                previous['rules'] = merge_rules(previous['rules'] + rule['rules'])
+                continue
+        elif rule['kind'] == 'rule' and previous and previous['kind'] == 'rule':
+            if previous['selectors'] == rule['selectors']:
+                previous['declarations'] = _dedupe_last(previous['declarations'] + rule['declarations'])
+                continue
+            if (previous['declarations'] == rule['declarations']
+                    and all(_can_merge_selectors(s) for s in previous['selectors'] + rule['selectors'])):
+                previous['selectors'] = list(dict.fromkeys(previous['selectors'] + rule['selectors']))
+                continue
+        merged.append(rule)
+    return merged
+
+
+def _write(rules: list) -> str:
+    parts = []
+    for rule in rules:
+        if rule['kind'] == 'rule':
+            if rule['declarations']:
+                parts.append(f"{','.join(rule['selectors'])}{{{';'.join(rule['declarations'])}}}")
+        elif rule['kind'] == 'nested':
+            body = _write(rule['rules'])
+            if body:
+                parts.append(f"{rule['header']}{{{body}}}")
+        elif rule['kind'] == 'block':
+            parts.append(f"{rule['header']}{{{';'.join(rule['declarations'])}}}")
+        else:
+            parts.append(f"{rule['header']};")
+    return ''.join(parts)
+
+
+def _strip_groups(selector: str) -> str:
+    """
+    Removes strings, attribute selectors and parenthesized arguments from a selector.
+    """
+    selector = re.sub(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'', '', selector)
+    result = ''
+    depth = 0
+    for char in selector:
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth = max(0, depth - 1)
+        elif depth == 0:
+            result += char
+    return result
+
+
+def selector_is_used(selector: str, names: set) -> bool:
+    """
+    Checks whether every class and id of a selector appears in names.
+
+    Arguments of functional pseudo-classes such as :not() are ignored, since a
+    missing class there can still match.
+
+    :param selector: A single selector
+    :param names: Class names and ids used by the site
+    :return: False only if the selector can not match anything
+    """
+    if '\\' in selector:
+        return True
+    stripped = _strip_groups(selector)
+    return all(name in names for name in re.findall(r'[.#](-?[a-zA-Z_][\w-]*)', stripped))
+
+
+def _animation_names(rules: list) -> set:
+    names = set()
+    for rule in rules:
+        if rule['kind'] == 'nested':
+            names |= _animation_names(rule['rules'])
+        for declaration in rule.get('declarations', []):
+            prop, _, value = declaration.partition(':')
+            if prop in ('animation', 'animation-name'):
+                names.update(re.findall(r'-?[a-zA-Z_][\w-]*', value))
+    return names
+
+
+def prune_rules(rules: list, names: set, animations: set = None) -> list:
+    """
+    Drops selectors that match no class or id in names, and @keyframes no rule animates.
+
+    :param rules: Output nodes from _to_output()
+    :param names: Class names and ids used by the site
+    :param animations: Animation names still referenced, None keeps every @keyframes
+    :return: Pruned nodes
+    """
+    pruned = []
+    for rule in rules:
+        if rule['kind'] == 'rule':
+            rule['selectors'] = [s for s in rule['selectors'] if selector_is_used(s, names)]
+            if not rule['selectors']:
+                continue
+        elif rule['kind'] == 'nested':
+            if rule['name'].endswith('keyframes'):
+                if animations is not None and rule['header'].split(' ', 1)[-1] not in animations:
+                    continue
+            else:
+                rule['rules'] = prune_rules(rule['rules'], names, animations)
+                if not rule['rules']:
+                    continue
+        pruned.append(rule)
+    return pruned
+
+
+def minify(css: str, used_names: set = None) -> str:
+    """
+    Minifies a stylesheet.
+
+    :param css: CSS source
+    :param used_names: Class names, ids and words used by the site. If given,
+        selectors that can not match them are pruned.
+    :return: Minified CSS
+    """
+    rules = _to_output(parse(tokenize(css)))
+    if used_names is not None:
+        rules = prune_rules(rules, used_names)
+        # Keyframes are only dropped once the rules that animate with them are gone
+        rules = prune_rules(rules, used_names, _animation_names(rules) | used_names)
+    return _write(merge_rules(rules))
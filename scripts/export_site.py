@@ -0,0 +1,80 @@
+"""
+This script copies the site into an output directory for the deploy rewrites.
+
+The deploy stages (prerender_sections, responsive_images, critical_css,
+fingerprint_assets, service_worker, minify_html) edit pages in place. Run on
+the working tree they would overwrite the sources: index.html is also the
+template of build_blogs. They run on the copy written here instead, by
+default _site/, which is what gets deployed.
+
+Only what is served is copied, picked by an allow-list at the root: the
+assets/ directory, every directory holding an index.html (the sections and
+blogs/), the root pages and the files crawlers and hosting read (CNAME,
+robots.txt, sitemap.xml, llms.txt). Scripts, tests, requirements, the budget,
+the README and licence, hidden and underscore directories (.git, .cache,
+_blogs, the output itself) stay out, and so do Markdown files, __pycache__
+and the image backups anywhere below. The output directory is emptied
+first, so every deploy starts from the sources.
+"""
+
+import argparse
+import os
+import shutil
+
+import instrumentation
+from instrumentation import NULL_PROFILER, Profiler
+from site_pages import BASE_DIR, SITE_DIR
+
+# Files served from the root, besides the pages
+SERVED_FILES = {'CNAME', 'robots.txt', 'sitemap.xml', 'llms.txt', 'llms-full.txt'}
+SERVED_EXTENSIONS = ('.html', '.xml', '.ico', '.webmanifest')
+ASSETS_DIR = 'assets'
+# Never served, at any depth
+EXCLUDED_NAMES = {'__pycache__', 'images_backup'}
+EXCLUDED_EXTENSIONS = ('.md', '.py', '.pyc')
+
+
+def _is_served_root_entry(name: str) -> bool:
+    path = os.path.join(BASE_DIR, name)
+    if name.startswith(('.', '_')):
+        return False
+    if os.path.isdir(path):
+        return name == ASSETS_DIR or os.path.isfile(os.path.join(path, 'index.html'))
+    return name in SERVED_FILES or name.lower().endswith(SERVED_EXTENSIONS)
+
+
+def _ignore(directory: str, names: list) -> set:
+    if os.path.abspath(directory) == BASE_DIR:
+        return {name for name in names if not _is_served_root_entry(name)}
+    return {name for name in names if name in EXCLUDED_NAMES or name.lower().endswith(EXCLUDED_EXTENSIONS)}
+
+
+def export_site(out: str = SITE_DIR, profiler: Profiler = NULL_PROFILER) -> None:
+    """
+    Replaces out with a copy of the served files of the working tree.
+
+    :param out: Output directory, outside the served files of the working tree
+    :param profiler: Records the copy
+    """
+    out = os.path.abspath(out)
+    if out == BASE_DIR or BASE_DIR.startswith(out + os.sep):
+        raise SystemExit(f"Refusing to export into {out}: the deploy stages would rewrite the sources.")
+    relative = os.path.relpath(out, BASE_DIR)
+    if not relative.startswith('..') and not relative.split(os.sep)[0].startswith(('.', '_')):
+        raise SystemExit(f"Refusing to export into {out}: use a hidden or underscore directory, "
+                         f"or one outside the repository, so it is not copied into itself.")
+
+    with profiler.phase('copy'):
+        if os.path.exists(out):
+            shutil.rmtree(out)
+        shutil.copytree(BASE_DIR, out, ignore=_ignore)
+    print(f"Exported the site to {out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy the served files into the directory the deploy stages rewrite.")
+    parser.add_argument('--out', default=SITE_DIR, help="Output directory (emptied first)")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    with Profiler.from_args('export_site', args) as profiler:
+        export_site(args.out, profiler=profiler)
@@ -1,9 +1,27 @@
+"""
+This script fetches the Credly badges linked from index.html and saves their
+images as WebP in assets/images/badges.
 
+Badges are processed concurrently, with a cap on requests per host. A manifest
+in .cache/ records the source and output hash of every badge, so badges whose
+image is already on disk are skipped on later runs.
+"""
+
+import argparse
+import hashlib
+import json
 import os
 import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import requests
 from bs4 import BeautifulSoup
-from io import BytesIO
+
+import instrumentation
+from http_client import HostLimiter, HttpClient
+from instrumentation import NULL_PROFILER, Profiler
 
 # Try to import PIL for image conversion
 try:
@@ -13,97 +31,198 @@ except ImportError:
     HAS_PIL = False
     print("Warning: PIL (Pillow) not found. Images will be renamed to .webp but not converted.")
 
-def fetch_credly_badges() -> None:
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INDEX_PATH = os.path.join(BASE_DIR, 'index.html')
+BADGES_DIR = os.path.join(BASE_DIR, 'assets', 'images', 'badges')
+MANIFEST_PATH = os.path.join(BASE_DIR, '.cache', 'credly_badges.json')
+MAX_WORKERS = 8
+PER_HOST_LIMIT = 4
+PER_HOST_DELAY = 0.1  # seconds between request starts to the same host
+
+# Headers to mimic a browser request
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _load_manifest() -> dict:
+    try:
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_manifest(manifest: dict) -> None:
+    os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+    with open(MANIFEST_PATH, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def process_badge(client: HttpClient, limiter: HostLimiter, badge_id: str, entry: dict) -> tuple:
     """
-    Fetches Credly badges from index.html and downloads them to assets/images/badges directory.
+    Fetches the metadata and image of a single badge and saves it as WebP.
+
+    :param client: Shared HTTP client
+    :param limiter: Per-host request limiter
+    :param badge_id: Credly badge ID
+    :param entry: Manifest entry of the previous run, if any
+    :return: Tuple of (status, new manifest entry, log lines), status is 'fetched' or 'skipped'
+    """
+    log = []
+    badge_url = f"https://www.credly.com/badges/{badge_id}"
+    with limiter.slot(badge_url):
+        response = client.get(badge_url)
+    response.raise_for_status()
+
+    soup = BeautifulSoup(response.text, 'html.parser')
+
+    # Get badge title for alt text reference
+    og_title = soup.find('meta', property='og:title')
+    title = og_title['content'] if og_title else "Unknown Badge"
+    log.append(f"  Title: {title}")
+
+    # Strategy 1: Open Graph image (usually high quality)
+    og_image = soup.find('meta', property='og:image')
+    if not og_image or not og_image.get('content'):
+        raise ValueError("Could not find image URL")
+    image_url = og_image['content']
+    log.append(f"  Found image URL: {image_url}")
+
+    filepath = os.path.join(BADGES_DIR, f"{badge_id}.webp")
+    fd, download_path = tempfile.mkstemp(dir=BADGES_DIR, suffix='.download')
+    os.close(fd)
+    try:
+        # Stream the image to disk, hashing it on the way
+        with limiter.slot(image_url):
+            source_hash = client.download(image_url, download_path)
+
+        if (entry.get('source_sha256') == source_hash and os.path.exists(filepath)
+                and _hash_file(filepath) == entry.get('output_sha256')):
+            log.append("  Image unchanged, keeping existing file")
+            return 'skipped', entry, log
+
+        # Save as WebP
+        converted = False
+        if HAS_PIL:
+            try:
+                with Image.open(download_path) as image:
+                    image.save(filepath, 'WEBP')
+                converted = True
+                log.append(f"  Converted and saved to: {filepath}")
+            except Exception as e:
+                log.append(f"  Error converting image: {e}. Saving raw content.")
+        if not converted:
+            os.replace(download_path, filepath)
+            if not HAS_PIL:
+                log.append(f"  Saved to: {filepath} (Note: Extension is .webp but content might be png/jpg)")
+    finally:
+        if os.path.exists(download_path):
+            os.remove(download_path)
+
+    new_entry = {
+        'source_url': image_url,
+        'source_sha256': source_hash,
+        'output_sha256': _hash_file(filepath)
+    }
+    return 'fetched', new_entry, log
+
+
+def fetch_credly_badges(max_workers: int = MAX_WORKERS, refresh: bool = False,
+                        profiler: Profiler = NULL_PROFILER) -> None:
     """
-    # Define paths
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    index_path = os.path.join(base_dir, 'index.html')
-    badges_dir = os.path.join(base_dir, 'assets', 'images', 'badges')
+    Fetches Credly badges from index.html and downloads them to assets/images/badges directory.
 
+    :param max_workers: Number of badges processed concurrently
+    :param refresh: Re-download badges even when their image is already on disk
+    :param profiler: Records the phases, each badge and each HTTP call
+    """
     # Create destination directory
-    if not os.path.exists(badges_dir):
-        os.makedirs(badges_dir)
-        print(f"Created directory: {badges_dir}")
+    if not os.path.exists(BADGES_DIR):
+        os.makedirs(BADGES_DIR)
+        print(f"Created directory: {BADGES_DIR}")
 
     # Read index.html to find badge IDs
     try:
-        with open(index_path, 'r', encoding='utf-8') as f:
+        with open(INDEX_PATH, 'r', encoding='utf-8') as f:
             content = f.read()
     except FileNotFoundError:
-        print(f"Error: Could not find index.html at {index_path}")
+        print(f"Error: Could not find index.html at {INDEX_PATH}")
         return
 
     # Extract badge IDs using regex from hrefs
     # Looking for: href="https://www.credly.com/badges/UUID"
     badge_ids = re.findall(r'href="https?://(?:www\.)?credly\.com/badges/([^"]+)"', content)
-    unique_ids = list(set(badge_ids))
+    unique_ids = sorted(set(badge_ids))
 
     print(f"Found {len(unique_ids)} unique badges in index.html.")
 
-    # Headers to mimic a browser request
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
-    timeout = 10 # seconds
-
-    for badge_id in unique_ids:
-        badge_url = f"https://www.credly.com/badges/{badge_id}"
-        print(f"Fetching metadata for badge ID: {badge_id}")
-        
-        try:
-            response = requests.get(badge_url, headers=headers, timeout=timeout)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Get badge title for alt text reference
-            og_title = soup.find('meta', property='og:title')
-            title = og_title['content'] if og_title else "Unknown Badge"
-            print(f"  Title: {title}")
-            
-            # Helper function to try finding the image
-            image_url = None
-            
-            # Strategy 1: Open Graph image (usually high quality)
-            og_image = soup.find('meta', property='og:image')
-            if og_image and og_image.get('content'):
-                image_url = og_image['content']
-            
-            if image_url:
-                print(f"  Found image URL: {image_url}")
-                
-                # Download the image
-                img_response = requests.get(image_url, headers=headers, stream=True, timeout=timeout)
-                img_response.raise_for_status()
-                
-                filename = f"{badge_id}.webp"
-                filepath = os.path.join(badges_dir, filename)
-                
-                # Save as WebP
-                if HAS_PIL:
-                    try:
-                        image = Image.open(BytesIO(img_response.content))
-                        image.save(filepath, 'WEBP')
-                        print(f"  Converted and saved to: {filepath}")
-                    except Exception as e:
-                        print(f"  Error converting image: {e}. Saving raw content.")
-                        with open(filepath, 'wb') as f:
-                            f.write(img_response.content)
-                else:
-                    with open(filepath, 'wb') as f:
-                        for chunk in img_response.iter_content(chunk_size=8192):
-                            f.write(chunk)
-                    print(f"  Saved to: {filepath} (Note: Extension is .webp but content might be png/jpg)")
-            else:
-                print(f"  Could not find image URL for badge {badge_id}")
-
-        except requests.exceptions.RequestException as e:
-            print(f"  Network error fetching {badge_id}: {e}")
-        except Exception as e:
-            print(f"  Error processing {badge_id}: {e}")
+    started = time.perf_counter()
+    manifest = _load_manifest()
+    summary = {'fetched': [], 'skipped': [], 'failed': []}
+    pending = []
+
+    with profiler.phase('verify existing badges'):
+        for badge_id in unique_ids:
+            entry = manifest.get(badge_id, {})
+            filepath = os.path.join(BADGES_DIR, f"{badge_id}.webp")
+            # A badge ID always points at the same image, so a verified file needs no network round trip
+            if (not refresh and entry and os.path.exists(filepath)
+                    and _hash_file(filepath) == entry.get('output_sha256')):
+                summary['skipped'].append(badge_id)
+                continue
+            pending.append(badge_id)
+
+    def process(badge_id):
+        with profiler.item('badge', badge_id):
+            return process_badge(client, limiter, badge_id, manifest.get(badge_id, {}))
+
+    limiter = HostLimiter(per_host=PER_HOST_LIMIT, delay=PER_HOST_DELAY)
+    with profiler.phase('fetch badges', badges=len(pending)), \
+            HttpClient(headers=HEADERS, pool_size=max_workers, profiler=profiler) as client, \
+            ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(process, badge_id): badge_id for badge_id in pending}
+        for future in as_completed(futures):
+            badge_id = futures[future]
+            print(f"Badge {badge_id}:")
+            try:
+                status, entry, log = future.result()
+            except requests.exceptions.RequestException as e:
+                print(f"  Network error fetching {badge_id}: {e}")
+                summary['failed'].append(badge_id)
+                continue
+            except Exception as e:
+                print(f"  Error processing {badge_id}: {e}")
+                summary['failed'].append(badge_id)
+                continue
+            print("\n".join(log))
+            manifest[badge_id] = entry
+            summary[status].append(badge_id)
+
+    _save_manifest(manifest)
+
+    elapsed = time.perf_counter() - started
+    print(f"\nBadges: {len(summary['fetched'])} fetched, {len(summary['skipped'])} skipped, "
+          f"{len(summary['failed'])} failed in {elapsed:.1f}s")
+    for badge_id in sorted(summary['failed']):
+        print(f"  Failed: {badge_id}")
+
 
 if __name__ == "__main__":
-    fetch_credly_badges()
+    parser = argparse.ArgumentParser(description="Download Credly badge images referenced in index.html.")
+    parser.add_argument('--concurrency', type=int, default=MAX_WORKERS,
+                        help="Number of badges processed concurrently")
+    parser.add_argument('--refresh', action='store_true',
+                        help="Re-download badges even when their image is already on disk")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    with Profiler.from_args('fetch_credly_data', args) as profiler:
+        fetch_credly_badges(max_workers=args.concurrency, refresh=args.refresh, profiler=profiler)
@@ -1,22 +1,111 @@
 """
 This script fetches the latest 'pushed_at' date from GitHub for each project
 and updates the local 'last_updated.json' file.
+
+By default every repository is looked up with its own REST call. With
+--graphql the repositories are fetched in batches of aliased GraphQL queries,
+falling back to REST for any repository the batch could not resolve.
 """
 
+import argparse
 import json
 import os
+import re
 import requests
 
+import instrumentation
+from http_client import HttpClient
+from instrumentation import NULL_PROFILER, Profiler
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 PROJECTS_SOURCE_PATH = os.path.join(BASE_DIR, 'assets', 'data', 'projects.json')
 OUTPUT_PATH = os.path.join(BASE_DIR, 'assets', 'data', 'last_updated.json')
 PR_BODY_PATH = os.path.join(BASE_DIR, 'pr_body.txt')
+GRAPHQL_URL = 'https://api.github.com/graphql'
+# Repositories per GraphQL query, keeps each query well under GitHub's node limits
+GRAPHQL_BATCH_SIZE = 50
+MAX_TOPICS = 100
+ALIAS_RE = re.compile(r'r(\d+)')
+
+
+def fetch_repo_rest(client: HttpClient, repo_path: str) -> dict:
+    """
+    Fetches the push date and topics of a repository from the REST API.
+
+    :param client: HTTP client carrying the GitHub headers
+    :param repo_path: Repository as 'owner/name'
+    :return: Dict with 'pushed_at' and 'topics'
+    """
+    response = client.get(f"https://api.github.com/repos/{repo_path}")
+    # Raises an exception for bad status codes (4xx or 5xx)
+    response.raise_for_status()
+    repo_data = response.json()
+    return {'pushed_at': repo_data.get('pushed_at'), 'topics': repo_data.get('topics', [])}
+
+
+def fetch_repos_graphql(client: HttpClient, repo_paths: list) -> dict:
+    """
+    Fetches the push date and topics of many repositories with aliased GraphQL queries.
+
+    Repositories that fail to resolve (renamed, private, transient errors) are
+    left out of the result so the caller can retry them over REST.
+
+    :param client: HTTP client carrying the GitHub headers
+    :param repo_paths: Repositories as 'owner/name'
+    :return: Mapping of repository to a dict with 'pushed_at' and 'topics'
+    """
+    results = {}
+    for start in range(0, len(repo_paths), GRAPHQL_BATCH_SIZE):
+        batch = repo_paths[start:start + GRAPHQL_BATCH_SIZE]
+        variables = {}
+        params = []
+        fields = []
+        for index, repo_path in enumerate(batch):
+            owner, _, name = repo_path.partition('/')
+            variables[f'owner{index}'] = owner
+            variables[f'name{index}'] = name
+            params.append(f'$owner{index}: String!, $name{index}: String!')
+            fields.append(
+                f'r{index}: repository(owner: $owner{index}, name: $name{index}) '
+                f'{{ pushedAt repositoryTopics(first: {MAX_TOPICS}) {{ nodes {{ topic {{ name }} }} }} }}'
+            )
+        query = f"query({', '.join(params)}) {{ {' '.join(fields)} }}"
+
+        try:
+            response = client.post(GRAPHQL_URL, json_body={'query': query, 'variables': variables})
+            response.raise_for_status()
+            payload = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"GraphQL batch of {len(batch)} repositories failed: {e}")
+            continue
+
+        # Errors come back with a 200 status, next to partial data or instead of it
+        for error in payload.get('errors') or []:
+            alias = ALIAS_RE.fullmatch(str((error.get('path') or [''])[0]))
+            where = batch[int(alias.group(1))] if alias else f"batch of {len(batch)} repositories"
+            print(f"GraphQL error for {where}: {error.get('message', error)}")
+        data = payload.get('data') or {}
+        if not data:
+            print(f"GraphQL batch of {len(batch)} repositories returned no data, falling back to REST.")
 
+        for index, repo_path in enumerate(batch):
+            repo_data = data.get(f'r{index}')
+            if not repo_data:
+                continue
+            results[repo_path] = {
+                'pushed_at': repo_data['pushedAt'],
+                'topics': [node['topic']['name'] for node in repo_data['repositoryTopics']['nodes']]
+            }
+    return results
 
-def fetch_and_save_updates():
+
+def fetch_and_save_updates(use_graphql: bool = False, profiler: Profiler = NULL_PROFILER):
     """
     Reads projects.json, fetches the last updated date for each GitHub repo,
     and saves the results to last_updated.json.
+
+    :param use_graphql: Fetch repositories in batched GraphQL queries instead of one REST call each
+    :param profiler: Records the phases and each HTTP call
     """
     print("Starting project update process...")
     try:
@@ -42,45 +131,57 @@ def fetch_and_save_updates():
         print("Fetching data from GitHub (authenticated)...")
     else:
         print("Fetching data from GitHub (unauthenticated)...")
-    for project in projects:
-        repo_path = project.get("github")
-        if not repo_path:
-            print(f"Skipping '{project.get('title')}' as it has no 'github' key.")
-            continue
+        if use_graphql:
+            print("The GraphQL API requires a token, falling back to REST.")
+            use_graphql = False
+    client = HttpClient(headers=headers, profiler=profiler)
 
-        api_url = f"https://api.github.com/repos/{repo_path}"
-        try:
-            response = requests.get(api_url, headers=headers)
-            # Raises an exception for bad status codes (4xx or 5xx)
-            response.raise_for_status()
-            repo_data = response.json()
-            
-            # Update last_updated time
-            new_pushed_at = repo_data.get('pushed_at')
-            updated_data[repo_path] = new_pushed_at
-            
-            old_pushed_at = old_data.get(repo_path)
-            if old_pushed_at != new_pushed_at:
-                changes.append(f"- **{repo_path}**: Activity updated to `{new_pushed_at}`")
-            
-            # Update tags from topics
-            topics = repo_data.get('topics', [])
-            if topics:
-                old_tags = project.get('tags', [])
-                if set(topics) != set(old_tags):
-                    project['tags'] = topics
-                    changes.append(f"- **{repo_path}**: Tags updated to `{', '.join(topics)}`")
-                    print(f"   -> Updated tags: {topics}")
-            
-            print(f"Successfully fetched data for: {repo_path}")
-
-        except requests.exceptions.HTTPError as e:
-            # This will catch rate-limiting errors (status 403)
-            print(f"HTTP Error for {repo_path}: {e}")
-            if e.response.status_code == 403:
-                print("   -> This may be a GitHub API rate limit error. Try again in an hour.")
-        except requests.exceptions.RequestException as e:
-            print(f"Failed to connect for {repo_path}: {e}")
+    batched = {}
+    if use_graphql:
+        repo_paths = list(dict.fromkeys(p['github'] for p in projects if p.get('github')))
+        with profiler.phase('graphql', repositories=len(repo_paths)):
+            batched = fetch_repos_graphql(client, repo_paths)
+        print(f"Fetched {len(batched)} of {len(repo_paths)} repositories via GraphQL.")
+
+    with profiler.phase('update projects', projects=len(projects)):
+        for project in projects:
+            repo_path = project.get("github")
+            if not repo_path:
+                print(f"Skipping '{project.get('title')}' as it has no 'github' key.")
+                continue
+
+            try:
+                repo_data = batched.get(repo_path) or fetch_repo_rest(client, repo_path)
+
+                # Update last_updated time
+                new_pushed_at = repo_data['pushed_at']
+                updated_data[repo_path] = new_pushed_at
+
+                old_pushed_at = old_data.get(repo_path)
+                if old_pushed_at != new_pushed_at:
+                    changes.append(f"- **{repo_path}**: Activity updated to `{new_pushed_at}`")
+
+                # Update tags from topics
+                topics = repo_data['topics']
+                if topics:
+                    old_tags = project.get('tags', [])
+                    if set(topics) != set(old_tags):
+                        project['tags'] = topics
+                        changes.append(f"- **{repo_path}**: Tags updated to `{', '.join(topics)}`")
+                        print(f"   -> Updated tags: {topics}")
+
+                print(f"Successfully fetched data for: {repo_path}")
+
+            except requests.exceptions.HTTPError as e:
+                # This will catch rate-limiting errors (status 403)
+                print(f"HTTP Error for {repo_path}: {e}")
+                if e.response.status_code == 403:
+                    print("   -> This may be a GitHub API rate limit error. Try again in an hour.")
+            except requests.exceptions.RequestException as e:
+                print(f"Failed to connect for {repo_path}: {e}")
+
+    client.close()
+    print(f"\nGitHub requests: {client.stats['requests']} ({client.stats['not_modified']} not modified)")
 
     # Write the collected data to the output file (last_updated.json)
     try:
@@ -104,7 +205,7 @@ def fetch_and_save_updates():
         body_content += "\n".join(changes)
     else:
         body_content += "No projects had new activity or tag updates."
-        
+
     try:
         with open(PR_BODY_PATH, 'w', encoding='utf-8') as f:
             f.write(body_content)
@@ -114,4 +215,10 @@ def fetch_and_save_updates():
 
 
 if __name__ == "__main__":
-    fetch_and_save_updates()
+    parser = argparse.ArgumentParser(description="Update last_updated.json and project tags from GitHub.")
+    parser.add_argument('--graphql', action='store_true',
+                        help="Fetch repositories in batched GraphQL queries (requires GITHUB_TOKEN)")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    with Profiler.from_args('fetch_github_activity', args) as profiler:
+        fetch_and_save_updates(use_graphql=args.graphql, profiler=profiler)
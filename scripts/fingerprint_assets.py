@@ -0,0 +1,193 @@
+"""
+This script fingerprints the built site's assets for long-lived caching.
+
+Every asset referenced by a literal path (stylesheets, scripts, the JSON the
+script fetches, images) gets a copy named after a hash of its content, e.g.
+style.min.3f2a9c41d0.css, and the references to it are rewritten. Assets are
+processed dependency first (images, then JSON, CSS and JS, then the pages), so
+a file's hash covers the fingerprinted names it references and an unchanged
+asset keeps its name across builds.
+
+The original files stay in place: URLs built at runtime (search shards, post
+shards) and absolute links from other sites (og:image) still resolve. The
+mapping is written to assets/asset-manifest.json.
+
+It runs on the export written by export_site.py (--root, default _site/) and
+refuses the repository itself.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+
+import instrumentation
+from instrumentation import NULL_PROFILER, Profiler
+from site_pages import SITE_DIR, add_root_argument, find_pages, resolve_url
+
+MANIFEST_PATH = os.path.join('assets', 'asset-manifest.json')
+HASH_LENGTH = 10
+TEXT_EXTENSIONS = ('.css', '.js', '.json', '.webmanifest')
+IMAGE_EXTENSIONS = ('.webp', '.avif', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico')
+# Processing order between kinds when no reference decides it
+KIND_ORDER = {'.json': 1, '.webmanifest': 1, '.css': 2, '.js': 3}
+
+# A local path to a known asset type, delimited by quotes, parentheses, whitespace, commas or '='
+REFERENCE_RE = re.compile(r'''
+    (?<=["'(\s,=])
+    (?!//)
+    (?P<path>[\w@%+~./-]*?[\w@%+~-]+\.(?:css|js|json|webmanifest|webp|avif|png|jpe?g|gif|svg|ico|woff2?))
+    (?P<suffix>[?\#][^"'\s)]*)?
+    (?=["')\s,])
+''', re.X)
+HASHED_RE = re.compile(r'\.[0-9a-f]{%d}\.\w+$' % HASH_LENGTH)
+
+
+def _is_asset(path: str, assets_dir: str) -> bool:
+    return (path.startswith(assets_dir + os.sep) and os.path.isfile(path)
+            and path.lower().endswith(TEXT_EXTENSIONS + IMAGE_EXTENSIONS + ('.woff', '.woff2'))
+            and not HASHED_RE.search(path))
+
+
+def _reference_base(path: str, root: str) -> str:
+    """
+    Returns the page a file's relative URLs are resolved against.
+
+    Stylesheets and pages resolve URLs against themselves, but the paths in
+    scripts and JSON end up in the page that runs the script, which always
+    uses root-absolute or root-relative paths.
+    """
+    if path.endswith(('.js', '.json')):
+        return os.path.join(root, 'index.html')
+    return path
+
+
+def find_references(text: str, path: str, root: str, assets_dir: str) -> set:
+    """
+    Lists the assets referenced by a text file.
+
+    :param text: Content of the file
+    :param path: Path of the file
+    :param root: Root directory of the site
+    :param assets_dir: Directory holding the assets
+    :return: Set of absolute asset paths
+    """
+    base = _reference_base(path, root)
+    references = set()
+    for match in REFERENCE_RE.finditer(text):
+        target = resolve_url(match.group('path'), base, root)
+        if target and _is_asset(target, assets_dir):
+            references.add(target)
+    return references
+
+
+def rewrite_references(text: str, path: str, root: str, mapping: dict) -> str:
+    """
+    Replaces references to fingerprinted assets with their hashed names.
+
+    :param text: Content of the file
+    :param path: Path of the file
+    :param root: Root directory of the site
+    :param mapping: Absolute original path to absolute hashed path
+    :return: The rewritten content
+    """
+    base = _reference_base(path, root)
+
+    def replace(match):
+        written = match.group('path')
+        target = resolve_url(written, base, root)
+        if target not in mapping:
+            return match.group()
+        name = os.path.basename(target)
+        return written[:-len(name)] + os.path.basename(mapping[target]) + (match.group('suffix') or '')
+
+    return REFERENCE_RE.sub(replace, text)
+
+
+def _hashed_path(path: str, content: bytes) -> str:
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    stem, extension = os.path.splitext(path)
+    return f'{stem}.{digest}{extension}'
+
+
+def _sort_key(path: str) -> tuple:
+    return KIND_ORDER.get(os.path.splitext(path)[1].lower(), 0), path
+
+
+def fingerprint_assets(root: str = SITE_DIR, profiler: Profiler = NULL_PROFILER) -> dict:
+    """
+    Writes content-hashed copies of the referenced assets and rewrites every reference.
+
+    :param root: Root directory of the built site (edited in place)
+    :param profiler: Records the phases of the run
+    :return: Mapping of original to hashed path, relative to root
+    """
+    assets_dir = os.path.join(root, 'assets')
+    texts = {}
+    for directory, _, filenames in os.walk(assets_dir):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            if filename.endswith(TEXT_EXTENSIONS) and not HASHED_RE.search(filename):
+                with open(path, 'r', encoding='utf-8') as f:
+                    texts[path] = f.read()
+    pages = find_pages(root)
+    for page_path in pages:
+        with open(page_path, 'r', encoding='utf-8') as f:
+            texts[page_path] = f.read()
+
+    with profiler.phase('find references', files=len(texts)):
+        dependencies = {path: find_references(text, path, root, assets_dir) for path, text in texts.items()}
+    referenced = set().union(*dependencies.values()) if dependencies else set()
+    referenced.discard(os.path.join(root, MANIFEST_PATH))
+
+    mapping = {}
+    visiting = set()
+
+    def visit(path):
+        visiting.add(path)
+        for dependency in sorted(dependencies.get(path, ()), key=_sort_key):
+            # A reference back into the chain being processed keeps its original name
+            if dependency in referenced and dependency not in mapping and dependency not in visiting:
+                visit(dependency)
+        visiting.discard(path)
+
+        if path in texts:
+            content = rewrite_references(texts[path], path, root, mapping).encode('utf-8')
+        else:
+            with open(path, 'rb') as f:
+                content = f.read()
+        hashed = _hashed_path(path, content)
+        with open(hashed, 'wb') as f:
+            f.write(content)
+        mapping[path] = hashed
+
+    with profiler.phase('hash assets', assets=len(referenced)):
+        for path in sorted(referenced, key=_sort_key):
+            if path not in mapping:
+                visit(path)
+
+    with profiler.phase('rewrite pages', pages=len(pages)):
+        for page_path in pages:
+            rewritten = rewrite_references(texts[page_path], page_path, root, mapping)
+            if rewritten != texts[page_path]:
+                with open(page_path, 'w', encoding='utf-8') as f:
+                    f.write(rewritten)
+
+    manifest = {os.path.relpath(original, root).replace(os.sep, '/'): os.path.relpath(hashed, root).replace(os.sep, '/')
+                for original, hashed in mapping.items()}
+    manifest = dict(sorted(manifest.items()))
+    with open(os.path.join(root, MANIFEST_PATH), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"Fingerprinted {len(manifest)} assets referenced from {len(pages)} pages")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy assets to content-hashed names and rewrite references to them.")
+    add_root_argument(parser)
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    with Profiler.from_args('fingerprint_assets', args) as profiler:
+        fingerprint_assets(args.root, profiler=profiler)
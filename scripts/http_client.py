@@ -0,0 +1,255 @@
+"""
+This module provides the HTTP layer shared by the fetch scripts.
+
+Requests go through a pooled keep-alive session with a timeout, and GETs that
+fail with a connection error, a timeout or a 429/5xx status are retried with
+backoff. GET responses that carry an ETag or Last-Modified header are cached
+on disk and revalidated with If-None-Match / If-Modified-Since on the next
+run, so unchanged resources come back as cheap 304s (which GitHub does not
+count against the rate limit). The cache is keyed per credentials, so a
+response fetched with one token is never replayed for another.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+from instrumentation import NULL_PROFILER, Profiler
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(BASE_DIR, '.cache', 'http')
+DEFAULT_TIMEOUT = 10  # seconds
+POOL_SIZE = 10
+RETRIES = 2
+BACKOFF = 0.5  # seconds, doubled on every retry after the first
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Request headers that change the response body and so belong in the cache key
+VARY_HEADERS = ('Accept', 'Accept-Encoding')
+
+
+class CachedResponse:
+    """
+    A GET response, either fresh from the network or replayed from the cache.
+    """
+
+    def __init__(self, url: str, status_code: int, headers: dict, content: bytes, from_cache: bool = False):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.from_cache = from_cache
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        """
+        Raises requests.HTTPError for 4xx and 5xx responses, like requests.Response does.
+        """
+        if 400 <= self.status_code < 600:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+class HostLimiter:
+    """
+    Keeps concurrent requests polite: at most per_host requests in flight per
+    host, and request starts to the same host spaced at least delay seconds apart.
+
+    :param per_host: Maximum concurrent requests per host
+    :param delay: Minimum seconds between request starts to the same host
+    """
+
+    def __init__(self, per_host: int = 4, delay: float = 0.0):
+        self.per_host = per_host
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    @contextmanager
+    def slot(self, url: str):
+        """
+        Blocks until a request to the host of url may start.
+
+        :param url: URL about to be requested
+        """
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = {'semaphore': threading.Semaphore(self.per_host), 'next_start': 0.0}
+            state = self._hosts[host]
+
+        with state['semaphore']:
+            with self._lock:
+                now = time.monotonic()
+                wait = max(0.0, state['next_start'] - now)
+                state['next_start'] = now + wait + self.delay
+            if wait:
+                time.sleep(wait)
+            yield
+
+
+class HttpClient:
+    """
+    A keep-alive HTTP client with timeouts and an on-disk conditional GET cache.
+
+    :param cache_dir: Directory of the response cache, None disables caching
+    :param headers: Headers sent with every request
+    :param timeout: Timeout of every request in seconds
+    :param pool_size: Number of keep-alive connections kept per host
+    :param retries: Retries of a GET after a connection error, a timeout or a 429/5xx status
+    :param profiler: Records every request as an 'http' item
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, headers: dict = None, timeout: float = DEFAULT_TIMEOUT,
+                 pool_size: int = POOL_SIZE, retries: int = RETRIES, profiler: Profiler = NULL_PROFILER):
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.profiler = profiler
+        self.session = requests.Session()
+        # POSTs are not retried, they may not be idempotent; after the last retry the error response is returned
+        retry = Retry(total=retries, backoff_factor=BACKOFF, status_forcelist=RETRY_STATUSES,
+                      allowed_methods={'GET', 'HEAD'}, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        if headers:
+            self.session.headers.update(headers)
+        self.stats = {'requests': 0, 'not_modified': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _cache_path(self, url: str, headers: dict) -> str:
+        merged = CaseInsensitiveDict(self.session.headers)
+        merged.update(headers or {})
+        # Responses depend on the credentials, only a digest of them enters the key
+        credentials = hashlib.sha256(merged.get('Authorization', '').encode('utf-8')).hexdigest()
+        key = json.dumps([url, credentials] + [merged.get(name, '') for name in VARY_HEADERS])
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+    def _load_cached(self, path: str) -> tuple:
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            header, body = data.split(b'\n', 1)
+            return json.loads(header), body
+        except (FileNotFoundError, ValueError):
+            return None, None
+
+    def _store(self, path: str, response: requests.Response) -> None:
+        meta = {
+            'url': response.url,
+            'headers': {name: value for name, value in response.headers.items()
+                        if name.lower() in ('etag', 'last-modified', 'content-type')}
+        }
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # One file, the metadata line then the body, written aside and renamed into place:
+        # a crash leaves either the old entry or the new one, never a body with the wrong ETag
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(json.dumps(meta).encode('utf-8') + b'\n' + response.content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def get(self, url: str, headers: dict = None, use_cache: bool = True) -> CachedResponse:
+        """
+        Sends a GET request, revalidating a cached copy if there is one.
+
+        :param url: URL to fetch
+        :param headers: Extra headers for this request
+        :param use_cache: Whether to read and write the response cache
+        :return: The response, with from_cache set when it was served from the cache
+        """
+        headers = dict(headers or {})
+        path = self._cache_path(url, headers) if use_cache and self.cache_dir else None
+        meta, body = self._load_cached(path) if path else (None, None)
+        if meta:
+            cached_headers = CaseInsensitiveDict(meta['headers'])
+            if 'ETag' in cached_headers:
+                headers['If-None-Match'] = cached_headers['ETag']
+            if 'Last-Modified' in cached_headers:
+                headers['If-Modified-Since'] = cached_headers['Last-Modified']
+
+        with self.profiler.item('http', f'GET {url}') as trace:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            trace.update(status=response.status_code, bytes=len(response.content))
+        self._count('requests')
+
+        if response.status_code == 304 and meta:
+            self._count('not_modified')
+            return CachedResponse(url, 200, meta['headers'], body, from_cache=True)
+
+        if path and response.status_code == 200 and (
+                'ETag' in response.headers or 'Last-Modified' in response.headers):
+            self._store(path, response)
+
+        return CachedResponse(url, response.status_code, dict(response.headers), response.content)
+
+    def post(self, url: str, json_body=None, headers: dict = None) -> CachedResponse:
+        """
+        Sends an uncached POST request with a JSON body.
+
+        :param url: URL to post to
+        :param json_body: Object sent as the JSON body
+        :param headers: Extra headers for this request
+        :return: The response
+        """
+        with self.profiler.item('http', f'POST {url}') as trace:
+            response = self.session.post(url, json=json_body, headers=headers, timeout=self.timeout)
+            trace.update(status=response.status_code, bytes=len(response.content))
+        self._count('requests')
+        return CachedResponse(url, response.status_code, dict(response.headers), response.content)
+
+    def download(self, url: str, path: str, headers: dict = None, chunk_size: int = 65536) -> str:
+        """
+        Streams a response body to a file without holding it in memory.
+
+        :param url: URL to fetch
+        :param path: File the body is written to
+        :param headers: Extra headers for this request
+        :param chunk_size: Bytes read per chunk
+        :return: SHA-256 hex digest of the body
+        """
+        digest = hashlib.sha256()
+        with self.profiler.item('http', f'GET {url}', download=True) as trace, \
+                self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            self._count('requests')
+            trace['status'] = response.status_code
+            response.raise_for_status()
+            size = 0
+            with open(path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            trace['bytes'] = size
+        return digest.hexdigest()
@@ -0,0 +1,264 @@
+"""
+This module records where the build scripts spend their time and memory.
+
+Every script accepts --profile. Scripts mark their phases (scan, render,
+write...) and items (each post, image, page or HTTP call), and the profiler
+records wall and CPU time for each of them, the peak of traced Python memory
+per phase and, with --cprofile, a cProfile dump of the main process.
+
+The result is written in the Chrome trace format, so it opens in
+chrome://tracing or https://ui.perfetto.dev, and a summary with the slowest
+items is printed when the script ends. Without --profile every call is a no-op.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_DIR = os.path.join(BASE_DIR, '.cache', 'profiles')
+SLOWEST_ITEMS = 5
+
+
+def _now_us() -> int:
+    # Epoch based, so events recorded in worker processes line up with the main process
+    return time.time_ns() // 1000
+
+
+def timed(func, *args):
+    """
+    Calls func and measures it. Used for work done in worker processes or
+    threads, whose timings are handed back to the profiler with add_item().
+
+    :param func: Function to call
+    :param args: Arguments of the call
+    :return: Tuple of (result, timing)
+    """
+    start = _now_us()
+    cpu_start = time.thread_time_ns()
+    result = func(*args)
+    timing = {
+        'ts': start,
+        'dur': _now_us() - start,
+        'cpu_ms': (time.thread_time_ns() - cpu_start) / 1e6,
+        'pid': os.getpid(),
+        'tid': threading.get_ident()
+    }
+    return result, timing
+
+
+class Profiler:
+    """
+    Collects phase and item timings and writes them as a Chrome trace.
+    """
+
+    def __init__(self, name: str, enabled: bool = False, output: str = None, cprofile: bool = False):
+        """
+        :param name: Name of the script, used for the default output path
+        :param enabled: Record anything at all
+        :param output: Path of the trace, defaults to .cache/profiles/<name>.trace.json
+        :param cprofile: Also run cProfile over the main thread and dump its stats next to the trace
+        """
+        self.name = name
+        self.enabled = enabled
+        self.output = output or os.path.join(PROFILE_DIR, f'{name}.trace.json')
+        self.cprofile = cprofile
+        self.events = []
+        self._profile = None
+        self._started = None
+        self._cpu_started = None
+        self._peak_memory = 0
+
+    @classmethod
+    def from_args(cls, name: str, args) -> 'Profiler':
+        """
+        Creates a profiler from the options added by add_arguments().
+
+        :param name: Name of the script
+        :param args: Parsed command line arguments
+        :return: Profiler, disabled unless --profile was given
+        """
+        return cls(name, enabled=args.profile is not None or args.cprofile,
+                   output=args.profile or None, cprofile=args.cprofile)
+
+    def __enter__(self) -> 'Profiler':
+        if self.enabled:
+            tracemalloc.start()
+            self._started = _now_us()
+            self._cpu_started = time.process_time_ns()
+            if self.cprofile:
+                self._profile = cProfile.Profile()
+                self._profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if not self.enabled:
+            return
+        if self._profile:
+            self._profile.disable()
+        # Phases reset the peak, so the run's peak is the largest one seen
+        peak = max(self._peak_memory, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        self.write(peak)
+
+    def _event(self, category: str, name: str, ts: int, dur: int, pid: int, tid: int, args: dict) -> None:
+        # list.append is atomic, so threads can record concurrently
+        self.events.append({'name': name, 'cat': category, 'ph': 'X', 'ts': ts, 'dur': dur,
+                            'pid': pid, 'tid': tid, 'args': args})
+
+    @contextmanager
+    def phase(self, name: str, **args):
+        """
+        Measures a phase of the script: wall time, CPU time of the process and peak traced memory.
+
+        :param name: Name of the phase
+        :param args: Extra values shown with the event
+        """
+        if not self.enabled:
+            yield
+            return
+        tracemalloc.reset_peak()
+        start = _now_us()
+        cpu_start = time.process_time_ns()
+        try:
+            yield
+        finally:
+            peak = tracemalloc.get_traced_memory()[1]
+            self._peak_memory = max(self._peak_memory, peak)
+            args.update(cpu_ms=round((time.process_time_ns() - cpu_start) / 1e6, 3), peak_memory_kb=peak // 1024)
+            self._event('phase', name, start, _now_us() - start, os.getpid(), threading.get_ident(), args)
+
+    @contextmanager
+    def item(self, category: str, name: str, **args):
+        """
+        Measures a single item (a post, an image, an HTTP call) in the current thread.
+
+        :param category: Kind of item, e.g. 'post' or 'http'
+        :param name: Name of the item
+        :param args: Extra values shown with the event
+        :return: The args dict, values added to it inside the block are recorded too
+        """
+        if not self.enabled:
+            yield args
+            return
+        start = _now_us()
+        cpu_start = time.thread_time_ns()
+        try:
+            yield args
+        finally:
+            args['cpu_ms'] = round((time.thread_time_ns() - cpu_start) / 1e6, 3)
+            self._event(category, name, start, _now_us() - start, os.getpid(), threading.get_ident(), args)
+
+    def add_item(self, category: str, name: str, timing: dict, **args) -> None:
+        """
+        Records an item measured elsewhere with timed().
+
+        :param category: Kind of item
+        :param name: Name of the item
+        :param timing: Timing returned by timed()
+        :param args: Extra values shown with the event
+        """
+        if self.enabled:
+            args['cpu_ms'] = round(timing['cpu_ms'], 3)
+            self._event(category, name, timing['ts'], timing['dur'], timing['pid'], timing['tid'], args)
+
+    def include(self, path: str, prefix: str) -> None:
+        """
+        Adds the events of another trace, e.g. one written by a subprocess, to this one.
+
+        :param path: Path of a trace written by Profiler.write()
+        :param prefix: Prepended to the event names, tells apart phases of different scripts
+        """
+        if not self.enabled:
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                events = json.load(f)['traceEvents']
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            print(f"Warning: could not read trace {path}")
+            return
+        for event in events:
+            if event['ph'] == 'X':
+                event['name'] = f"{prefix}: {event['name']}"
+            self.events.append(event)
+
+    def slowest(self, count: int = SLOWEST_ITEMS) -> dict:
+        """
+        Lists the slowest items of every category.
+
+        :param count: Number of items per category
+        :return: Mapping of category to [(name, milliseconds)]
+        """
+        by_category = {}
+        for event in self.events:
+            if event['ph'] == 'X' and event['cat'] != 'phase':
+                by_category.setdefault(event['cat'], []).append((event['name'], event['dur'] / 1000))
+        return {category: sorted(items, key=lambda item: -item[1])[:count]
+                for category, items in sorted(by_category.items())}
+
+    def write(self, peak_memory: int) -> None:
+        """
+        Writes the trace and prints a summary.
+
+        :param peak_memory: Peak traced memory of the whole run, in bytes
+        """
+        wall_ms = (_now_us() - self._started) / 1000
+        cpu_ms = (time.process_time_ns() - self._cpu_started) / 1e6
+        slowest = self.slowest()
+        # Names the process in the trace viewer, included traces bring their own
+        metadata = {'name': 'process_name', 'ph': 'M', 'pid': os.getpid(), 'args': {'name': self.name}}
+        trace = {
+            'traceEvents': [metadata] + sorted((e for e in self.events if e['ph'] == 'X'), key=lambda e: e['ts'])
+                           + [e for e in self.events if e['ph'] == 'M'],
+            'displayTimeUnit': 'ms',
+            'otherData': {
+                'script': self.name,
+                'wall_ms': round(wall_ms, 3),
+                'cpu_ms': round(cpu_ms, 3),
+                'peak_memory_kb': peak_memory // 1024,
+                'slowest': slowest
+            }
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(self.output)), exist_ok=True)
+        with open(self.output, 'w', encoding='utf-8') as f:
+            json.dump(trace, f)
+
+        print(f"\nProfile of {self.name}: {wall_ms / 1000:.2f}s wall, {cpu_ms / 1000:.2f}s CPU (main process), "
+              f"peak traced memory {peak_memory / (1024 * 1024):.1f} MB")
+        for event in self.events:
+            if event['ph'] == 'X' and event['cat'] == 'phase':
+                print(f"  {event['name']:<28}{event['dur'] / 1000:>10.1f} ms"
+                      f"{event['args']['cpu_ms']:>10.1f} ms CPU{event['args']['peak_memory_kb']:>10,} KB peak")
+        for category, items in slowest.items():
+            print(f"  Slowest {category}: " + ', '.join(f"{name} ({ms:.1f} ms)" for name, ms in items))
+        print(f"Trace written to {self.output}")
+
+        if self._profile:
+            stats_path = os.path.splitext(self.output)[0] + '.prof'
+            self._profile.dump_stats(stats_path)
+            stream = io.StringIO()
+            pstats.Stats(self._profile, stream=stream).sort_stats('cumulative').print_stats(15)
+            print(stream.getvalue())
+            print(f"cProfile stats written to {stats_path}")
+
+
+# Shared disabled profiler, the default of every instrumented function
+NULL_PROFILER = Profiler('disabled')
+
+
+def add_arguments(parser) -> None:
+    """
+    Adds --profile and --cprofile to a script's argument parser.
+
+    :param parser: argparse.ArgumentParser of the script
+    """
+    parser.add_argument('--profile', nargs='?', const='', default=None, metavar='PATH',
+                        help="Record phase and item timings and peak memory as a Chrome trace "
+                             "(default path: .cache/profiles/<script>.trace.json)")
+    parser.add_argument('--cprofile', action='store_true', help="With --profile, also dump cProfile stats")
@@ -1,29 +1,77 @@
 """
 This script minifies CSS and JavaScript files.
+
+The JavaScript is assets/js/script.js, a small bootstrap, plus the section
+modules in assets/js/modules/ it imports when a section scrolls into view.
+Each is minified to a .min.js file next to it, and the module paths they
+import are pointed at the minified files.
+
+With --prune, CSS selectors that can not match any page are dropped. The
+used class names and ids are collected from every HTML page (index.html,
+the sections and the blogs/ output) plus every word of the scripts, which
+covers the classes they create at runtime.
 """
 
-import re
+import argparse
+import glob
 import os
+import re
+from html.parser import HTMLParser
+
+import css_minifier
+import instrumentation
+from instrumentation import NULL_PROFILER, Profiler
+from site_pages import BASE_DIR, find_pages
+
+JS_WORD_RE = re.compile(r'-?[a-zA-Z_][\w-]*')
+# A quoted path to a section module, as written in the sources
+MODULE_PATH_RE = re.compile(r'''(['"])(/assets/js/modules/[\w-]+)\.js\1''')
+
+
+class _NameCollector(HTMLParser):
+    """
+    Collects the class names and ids used in HTML.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.names = set()
 
+    def handle_starttag(self, tag, attrs):
+        for name, value in attrs:
+            if name in ('class', 'id') and value:
+                self.names.update(value.split())
 
-def minify_css(content: str) -> str:
+
+def collect_used_names(js_paths: list) -> set:
+    """
+    Collects every class name and id the site can use.
+
+    :param js_paths: Scripts whose words are treated as possible class names
+    :return: Set of names
     """
-    Minifies CSS content by removing comments and collapsing whitespace.
+    collector = _NameCollector()
+    for page_path in find_pages(BASE_DIR):
+        with open(page_path, 'r', encoding='utf-8') as f:
+            collector.feed(f.read())
+    names = collector.names
+    for js_path in js_paths:
+        if os.path.exists(js_path):
+            with open(js_path, 'r', encoding='utf-8') as f:
+                names.update(JS_WORD_RE.findall(f.read()))
+    return names
+
+
+def minify_css(content: str, used_names: set = None) -> str:
+    """
+    Minifies CSS content: removes comments and whitespace, shortens values and
+    merges duplicate rules.
 
     :param content: CSS content to minify
+    :param used_names: Class names and ids used by the site, selectors matching none of them are pruned
     :return: Minified CSS content
     """
-    # Remove comments
-    content = re.sub(r'/\*.*?\*/', '', content, flags=re.DOTALL)
-    # Collapse whitespace
-    content = re.sub(r'\s+', ' ', content)
-    # Remove space around symbols (exclude colon to preserve descendant selectors)
-    content = re.sub(r'\s*([\{\};,])\s*', r'\1', content)
-    # Remove space after colon only (safe for properties)
-    content = re.sub(r':\s+', ':', content)
-    # Remove final semicolon in block
-    content = re.sub(r';}', '}', content)
-    return content.strip()
+    return css_minifier.minify(content, used_names)
 
 
 def minify_js(content: str) -> tuple[str, bool]:
@@ -42,35 +90,64 @@ def minify_js(content: str) -> tuple[str, bool]:
         return content, False
 
 
-def process_assets() -> None:
+def js_sources(assets_dir: str) -> list:
+    """
+    Lists the JavaScript sources: the bootstrap and every section module.
+
+    :param assets_dir: The assets directory
+    :return: Paths of the sources, minified outputs excluded
+    """
+    modules = glob.glob(os.path.join(assets_dir, 'js', 'modules', '*.js'))
+    return [os.path.join(assets_dir, 'js', 'script.js')] + sorted(path for path in modules
+                                                                  if not path.endswith('.min.js'))
+
+
+def process_assets(prune: bool = False, profiler: Profiler = NULL_PROFILER, css: bool = True,
+                   js: bool = True) -> None:
     """
     Processes CSS and JavaScript files by minifying them.
+
+    :param prune: Drop CSS selectors that match nothing on the site
+    :param profiler: Records the minification of each file
+    :param css: Minify style.css
+    :param js: Minify script.js and the section modules
     """
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    assets_dir = os.path.join(base_dir, 'assets')
+    assets_dir = os.path.join(BASE_DIR, 'assets')
 
     css_path = os.path.join(assets_dir, 'css', 'style.css')
     min_css_path = os.path.join(assets_dir, 'css', 'style.min.css')
 
-    js_path = os.path.join(assets_dir, 'js', 'script.js')
-    min_js_path = os.path.join(assets_dir, 'js', 'script.min.js')
+    js_paths = js_sources(assets_dir)
 
     # Minify CSS
-    if os.path.exists(css_path):
+    if css and os.path.exists(css_path):
         with open(css_path, 'r', encoding='utf-8') as f:
             css_content = f.read()
-            min_css = minify_css(css_content)
+        if prune:
+            with profiler.phase('collect used names'):
+                used_names = collect_used_names(js_paths)
+        else:
+            used_names = None
+        with profiler.phase('minify css', bytes=len(css_content)):
+            min_css = minify_css(css_content, used_names)
 
         with open(min_css_path, 'w', encoding='utf-8') as f:
             f.write(min_css)
-        print(f"Minified CSS: {min_css_path}")
+        print(f"Minified CSS: {min_css_path} ({len(css_content):,} -> {len(min_css):,} bytes"
+              f"{', pruned' if prune else ''})")
 
     # Minify JS
-    if os.path.exists(js_path):
+    if not js:
+        return
+    for js_path in js_paths:
+        if not os.path.exists(js_path):
+            continue
         with open(js_path, 'r', encoding='utf-8') as f:
             js_content = f.read()
-            min_js, was_minified = minify_js(js_content)
+        with profiler.phase('minify js', file=os.path.basename(js_path), bytes=len(js_content)):
+            min_js, was_minified = minify_js(MODULE_PATH_RE.sub(r'\1\2.min.js\1', js_content))
 
+        min_js_path = os.path.splitext(js_path)[0] + '.min.js'
         with open(min_js_path, 'w', encoding='utf-8') as f:
             f.write(min_js)
 
@@ -81,4 +158,10 @@ def process_assets() -> None:
 
 
 if __name__ == "__main__":
-    process_assets()
+    parser = argparse.ArgumentParser(description="Minify style.css, script.js and the section modules.")
+    parser.add_argument('--prune', action='store_true',
+                        help="Drop CSS selectors that match no class or id used by the pages or script.js")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    with Profiler.from_args('minify_assets', args) as profiler:
+        process_assets(prune=args.prune, profiler=profiler)
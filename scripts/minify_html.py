@@ -0,0 +1,349 @@
+"""
+This script minifies the HTML of every built page in place.
+
+Whitespace is collapsed, and removed next to block-level tags where CSS
+would drop it anyway. Text inside <pre>, <code> and <textarea> is kept as
+is. Comments are stripped (conditional comments stay), attribute quotes are
+dropped where the value allows it, and end tags the parser implies (</li>,
+</p> before a block, </td>, </body>...) are omitted. Inline <style> and
+style="" attributes go through css_minifier, inline scripts through jsmin
+and JSON-LD is re-serialized compactly.
+
+Every minified page is checked by parsing both versions into element trees,
+with the end tags the HTML parser implies, and comparing tags, attributes
+and text. A page whose trees differ is left unminified and reported. That
+check shares IMPLIED_END with the minifier and only compares the presence of
+script and style content, so it guards against structural slips at deploy
+time; tests/test_minify_html.py is the proof of correctness, comparing every
+deployed page and a fixture of the tricky cases with html5lib.
+"""
+
+import argparse
+import json
+import os
+import re
+from html.parser import HTMLParser
+
+import css_minifier
+import instrumentation
+from instrumentation import NULL_PROFILER, Profiler
+from minify_assets import minify_js
+from site_pages import SITE_DIR, add_root_argument, find_pages
+
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+# Whitespace around these is rendered, elsewhere it is dropped at the edges of a block
+INLINE_TAGS = {'a', 'abbr', 'b', 'bdi', 'bdo', 'br', 'button', 'cite', 'code', 'data', 'del', 'dfn', 'em', 'i',
+               'iframe', 'img', 'input', 'ins', 'kbd', 'label', 'mark', 'picture', 'q', 's', 'samp', 'select',
+               'small', 'span', 'strong', 'sub', 'sup', 'svg', 'textarea', 'time', 'u', 'var', 'video', 'wbr'}
+PRESERVE_TAGS = {'pre', 'code', 'textarea'}
+RAW_TEXT_TAGS = {'script', 'style'}
+JS_TYPES = {None, '', 'text/javascript', 'application/javascript', 'module'}
+
+# Start tags that close an open element of these kinds, as the HTML parser does
+P_CLOSERS = {'address', 'article', 'aside', 'blockquote', 'details', 'div', 'dl', 'fieldset', 'figcaption', 'figure',
+             'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hgroup', 'hr', 'main', 'menu', 'nav',
+             'ol', 'p', 'pre', 'section', 'table', 'ul'}
+IMPLIED_END = {
+    'li': {'li'},
+    'dt': {'dt', 'dd'},
+    'dd': {'dt', 'dd'},
+    'option': {'option', 'optgroup'},
+    'tr': {'tr'},
+    'td': {'td', 'th', 'tr'},
+    'th': {'td', 'th', 'tr'},
+    'p': P_CLOSERS,
+    'head': {'body'},
+}
+# End tags that may also be omitted when the parent's end tag follows
+OMIT_BEFORE_PARENT_END = {'li', 'dd', 'option', 'tr', 'td', 'th'}
+# End tags the parser implies at the end of the document
+OMIT_AT_END = {'body', 'html'}
+
+HTML_SPACE_RE = re.compile(r'[ \t\n\r\f]+')
+UNQUOTED_VALUE_RE = re.compile(r'^[^ \t\n\r\f"\'=<>`&]*[^ \t\n\r\f"\'=<>`&/]$')
+
+
+class _EventCollector(HTMLParser):
+    """
+    Records a page as a flat list of events, text kept exactly as written.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.events = []
+
+    def _text(self, text):
+        if self.events and self.events[-1][0] == 'text':
+            self.events[-1] = ('text', self.events[-1][1] + text)
+        else:
+            self.events.append(('text', text))
+
+    def handle_starttag(self, tag, attrs):
+        self.events.append(('start', tag, attrs, False))
+
+    def handle_startendtag(self, tag, attrs):
+        self.events.append(('start', tag, attrs, True))
+
+    def handle_endtag(self, tag):
+        self.events.append(('end', tag))
+
+    def handle_data(self, data):
+        self._text(data)
+
+    def handle_entityref(self, name):
+        self._text(f'&{name};')
+
+    def handle_charref(self, name):
+        self._text(f'&#{name};')
+
+    def handle_comment(self, data):
+        self.events.append(('comment', data))
+
+    def handle_decl(self, decl):
+        self.events.append(('markup', f'<!{decl}>'))
+
+    def unknown_decl(self, data):
+        self.events.append(('markup', f'<![{data}]>'))
+
+    def handle_pi(self, data):
+        self.events.append(('markup', f'<?{data}>'))
+
+
+def minify_style_attribute(value: str) -> str:
+    """
+    Minifies the declarations of a style="" attribute.
+
+    :param value: Attribute value
+    :return: Minified declarations, the original value if they can not be parsed
+    """
+    minified = css_minifier.minify(f'a{{{value}}}')
+    if minified.startswith('a{') and minified.endswith('}'):
+        return minified[2:-1]
+    return value if minified else ''
+
+
+def _format_attr(name: str, value) -> str:
+    if name == 'style' and value:
+        value = minify_style_attribute(value)
+    if not value:
+        # An attribute without a value is the same as an empty one
+        return f' {name}'
+    if UNQUOTED_VALUE_RE.match(value):
+        return f' {name}={value}'
+    return f' {name}="{value.replace("&", "&amp;").replace(chr(34), "&quot;")}"'
+
+
+def _minify_raw_text(tag: str, attrs: dict, text: str) -> str:
+    if tag == 'style':
+        text = css_minifier.minify(text)
+    elif attrs.get('type') == 'application/ld+json':
+        try:
+            text = json.dumps(json.loads(text), ensure_ascii=False, separators=(',', ':'))
+        except json.JSONDecodeError:
+            return text
+    elif attrs.get('type') in JS_TYPES and text.strip():
+        text, _ = minify_js(text)
+        text = text.strip()
+    # Whatever the minifiers produced, the element must not end early
+    return re.sub(rf'</({tag})', r'<\\/\1', text, flags=re.I)
+
+
+def _is_block_boundary(event) -> bool:
+    if event is None or event[0] == 'markup':
+        return True
+    return event[0] in ('start', 'end') and event[1] not in INLINE_TAGS and '-' not in event[1]
+
+
+def _tokens(events: list) -> list:
+    """
+    Turns events into minified (kind, tag, html) tokens, before end tags are omitted.
+    """
+    # Comments are dropped first, so whitespace next to them is judged by the tags around
+    kept = []
+    for event in events:
+        if event[0] == 'comment' and not event[1].startswith(('[if', '<![endif')):
+            continue
+        if event[0] == 'text' and kept and kept[-1][0] == 'text':
+            kept[-1] = ('text', kept[-1][1] + event[1])
+        else:
+            kept.append(event)
+    events = kept
+    tokens = []
+    preserve = 0
+    raw_tag = None
+    for index, event in enumerate(events):
+        kind = event[0]
+        if kind == 'start':
+            _, tag, attrs, self_closing = event
+            if tag in PRESERVE_TAGS:
+                preserve += 1
+            if tag in RAW_TEXT_TAGS and not self_closing:
+                raw_tag = (tag, dict(attrs))
+            closing = '/' if self_closing and tag not in VOID_TAGS else ''
+            text = f"<{tag}{''.join(_format_attr(name, value) for name, value in attrs)}{closing}>"
+            tokens.append(('start', tag, text))
+        elif kind == 'end':
+            tag = event[1]
+            if tag in PRESERVE_TAGS and preserve:
+                preserve -= 1
+            raw_tag = None
+            tokens.append(('end', tag, f'</{tag}>'))
+        elif kind == 'text':
+            text = event[1]
+            if raw_tag:
+                text = _minify_raw_text(raw_tag[0], raw_tag[1], text)
+            elif not preserve:
+                text = HTML_SPACE_RE.sub(' ', text)
+                if _is_block_boundary(events[index - 1] if index else None):
+                    text = text.lstrip(' ')
+                if _is_block_boundary(events[index + 1] if index + 1 < len(events) else None):
+                    text = text.rstrip(' ')
+            if text:
+                tokens.append(('text', None, text))
+        elif kind == 'comment':
+            tokens.append(('markup', None, f'<!--{event[1]}-->'))
+        else:
+            tokens.append(('markup', None, event[1]))
+    return tokens
+
+
+def minify_html(page_html: str) -> str:
+    """
+    Minifies a page.
+
+    :param page_html: HTML of the page
+    :return: Minified HTML
+    """
+    collector = _EventCollector()
+    collector.feed(page_html)
+    collector.close()
+    tokens = _tokens(collector.events)
+
+    parts = []
+    for index, (kind, tag, text) in enumerate(tokens):
+        if kind == 'end':
+            following = tokens[index + 1] if index + 1 < len(tokens) else None
+            if following is None or all(token[0] == 'end' and token[1] in OMIT_AT_END for token in tokens[index:]):
+                if tag in OMIT_AT_END:
+                    continue
+            elif following[0] == 'start' and following[1] in IMPLIED_END.get(tag, ()):
+                continue
+            elif following[0] == 'end' and tag in OMIT_BEFORE_PARENT_END:
+                continue
+        parts.append(text)
+    return ''.join(parts)
+
+
+class _TreeBuilder(HTMLParser):
+    """
+    Parses a page into nested (tag, attrs, children) tuples, closing elements
+    the way the HTML parser does for omitted end tags. Whitespace is
+    normalized, the content of scripts and styles is compared as parsed.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = ('#document', (), [])
+        self.stack = [self.root]
+
+    def _close(self, tags: set) -> None:
+        while len(self.stack) > 1 and self.stack[-1][0] in tags:
+            self.stack.pop()
+
+    def handle_starttag(self, tag, attrs):
+        self._close({open_tag for open_tag, closers in IMPLIED_END.items() if tag in closers})
+        normalized = []
+        for name, value in attrs:
+            value = value or ''
+            if name == 'style':
+                value = minify_style_attribute(value)
+            normalized.append((name, value))
+        node = (tag, tuple(normalized), [])
+        self.stack[-1][2].append(node)
+        if tag not in VOID_TAGS:
+            self.stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.stack.pop()
+
+    def handle_endtag(self, tag):
+        for depth in range(len(self.stack) - 1, 0, -1):
+            if self.stack[depth][0] == tag:
+                del self.stack[depth:]
+                return
+
+    def handle_data(self, data):
+        parent = self.stack[-1]
+        if parent[0] in RAW_TEXT_TAGS:
+            attrs = dict(parent[1])
+            if attrs.get('type') == 'application/ld+json':
+                try:
+                    data = json.dumps(json.loads(data), sort_keys=True)
+                except json.JSONDecodeError:
+                    pass
+            else:
+                # Minified by css_minifier and jsmin, only their presence is compared
+                data = '<raw text>' if data.strip() else ''
+        elif not any(node[0] in PRESERVE_TAGS for node in self.stack):
+            data = HTML_SPACE_RE.sub(' ', data).strip(' ')
+        if not data:
+            return
+        children = parent[2]
+        if children and isinstance(children[-1], str):
+            # Text split by a comment, the minified page has it in one piece
+            data = children.pop() + data if parent[0] in PRESERVE_TAGS else f'{children.pop()} {data}'
+        children.append(data)
+
+
+def parse_tree(page_html: str) -> tuple:
+    """
+    :param page_html: HTML of a page
+    :return: Element tree of the page, see _TreeBuilder
+    """
+    builder = _TreeBuilder()
+    builder.feed(page_html)
+    builder.close()
+    return builder.root
+
+
+def minify_pages(root: str = SITE_DIR, profiler: Profiler = NULL_PROFILER) -> None:
+    """
+    Minifies every page under root in place, keeping pages that fail the round-trip check.
+
+    :param root: Root directory of the built site
+    :param profiler: Records the minification of each page
+    """
+    before_total = after_total = 0
+    failed = []
+    with profiler.phase('minify pages'):
+        for page_path in find_pages(root):
+            name = os.path.relpath(page_path, root)
+            with profiler.item('page', name) as item:
+                with open(page_path, 'r', encoding='utf-8') as f:
+                    page_html = f.read()
+                minified = minify_html(page_html)
+                if parse_tree(minified) != parse_tree(page_html):
+                    failed.append(name)
+                    minified = page_html
+                item['saved'] = len(page_html) - len(minified)
+            before_total += len(page_html)
+            after_total += len(minified)
+            if minified != page_html:
+                with open(page_path, 'w', encoding='utf-8') as f:
+                    f.write(minified)
+                print(f"Minified: {name} ({len(page_html):,} -> {len(minified):,} bytes)")
+
+    print(f"Pages: {before_total:,} -> {after_total:,} bytes")
+    for name in failed:
+        print(f"Warning: {name} changed structure when minified, left as is")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Minify the HTML of every built page in place.")
+    add_root_argument(parser)
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    with Profiler.from_args('minify_html', args) as profiler:
+        minify_pages(args.root, profiler=profiler)
@@ -1,10 +1,31 @@
 """
 This script optimizes images by resizing them to a maximum width and converting them to WebP format.
+
+Every image also gets narrower variants (and optionally AVIF copies) for
+srcset, listed with their dimensions in assets/images/manifest.json. WebP
+images without a PNG/JPEG source are kept as they are when they fit in
+MAX_WIDTH; wider ones are backed up and re-encoded in place at MAX_WIDTH, like
+the other formats.
+
+Images are encoded across a process pool. A cache in .cache/ keyed on each
+source's content hash and the encoder settings lets untouched images be
+skipped after a single hash check.
 """
 
+import argparse
+import hashlib
+import json
 import os
+import re
 import shutil
-from PIL import Image
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from PIL import Image, features
+
+import instrumentation
+from instrumentation import NULL_PROFILER, Profiler, timed
 
 # Configuration
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -14,66 +35,281 @@ IMAGE_DIRS = [
     os.path.join(ASSETS_DIR, 'images', 'events'),
     os.path.join(ASSETS_DIR, 'images', 'certificates'),
     os.path.join(ASSETS_DIR, 'images', 'badges'),
+    os.path.join(ASSETS_DIR, 'images', 'blogs'),
     os.path.join(ASSETS_DIR, 'images')  # For my-memoji.png
 ]
 BACKUP_DIR = os.path.join(ASSETS_DIR, 'images_backup')
+CACHE_PATH = os.path.join(BASE_DIR, '.cache', 'images.json')
+MANIFEST_PATH = os.path.join(ASSETS_DIR, 'images', 'manifest.json')
 MAX_WIDTH = 800
 QUALITY = 80
+# Widths of the responsive variants, only those narrower than the image are generated
+VARIANT_WIDTHS = (400, 800)
+AVIF_QUALITY = 60
 
+VARIANT_RE = re.compile(r'-\d+w\.(webp|avif)$')
+MIME_TYPES = {'WEBP': 'image/webp', 'AVIF': 'image/avif'}
 
-def optimize_images() -> None:
-    """
-    Optimizes images by resizing them to a maximum width and converting them to WebP format.
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _settings(avif: bool) -> dict:
+    return {'max_width': MAX_WIDTH, 'quality': QUALITY, 'variant_widths': list(VARIANT_WIDTHS),
+            'avif': avif, 'avif_quality': AVIF_QUALITY}
+
+
+def _rel(path: str) -> str:
+    return os.path.relpath(path, BASE_DIR).replace(os.sep, '/')
+
+
+def _load_cache() -> dict:
+    try:
+        with open(CACHE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_cache(cache: dict) -> None:
+    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+    with open(CACHE_PATH, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+
+
+def find_images() -> list:
     """
-    # Create backup directory if it doesn't exist
-    if not os.path.exists(BACKUP_DIR):
-        os.makedirs(BACKUP_DIR)
-        print(f"Created backup directory: {BACKUP_DIR}")
+    Lists the image sources in IMAGE_DIRS: every PNG/JPEG, plus WebP images
+    that have no PNG/JPEG source and are not variants themselves.
 
+    :return: Sorted list of image paths
+    """
+    images = []
     for directory in IMAGE_DIRS:
         if not os.path.exists(directory):
             print(f"Directory not found: {directory}")
             continue
 
-        print(f"Processing directory: {directory}")
-        for filename in os.listdir(directory):
-            if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-                filepath = os.path.join(directory, filename)
+        filenames = os.listdir(directory)
+        stems = {os.path.splitext(f)[0] for f in filenames if f.lower().endswith(('.png', '.jpg', '.jpeg'))}
+        for filename in filenames:
+            filepath = os.path.join(directory, filename)
+            # Skip if it's a directory
+            if os.path.isdir(filepath):
+                continue
+            lower = filename.lower()
+            if lower.endswith(('.png', '.jpg', '.jpeg')):
+                images.append(filepath)
+            elif (lower.endswith('.webp') and not VARIANT_RE.search(lower)
+                  and os.path.splitext(filename)[0] not in stems):
+                images.append(filepath)
+    return sorted(images)
+
+
+def _backup(filepath: str, source_hash: str) -> None:
+    """
+    Copies the original image to BACKUP_DIR unless an identical copy is already there.
+    """
+    rel_path = os.path.relpath(filepath, os.path.join(ASSETS_DIR, 'images'))
+    backup_path = os.path.join(BACKUP_DIR, rel_path)
+    os.makedirs(os.path.dirname(backup_path), exist_ok=True)
+
+    if (os.path.exists(backup_path) and os.path.getsize(backup_path) == os.path.getsize(filepath)
+            and _hash_file(backup_path) == source_hash):
+        return
+    shutil.copy2(filepath, backup_path)
+
+
+def _save_output(img: Image.Image, path: str, image_format: str, outputs: list) -> None:
+    if image_format == 'AVIF':
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA')
+        img.save(path, 'AVIF', quality=AVIF_QUALITY)
+    else:
+        img.save(path, 'WEBP', quality=QUALITY)
+    outputs.append({'path': _rel(path), 'width': img.width, 'height': img.height,
+                    'type': MIME_TYPES[image_format], 'bytes': os.path.getsize(path)})
 
-                # Skip if it's a directory
-                if os.path.isdir(filepath):
-                    continue
 
+def optimize_image(job: tuple) -> dict:
+    """
+    Backs up, resizes and converts a single image to WebP, then writes its responsive variants.
+
+    :param job: Tuple of (image path, source content hash, whether to write AVIF copies)
+    :return: Report of the image: outputs with their sizes, seconds spent and any error
+    """
+    filepath, source_hash, avif = job
+    started = time.perf_counter()
+    stem, extension = os.path.splitext(filepath)
+    webp_path = stem + '.webp'
+    report = {'path': filepath, 'webp_path': webp_path, 'source': source_hash,
+              'source_bytes': os.path.getsize(filepath), 'resized': None, 'outputs': [], 'error': None}
+    outputs = report['outputs']
+
+    try:
+        with Image.open(filepath) as img:
+            if extension.lower() == '.webp' and img.width <= MAX_WIDTH:
+                # Already optimized, keep the file and only add variants
+                img.load()
+                outputs.append({'path': _rel(filepath), 'width': img.width, 'height': img.height,
+                                'type': 'image/webp', 'bytes': report['source_bytes']})
+            elif extension.lower() == '.webp':
+                # Too wide: back up, then replace the source with a copy at MAX_WIDTH
+                _backup(filepath, source_hash)
+                new_height = round(img.height * MAX_WIDTH / img.width)
+                img = img.resize((MAX_WIDTH, new_height), Image.Resampling.LANCZOS)
+                report['resized'] = (MAX_WIDTH, new_height)
+                _save_output(img, webp_path, 'WEBP', outputs)
+                # The re-encoded file is the source from now on, so the next run finds it current
+                report['source'] = _hash_file(webp_path)
+            else:
                 # Backup original
-                rel_path = os.path.relpath(filepath, os.path.join(ASSETS_DIR, 'images'))
-                backup_path = os.path.join(BACKUP_DIR, rel_path)
-                backup_dir = os.path.dirname(backup_path)
+                _backup(filepath, source_hash)
+
+                # Resize if too large
+                if img.width > MAX_WIDTH:
+                    ratio = MAX_WIDTH / img.width
+                    new_height = int(img.height * ratio)
+                    img = img.resize((MAX_WIDTH, new_height), Image.Resampling.LANCZOS)
+                    report['resized'] = (MAX_WIDTH, new_height)
+
+                # Convert to WebP
+                _save_output(img, webp_path, 'WEBP', outputs)
+
+            if avif:
+                _save_output(img, stem + '.avif', 'AVIF', outputs)
+
+            for width in VARIANT_WIDTHS:
+                if width >= img.width:
+                    continue
+                variant = img.resize((width, round(img.height * width / img.width)), Image.Resampling.LANCZOS)
+                _save_output(variant, f'{stem}-{width}w.webp', 'WEBP', outputs)
+                if avif:
+                    _save_output(variant, f'{stem}-{width}w.avif', 'AVIF', outputs)
+    except Exception as e:
+        report['error'] = str(e)
+
+    report['seconds'] = time.perf_counter() - started
+    return report
+
+
+def write_manifest(entries: list) -> None:
+    """
+    Writes the variant manifest used to build srcset attributes.
+
+    :param entries: Cache entries of every current image
+    """
+    manifest = {}
+    for entry in entries:
+        main, *variants = entry['outputs']
+        manifest[main['path']] = {
+            'width': main['width'],
+            'height': main['height'],
+            'variants': [{'path': v['path'], 'width': v['width'], 'type': v['type']} for v in variants]
+        }
+    with open(MANIFEST_PATH, 'w', encoding='utf-8') as f:
+        json.dump(dict(sorted(manifest.items())), f, indent=2)
 
-                if not os.path.exists(backup_dir):
-                    os.makedirs(backup_dir)
 
-                if not os.path.exists(backup_path):
-                    shutil.copy2(filepath, backup_path)
+def _is_current(entry: dict, source_hash: str, settings: dict) -> bool:
+    if not entry or entry['source'] != source_hash or entry['settings'] != settings:
+        return False
+    return all(os.path.exists(os.path.join(BASE_DIR, output['path']))
+               and os.path.getsize(os.path.join(BASE_DIR, output['path'])) == output['bytes']
+               for output in entry['outputs'])
 
-                try:
-                    with Image.open(filepath) as img:
-                        # Resize if too large
-                        if img.width > MAX_WIDTH:
-                            ratio = MAX_WIDTH / img.width
-                            new_height = int(img.height * ratio)
-                            img = img.resize((MAX_WIDTH, new_height), Image.Resampling.LANCZOS)
-                            print(f"Resized {filename} to {MAX_WIDTH}x{new_height}")
 
-                        # Convert to WebP
-                        webp_filename = os.path.splitext(filename)[0] + '.webp'
-                        webp_path = os.path.join(directory, webp_filename)
+def optimize_images(workers: int = 1, force: bool = False, avif: bool = False,
+                    profiler: Profiler = NULL_PROFILER) -> None:
+    """
+    Optimizes images by resizing them to a maximum width and converting them to WebP format.
+
+    :param workers: Number of processes used to encode images
+    :param force: Re-encode every image, ignoring the cache
+    :param avif: Also write AVIF copies of every image and variant
+    :param profiler: Records the phases and the encoding of each image
+    """
+    # Create backup directory if it doesn't exist
+    if not os.path.exists(BACKUP_DIR):
+        os.makedirs(BACKUP_DIR)
+        print(f"Created backup directory: {BACKUP_DIR}")
+
+    if avif and not features.check('avif'):
+        print("Warning: this Pillow build has no AVIF support, writing WebP only.")
+        avif = False
+
+    started = time.perf_counter()
+    previous = {} if force else _load_cache()
+    cache = {}
+    settings = _settings(avif)
+    jobs = []
+
+    with profiler.phase('hash sources'):
+        for filepath in find_images():
+            key = _rel(filepath)
+            source_hash = _hash_file(filepath)
+            if _is_current(previous.get(key), source_hash, settings):
+                cache[key] = previous[key]
+                continue
+            jobs.append((filepath, source_hash, avif))
+    skipped = len(cache)
+
+    encode = partial(timed, optimize_image)
+    with profiler.phase('encode images', images=len(jobs), workers=workers):
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+                results = list(executor.map(encode, jobs))
+        else:
+            results = [encode(job) for job in jobs]
+    reports = [report for report, _ in results]
+
+    saved = 0
+    failed = 0
+    for report, timing in results:
+        profiler.add_item('image', _rel(report['path']), timing, source_bytes=report['source_bytes'],
+                          outputs=len(report['outputs']))
+        filename = os.path.relpath(report['path'], ASSETS_DIR)
+        if report['error']:
+            failed += 1
+            print(f"Failed to process {filename}: {report['error']}")
+            continue
+
+        if report['resized']:
+            print(f"Resized {filename} to {report['resized'][0]}x{report['resized'][1]}")
+        main = report['outputs'][0]
+        delta = report['source_bytes'] - main['bytes']
+        saved += delta
+        variants = ', '.join(f"{v['width']}w {v['type'].split('/')[1]} {v['bytes']:,} B" for v in report['outputs'][1:])
+        print(f"Generated: {main['path']} "
+              f"({report['source_bytes']:,} -> {main['bytes']:,} bytes, saved {delta:,}, "
+              f"{report['seconds'] * 1000:.0f} ms){' + ' + variants if variants else ''}")
+        cache[_rel(report['path'])] = {
+            'source': report['source'],
+            'settings': settings,
+            'outputs': report['outputs']
+        }
 
-                        img.save(webp_path, 'WEBP', quality=QUALITY)
-                        print(f"Generated WebP: {webp_path}")
+    with profiler.phase('write manifest'):
+        _save_cache(cache)
+        write_manifest([cache[key] for key in sorted(cache)])
 
-                except Exception as e:
-                    print(f"Failed to process {filename}: {e}")
+    elapsed = time.perf_counter() - started
+    print(f"\nImages: {len(reports) - failed} encoded, {skipped} unchanged, {failed} failed; "
+          f"saved {saved:,} bytes in {elapsed:.1f}s")
 
 
 if __name__ == "__main__":
-    optimize_images()
+    parser = argparse.ArgumentParser(description="Resize images, convert them to WebP and write responsive variants.")
+    parser.add_argument('--jobs', '-j', type=int, default=0,
+                        help="Number of processes used to encode images (0 uses every CPU core)")
+    parser.add_argument('--force', action='store_true', help="Re-encode every image, ignoring the cache")
+    parser.add_argument('--avif', action='store_true', help="Also write AVIF copies of every image and variant")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    with Profiler.from_args('optimize_images', args) as profiler:
+        optimize_images(workers=args.jobs or os.cpu_count(), force=args.force, avif=args.avif, profiler=profiler)
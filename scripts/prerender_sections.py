@@ -0,0 +1,312 @@
+"""
+This script renders the JSON-driven sections straight into the built pages.
+
+script.js used to fetch education.json, experience.json, events.json,
+certificates.json, projects.json and last_updated.json on every visit and
+build the markup on the client. This stage builds the same markup with
+BeautifulSoup, marks each container with data-prerendered so the script skips
+the fetch, drops the <noscript> fallbacks the containers no longer need and
+the preloads of the JSON files no page fetches any more.
+
+Only client-side enhancements stay in JS: relative "last updated" times,
+filtering and the tilt effect. The card images carry no loading attribute,
+responsive_images runs next and lazy-loads all but the first.
+"""
+
+import argparse
+import json
+import os
+import re
+from datetime import datetime
+
+from bs4 import BeautifulSoup, NavigableString
+
+import instrumentation
+from instrumentation import NULL_PROFILER, Profiler
+from site_pages import SITE_DIR, add_root_argument, find_pages
+
+DATA_DIR = os.path.join('assets', 'data')
+SECTION_FILES = ('education.json', 'experience.json', 'events.json', 'certificates.json',
+                 'projects.json', 'last_updated.json')
+COUNT_RE = re.compile(r'\s*\(\d+\)$')
+# Section containers and the data files script.js fetches to fill them
+SECTION_DATA = {
+    'education-list': ('education.json',),
+    'experience-list': ('experience.json',),
+    'events-list': ('events.json',),
+    'certificates-grid': ('certificates.json',),
+    'project-list': ('projects.json', 'last_updated.json'),
+}
+
+
+def load_data(root: str) -> dict:
+    """
+    Loads the section data files.
+
+    :param root: Root directory of the site
+    :return: Mapping of file name to parsed JSON, missing files are left out
+    """
+    data = {}
+    for filename in SECTION_FILES:
+        try:
+            with open(os.path.join(root, DATA_DIR, filename), 'r', encoding='utf-8') as f:
+                data[filename] = json.load(f)
+        except FileNotFoundError:
+            print(f"Warning: {filename} not found, its section is left to script.js")
+    return data
+
+
+def _delay(index: int, step: float) -> str:
+    return f"animation-delay: {round(index * step, 2):g}s"
+
+
+def _text_tag(soup: BeautifulSoup, name: str, text: str, **attrs) -> object:
+    tag = soup.new_tag(name, attrs=attrs)
+    tag.string = text
+    return tag
+
+
+def render_timeline(soup: BeautifulSoup, items: list, title_key: str, date_key: str) -> list:
+    """
+    Renders education or experience entries as timeline items.
+
+    :param soup: Soup used to create the tags
+    :param items: Entries from education.json or experience.json
+    :param title_key: Key of the entry title
+    :param date_key: Key of the entry period
+    :return: List of <li> tags
+    """
+    rendered = []
+    for index, item in enumerate(items):
+        li = soup.new_tag('li', attrs={'class': 'timeline-item fade-in-up', 'style': _delay(index, 0.1)})
+        li.append(_text_tag(soup, 'h4', item[title_key], **{'class': 'h4 timeline-item-title'}))
+        li.append(_text_tag(soup, 'span', item[date_key]))
+        li.append(_text_tag(soup, 'p', item['description'], **{'class': 'timeline-text'}))
+        rendered.append(li)
+    return rendered
+
+
+def render_events(soup: BeautifulSoup, events: list) -> list:
+    """
+    Renders the event cards of the events page.
+
+    :param soup: Soup used to create the tags
+    :param events: Entries from events.json
+    :return: List of <li> tags
+    """
+    rendered = []
+    for index, event in enumerate(events):
+        li = soup.new_tag('li', attrs={
+            'class': 'event-post-item active fade-in-up',
+            'style': _delay(index, 0.1),
+            'data-filter-item': '',
+            'data-category': event['type'].lower() if event.get('type') else 'organized'
+        })
+        link = soup.new_tag('a', href=event['url'])
+        figure = soup.new_tag('figure', attrs={'class': 'event-banner-box'})
+        figure.append(soup.new_tag('img', src=event['image'], alt=event['title']))
+        link.append(figure)
+
+        content = soup.new_tag('div', attrs={'class': 'event-content'})
+        meta = soup.new_tag('div', attrs={'class': 'event-meta'})
+        meta.append(_text_tag(soup, 'p', event['category'], **{'class': 'event-category'}))
+        meta.append(soup.new_tag('span', attrs={'class': 'dot'}))
+        meta.append(_text_tag(soup, 'time', event['formattedDate'], datetime=event['date']))
+        content.append(meta)
+        content.append(_text_tag(soup, 'h3', event['title'], **{'class': 'h3 event-item-title'}))
+        content.append(_text_tag(soup, 'p', event['description'], **{'class': 'event-text'}))
+        link.append(content)
+        li.append(link)
+        rendered.append(li)
+    return rendered
+
+
+def render_certificates(soup: BeautifulSoup, certificates: list) -> list:
+    """
+    Renders the certificate cards of the certifications page.
+
+    :param soup: Soup used to create the tags
+    :param certificates: Entries from certificates.json
+    :return: List of <div> tags
+    """
+    rendered = []
+    for index, cert in enumerate(certificates):
+        item = soup.new_tag('div', attrs={'class': 'certificate-item fade-in-up', 'style': _delay(index, 0.05)})
+        link = soup.new_tag('a', href=cert['url'], target='_blank', rel='noopener noreferrer')
+        link.append(soup.new_tag('img', src=cert['image'], alt=cert['title']))
+        item.append(link)
+
+        content = soup.new_tag('div', attrs={'class': 'certificate-content'})
+        content.append(_text_tag(soup, 'h3', cert['title'], **{'class': 'h4 certificate-title'}))
+        content.append(_text_tag(soup, 'p', cert['issuer'], **{'class': 'certificate-issuer'}))
+        content.append(_text_tag(soup, 'time', cert['date'], **{'class': 'certificate-date'}))
+        item.append(content)
+        rendered.append(item)
+    return rendered
+
+
+def _parse_date(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def sort_projects(projects: list, updates: dict) -> list:
+    """
+    Orders projects by their last push, most recent first, projects without one last.
+
+    :param projects: Entries from projects.json
+    :param updates: Mapping of repository to push date from last_updated.json
+    :return: Copies of the projects with an 'updated_at' key
+    """
+    with_updates = [{**project, 'updated_at': updates.get(project['github']) if project.get('github') else None}
+                    for project in projects]
+    return sorted(with_updates, key=lambda p: (p['updated_at'] is None,
+                                               -_parse_date(p['updated_at']).timestamp() if p['updated_at'] else 0))
+
+
+def render_projects(soup: BeautifulSoup, projects: list) -> list:
+    """
+    Renders the project cards of the projects page.
+
+    :param soup: Soup used to create the tags
+    :param projects: Projects in display order, from sort_projects()
+    :return: List of <li> tags
+    """
+    rendered = []
+    for index, project in enumerate(projects):
+        li = soup.new_tag('li', attrs={
+            'class': 'project-item active fade-in-up featured' if index == 0 else 'project-item active fade-in-up',
+            'style': _delay(index, 0.1),
+            'data-filter-item': '',
+            'data-category': project['category'].lower()
+        })
+        link = soup.new_tag('a', href=project['url'], target='_blank', rel='noopener noreferrer',
+                            style='display: block; height: 100%;')
+        figure = soup.new_tag('figure', attrs={'class': 'project-img'})
+        icon_box = soup.new_tag('div', attrs={'class': 'project-item-icon-box'})
+        icon_box.append(soup.new_tag('ion-icon', attrs={'name': 'eye-outline'}))
+        figure.append(icon_box)
+        figure.append(soup.new_tag('img', src=project['image'], alt=project['alt']))
+        link.append(figure)
+
+        info = soup.new_tag('div', attrs={'class': 'project-info'})
+        info.append(_text_tag(soup, 'h3', project['title'], **{'class': 'project-title'}))
+        info.append(_text_tag(soup, 'p', project['category_desc'], **{'class': 'project-category'}))
+        if project['updated_at']:
+            # The absolute date is replaced with a relative one by script.js
+            updated = _text_tag(soup, 'p', 'Last updated: ', **{'class': 'project-category'})
+            pushed = _parse_date(project['updated_at'])
+            updated.append(_text_tag(soup, 'time', f"{pushed:%b} {pushed.day}, {pushed.year}",
+                                     datetime=project['updated_at'], **{'data-time-ago': ''}))
+            info.append(updated)
+        tags = soup.new_tag('div', attrs={'class': 'project-tags'})
+        for tag in project['tags']:
+            tags.append(_text_tag(soup, 'span', tag, **{'class': 'tag'}))
+        info.append(tags)
+        link.append(info)
+        li.append(link)
+        rendered.append(li)
+    return rendered
+
+
+def _update_filter_counts(soup: BeautifulSoup, projects: list) -> None:
+    counts = {'all': len(projects)}
+    for project in projects:
+        category = project['category'].lower()
+        counts[category] = counts.get(category, 0) + 1
+    for button in soup.select('[data-filter-btn], [data-select-item]'):
+        base_text = COUNT_RE.sub('', button.get_text()).strip()
+        if base_text.lower() in counts:
+            button.string = f"{base_text}\xa0({counts[base_text.lower()]})"
+
+
+def _remove(tag) -> None:
+    # Take the indentation before the tag along, so no blank line is left behind
+    previous = tag.previous_sibling
+    if isinstance(previous, NavigableString) and not previous.strip():
+        previous.extract()
+    tag.decompose()
+
+
+def _fill(container, items: list) -> None:
+    container.clear()
+    for item in items:
+        container.append(item)
+    container['data-prerendered'] = ''
+
+    # The <noscript> fallback that follows the container duplicates what is now static
+    sibling = container.find_next_sibling()
+    if sibling is not None and sibling.name == 'noscript':
+        _remove(sibling)
+
+
+def prerender_page(page_html: str, data: dict) -> str:
+    """
+    Renders every section container of a page that has its data.
+
+    :param page_html: HTML of the page
+    :param data: Section data from load_data()
+    :return: The rendered page
+    """
+    soup = BeautifulSoup(page_html, 'html.parser')
+
+    timelines = (('education-list', 'education.json', 'institution', 'duration'),
+                 ('experience-list', 'experience.json', 'role', 'date'))
+    for container_id, filename, title_key, date_key in timelines:
+        container = soup.find(id=container_id)
+        if container is not None and filename in data:
+            _fill(container, render_timeline(soup, data[filename], title_key, date_key))
+
+    container = soup.find(id='events-list')
+    if container is not None and 'events.json' in data:
+        _fill(container, render_events(soup, data['events.json']))
+
+    container = soup.find(id='certificates-grid')
+    if container is not None and 'certificates.json' in data:
+        _fill(container, render_certificates(soup, data['certificates.json']))
+
+    container = soup.find(id='project-list')
+    if container is not None and 'projects.json' in data:
+        projects = sort_projects(data['projects.json'], data.get('last_updated.json', {}))
+        _fill(container, render_projects(soup, projects))
+        _update_filter_counts(soup, projects)
+
+    # Every page is prerendered from the same data, so nothing fetches these files any more
+    for link in soup.find_all('link', rel='preload'):
+        href = link.get('href', '')
+        if '/data/' in href and os.path.basename(href.split('?', 1)[0]) in data:
+            _remove(link)
+
+    return str(soup)
+
+
+def prerender_sections(root: str = SITE_DIR, profiler: Profiler = NULL_PROFILER) -> None:
+    """
+    Prerenders the JSON-driven sections of every page under root in place.
+
+    :param root: Root directory of the built site
+    :param profiler: Records the rendering of each page
+    """
+    data = load_data(root)
+    markers = tuple(f'id="{container_id}"' for container_id in SECTION_DATA) + (
+        'data/projects.json', 'data/last_updated.json')
+    with profiler.phase('prerender pages'):
+        for page_path in find_pages(root):
+            with open(page_path, 'r', encoding='utf-8') as f:
+                page_html = f.read()
+            if not any(marker in page_html for marker in markers):
+                continue
+            with profiler.item('page', os.path.relpath(page_path, root)):
+                rendered = prerender_page(page_html, data)
+            if rendered != page_html:
+                with open(page_path, 'w', encoding='utf-8') as f:
+                    f.write(rendered)
+                print(f"Prerendered: {os.path.relpath(page_path, root)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the JSON-driven sections into the pages.")
+    add_root_argument(parser)
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    with Profiler.from_args('prerender_sections', args) as profiler:
+        prerender_sections(args.root, profiler=profiler)
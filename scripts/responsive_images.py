@@ -0,0 +1,242 @@
+"""
+This script rewrites the <img> tags of the built pages for responsive loading.
+
+Every local image gets explicit width/height (to avoid layout shift) and
+decoding="async" unless the tag already sets them. Images are lazy-loaded,
+except the sidebar avatar and the first content image of each page (a post's
+hero, the featured project), which are above the fold and likely the largest
+contentful paint: the latter gets fetchpriority="high" instead. Images with
+variants in assets/images/manifest.json also get srcset and a sizes matching
+their container (grid card or article body), and are wrapped in a <picture>
+when AVIF variants exist.
+
+Tags are edited in place, leaving the rest of each page untouched, and
+running the script again is a no-op.
+"""
+
+import argparse
+import html
+import json
+import os
+import re
+from html.parser import HTMLParser
+
+from PIL import Image
+
+import instrumentation
+from instrumentation import NULL_PROFILER, Profiler
+from site_pages import SITE_DIR, add_root_argument, find_pages, resolve_url
+
+MANIFEST_PATH = os.path.join('assets', 'images', 'manifest.json')
+# Layout width of content images: full width on phones, capped by the article column elsewhere
+DEFAULT_SIZES = '(max-width: 580px) 100vw, 800px'
+# Layout width of images in grid cards, by the class of the card's image box (see style.css):
+# projects and events are one column below 768px and about 400px wide above it,
+# certificates are one column below 1024px and three columns of about 300px above it
+CONTAINER_SIZES = {
+    'project-img': '(max-width: 767px) 100vw, 400px',
+    'event-banner-box': '(max-width: 767px) 100vw, 400px',
+    'certificate-item': '(max-width: 1023px) 100vw, 300px',
+    'blog-post-content': DEFAULT_SIZES,
+}
+VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source',
+                 'track', 'wbr'}
+
+SVG_SIZE_RE = re.compile(r'<svg\b[^>]*?\bwidth="([\d.]+)(?:px)?"[^>]*?\bheight="([\d.]+)(?:px)?"', re.S)
+SVG_VIEWBOX_RE = re.compile(r'<svg\b[^>]*?\bviewBox="[\d.-]+[ ,]+[\d.-]+[ ,]+([\d.]+)[ ,]+([\d.]+)"', re.S)
+
+
+class _ImageTagFinder(HTMLParser):
+    """
+    Records the raw text and position of every <img> start tag, with where it sits:
+    inside a <picture>, inside the sidebar, and the sizes of its container.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tags = []
+        self._open = []  # (tag, container sizes or None)
+
+    def _inside(self, tag: str) -> bool:
+        return any(open_tag == tag for open_tag, _ in self._open)
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'img':
+            sizes = next((sizes for _, sizes in reversed(self._open) if sizes), None)
+            self.tags.append((self.getpos(), self.get_starttag_text(), dict(attrs), self._inside('picture'),
+                              self._inside('aside'), sizes))
+        elif tag not in VOID_ELEMENTS:
+            classes = (dict(attrs).get('class') or '').split()
+            self._open.append((tag, next((CONTAINER_SIZES[c] for c in classes if c in CONTAINER_SIZES), None)))
+
+    def handle_startendtag(self, tag, attrs):
+        if tag == 'img':
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        # Closes any element left open inside it, as browsers do
+        for index in range(len(self._open) - 1, -1, -1):
+            if self._open[index][0] == tag:
+                del self._open[index:]
+                break
+
+
+def _image_size(path: str, manifest_entry: dict, sizes: dict) -> tuple:
+    """
+    Returns the intrinsic (width, height) of an image, or None if unknown.
+    """
+    if manifest_entry:
+        return manifest_entry['width'], manifest_entry['height']
+    if path in sizes:
+        return sizes[path]
+
+    size = None
+    try:
+        if path.lower().endswith('.svg'):
+            with open(path, 'r', encoding='utf-8') as f:
+                svg = f.read(4096)
+            match = SVG_SIZE_RE.search(svg) or SVG_VIEWBOX_RE.search(svg)
+            if match:
+                size = (round(float(match.group(1))), round(float(match.group(2))))
+        else:
+            with Image.open(path) as img:
+                size = img.size
+    except (OSError, ValueError):
+        pass
+    sizes[path] = size
+    return size
+
+
+def _srcset(src: str, width: int, variants: list) -> str:
+    base_url = src.rsplit('/', 1)[0] + '/' if '/' in src else ''
+    candidates = [f"{base_url}{os.path.basename(v['path'])} {v['width']}w" for v in variants]
+    if src:
+        candidates.append(f"{src} {width}w")
+    return ', '.join(candidates)
+
+
+def _format_attrs(attrs: dict) -> str:
+    return ''.join(f' {name}="{html.escape(str(value), quote=True)}"' for name, value in attrs.items())
+
+
+def rewrite_page(page_html: str, page_path: str, root: str, manifest: dict, sizes: dict) -> str:
+    """
+    Adds responsive attributes to the <img> tags of a page.
+
+    :param page_html: HTML of the page
+    :param page_path: Path of the page, used to resolve relative image URLs
+    :param root: Root directory of the site
+    :param manifest: Image variant manifest
+    :param sizes: Cache of intrinsic sizes, shared between pages
+    :return: The rewritten HTML
+    """
+    finder = _ImageTagFinder()
+    finder.feed(page_html)
+    finder.close()
+
+    line_offsets = [0]
+    for line in page_html.splitlines(keepends=True):
+        line_offsets.append(line_offsets[-1] + len(line))
+
+    # The top of the page's content: the first image outside the sidebar with variants, icons do not count
+    first_content = None
+    for index, (_, _, attrs, _, in_sidebar, _) in enumerate(finder.tags):
+        path = resolve_url(attrs.get('src') or '', page_path, root)
+        if not in_sidebar and path and os.path.relpath(path, root).replace(os.sep, '/') in manifest:
+            first_content = index
+            break
+
+    # Replace from the end so earlier offsets stay valid
+    for index in range(len(finder.tags) - 1, -1, -1):
+        (line, column), tag_text, attrs, in_picture, in_sidebar, container_sizes = finder.tags[index]
+        start = line_offsets[line - 1] + column
+        if page_html[start:start + len(tag_text)] != tag_text:
+            continue
+
+        added = {}
+        src = attrs.get('src') or ''
+        path = resolve_url(src, page_path, root)
+        entry = None
+        if path and os.path.exists(path):
+            entry = manifest.get(os.path.relpath(path, root).replace(os.sep, '/'))
+            size = _image_size(path, entry, sizes)
+            if size:
+                width, height = size
+                if 'width' not in attrs and 'height' not in attrs:
+                    added['width'], added['height'] = width, height
+                elif 'height' not in attrs and str(attrs['width']).isdigit():
+                    added['height'] = round(int(attrs['width']) * height / width)
+                elif 'width' not in attrs and str(attrs['height']).isdigit():
+                    added['width'] = round(int(attrs['height']) * width / height)
+
+        webp_variants = [v for v in (entry or {}).get('variants', []) if v['type'] == 'image/webp']
+        avif_variants = [v for v in (entry or {}).get('variants', []) if v['type'] == 'image/avif']
+        displayed_width = attrs.get('width')
+        sizes_attr = f'{displayed_width}px' if str(displayed_width).isdigit() else container_sizes or DEFAULT_SIZES
+        if webp_variants and 'srcset' not in attrs:
+            added['srcset'] = _srcset(src, entry['width'], webp_variants)
+            added['sizes'] = sizes_attr
+        if index == first_content:
+            if 'loading' not in attrs and 'fetchpriority' not in attrs:
+                added['fetchpriority'] = 'high'
+        elif 'loading' not in attrs and not in_sidebar:
+            added['loading'] = 'lazy'
+        if 'decoding' not in attrs:
+            added['decoding'] = 'async'
+
+        if not added:
+            continue
+
+        # Append after the last attribute, keeping the whitespace the tag was closed with
+        closing = '/>' if tag_text.endswith('/>') else '>'
+        body = tag_text[:-len(closing)]
+        attrs_end = len(body.rstrip())
+        new_tag = f'{body[:attrs_end]}{_format_attrs(added)}{body[attrs_end:]}{closing}'
+
+        if avif_variants and not in_picture and 'srcset' in added:
+            # The AVIF main image is listed with the variants, at the full width
+            avif_srcset = _srcset('', 0, avif_variants)
+            new_tag = (f'<picture><source type="image/avif"{_format_attrs({"srcset": avif_srcset, "sizes": sizes_attr})}>'
+                       f'{new_tag}</picture>')
+
+        page_html = page_html[:start] + new_tag + page_html[start + len(tag_text):]
+
+    return page_html
+
+
+def load_manifest(root: str) -> dict:
+    try:
+        with open(os.path.join(root, MANIFEST_PATH), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def rewrite_images(root: str = SITE_DIR, profiler: Profiler = NULL_PROFILER) -> None:
+    """
+    Rewrites the <img> tags of every page under root in place.
+
+    :param root: Root directory of the built site
+    :param profiler: Records the rewriting of each page
+    """
+    manifest = load_manifest(root)
+    sizes = {}
+    with profiler.phase('rewrite pages'):
+        for page_path in find_pages(root):
+            with profiler.item('page', os.path.relpath(page_path, root)):
+                with open(page_path, 'r', encoding='utf-8') as f:
+                    page_html = f.read()
+                rewritten = rewrite_page(page_html, page_path, root, manifest, sizes)
+                if rewritten != page_html:
+                    with open(page_path, 'w', encoding='utf-8') as f:
+                        f.write(rewritten)
+                    print(f"Rewrote images in: {os.path.relpath(page_path, root)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add srcset, sizes and intrinsic dimensions to <img> tags.")
+    add_root_argument(parser)
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    with Profiler.from_args('responsive_images', args) as profiler:
+        rewrite_images(args.root, profiler=profiler)
@@ -0,0 +1,211 @@
+"""
+This module builds the full-text search index for the blog posts.
+
+Terms from titles, tags, descriptions and body text are tokenized, stemmed
+and weighted per field. The inverted index is sharded by the first two
+characters of each term so the browser only downloads the shards a query
+touches. Each shard maps a term to a flat list of (doc id gap, weight)
+pairs, with doc ids delta-encoded in ascending order.
+
+The tokenizer and stemmer are mirrored in assets/js/modules/blog-search.js, keep both in sync.
+"""
+
+import glob
+import json
+import os
+import re
+
+from bs4 import BeautifulSoup
+
+PREFIX_LENGTH = 2
+FIELD_WEIGHTS = {'title': 5, 'tags': 3, 'description': 2, 'body': 1}
+STOP_WORDS = frozenset((
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'for', 'from', 'has', 'have',
+    'i', 'if', 'in', 'into', 'is', 'it', 'its', 'of', 'on', 'or', 'so', 'that', 'the',
+    'their', 'then', 'there', 'these', 'this', 'to', 'was', 'we', 'were', 'will', 'with', 'you'
+))
+# Suffixes tried in order, the first one that leaves a stem of at least 3 characters wins
+STEM_SUFFIXES = (
+    ('ational', 'ate'), ('ization', 'ize'), ('fulness', 'ful'), ('iveness', 'ive'),
+    ('ousness', 'ous'), ('ations', 'ate'), ('ation', 'ate'), ('ments', ''), ('ment', ''),
+    ('ness', ''), ('ingly', ''), ('ings', ''), ('ing', ''), ('edly', ''), ('ies', 'y'),
+    ('ied', 'y'), ('ed', ''), ('ly', ''), ('s', '')
+)
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def stem(word: str) -> str:
+    """
+    Reduces a word to its stem with a small set of suffix rules.
+
+    :param word: Lowercase word
+    :return: The stemmed word
+    """
+    if len(word) <= 3 or word.isdigit():
+        return word
+    for suffix, replacement in STEM_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            if suffix == 's' and word.endswith(('ss', 'us', 'is')):
+                return word
+            return word[:-len(suffix)] + replacement
+    return word
+
+
+def tokenize(text: str) -> list:
+    """
+    Splits text into stemmed search terms, dropping stop words and single characters.
+
+    :param text: Text to tokenize
+    :return: List of terms, in order of appearance
+    """
+    return [stem(token) for token in TOKEN_RE.findall(text.lower())
+            if len(token) >= PREFIX_LENGTH and token not in STOP_WORDS]
+
+
+def extract_terms(meta: dict, html_content: str) -> dict:
+    """
+    Computes the weighted terms of a post.
+
+    :param meta: Post metadata (title, tags, description)
+    :param html_content: Rendered HTML of the post body
+    :return: Mapping of term to weight
+    """
+    fields = {
+        'title': str(meta.get('title', '')),
+        'tags': ' '.join(str(tag) for tag in meta.get('tags', [])),
+        'description': str(meta.get('description', '')),
+        'body': BeautifulSoup(html_content, 'html.parser').get_text(' ')
+    }
+    terms = {}
+    for field, text in fields.items():
+        for term in tokenize(text):
+            terms[term] = terms.get(term, 0) + FIELD_WEIGHTS[field]
+    return terms
+
+
+class SearchIndex:
+    """
+    The on-disk search index, updated in place one document at a time.
+
+    docs.json lists every document as [slug, title, date] by doc id, along
+    with the names of the existing shards. Only shards touched by an update
+    are loaded and rewritten.
+    """
+
+    def __init__(self, directory: str, reset: bool = False):
+        self.directory = directory
+        self.docs = []
+        self.shard_names = set()
+        self._shards = {}
+        self._dirty = set()
+
+        if reset:
+            for path in glob.glob(os.path.join(directory, '*.json')):
+                os.remove(path)
+            return
+
+        try:
+            with open(os.path.join(directory, 'docs.json'), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.docs = data['docs']
+            self.shard_names = set(data['shards'])
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+
+    @property
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.directory, 'docs.json'))
+
+    def _shard(self, prefix: str) -> dict:
+        """
+        Loads and decodes a shard into {term: {doc id: weight}}.
+        """
+        if prefix not in self._shards:
+            shard = {}
+            if prefix in self.shard_names:
+                with open(os.path.join(self.directory, f'{prefix}.json'), 'r', encoding='utf-8') as f:
+                    for term, encoded in json.load(f).items():
+                        postings = {}
+                        doc_id = 0
+                        for i in range(0, len(encoded), 2):
+                            doc_id += encoded[i]
+                            postings[doc_id] = encoded[i + 1]
+                        shard[term] = postings
+            self._shards[prefix] = shard
+        return self._shards[prefix]
+
+    def remove(self, slug: str, prefixes: list) -> None:
+        """
+        Removes a document and its postings.
+
+        :param slug: Slug of the document
+        :param prefixes: Shards the document has postings in
+        """
+        doc_id = next((i for i, doc in enumerate(self.docs) if doc and doc[0] == slug), None)
+        if doc_id is None:
+            return
+        for prefix in prefixes:
+            shard = self._shard(prefix)
+            for term in list(shard):
+                if shard[term].pop(doc_id, None) is not None:
+                    self._dirty.add(prefix)
+                    if not shard[term]:
+                        del shard[term]
+        self.docs[doc_id] = None
+
+    def add(self, slug: str, title: str, date: str, terms: dict) -> list:
+        """
+        Adds a document, reusing the first free doc id.
+
+        :param slug: Slug of the document
+        :param title: Title shown in search results
+        :param date: Date shown in search results
+        :param terms: Mapping of term to weight
+        :return: Sorted list of the shards the document has postings in
+        """
+        doc = [slug, title, str(date)]
+        doc_id = next((i for i, existing in enumerate(self.docs) if existing is None), len(self.docs))
+        if doc_id == len(self.docs):
+            self.docs.append(doc)
+        else:
+            self.docs[doc_id] = doc
+
+        prefixes = set()
+        for term, weight in terms.items():
+            prefix = term[:PREFIX_LENGTH]
+            self._shard(prefix).setdefault(term, {})[doc_id] = weight
+            prefixes.add(prefix)
+        self._dirty.update(prefixes)
+        return sorted(prefixes)
+
+    def save(self) -> None:
+        """
+        Writes the touched shards and docs.json.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        for prefix in sorted(self._dirty):
+            shard = self._shards[prefix]
+            path = os.path.join(self.directory, f'{prefix}.json')
+            if not shard:
+                self.shard_names.discard(prefix)
+                if os.path.exists(path):
+                    os.remove(path)
+                continue
+
+            encoded = {}
+            for term in sorted(shard):
+                flat = []
+                previous = 0
+                for doc_id in sorted(shard[term]):
+                    flat += [doc_id - previous, shard[term][doc_id]]
+                    previous = doc_id
+                encoded[term] = flat
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(encoded, f, separators=(',', ':'))
+            self.shard_names.add(prefix)
+        self._dirty.clear()
+
+        while self.docs and self.docs[-1] is None:
+            self.docs.pop()
+        with open(os.path.join(self.directory, 'docs.json'), 'w', encoding='utf-8') as f:
+            json.dump({'shards': sorted(self.shard_names), 'docs': self.docs}, f, separators=(',', ':'))
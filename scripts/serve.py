@@ -0,0 +1,253 @@
+"""
+This script serves the site locally and rebuilds it while you edit.
+
+It polls _blogs/, index.html, assets/css/style.css, the JavaScript sources
+(script.js and its section modules) and the image sources. A change rebuilds only the outputs it affects: a post
+re-renders that post (build_blogs keeps the rest), style.css only re-minifies
+the stylesheet, an image only re-encodes that image. The rebuilds run in this
+process with every module already imported, so a save costs the rebuild
+itself, not a script start-up.
+
+Open tabs are told to refresh through a Server-Sent Events stream. A
+stylesheet change swaps the stylesheets in place instead of reloading the
+page. The reload snippet is injected into served HTML only, nothing on disk
+changes.
+"""
+
+import argparse
+import glob
+import http.server
+import os
+import threading
+import time
+import traceback
+
+import build_blogs
+import minify_assets
+import optimize_images
+from site_pages import BASE_DIR
+
+POLL_INTERVAL = 0.2  # seconds
+RELOAD_PATH = '/__livereload'
+PING_INTERVAL = 15  # seconds, keeps idle streams alive and detects closed tabs
+
+CSS_PATH = os.path.join(BASE_DIR, 'assets', 'css', 'style.css')
+JS_DIR = os.path.join(BASE_DIR, 'assets', 'js')
+TEMPLATE_PATH = os.path.join(BASE_DIR, 'index.html')
+
+RELOAD_SNIPPET = f"""<script>
+new EventSource('{RELOAD_PATH}').onmessage = (event) => {{
+  if (event.data !== 'css') return location.reload();
+  document.querySelectorAll('link[rel="stylesheet"]').forEach((link) => {{
+    const url = new URL(link.href);
+    if (url.origin !== location.origin) return;
+    url.searchParams.set('livereload', Date.now());
+    link.href = url.href;
+  }});
+}};
+</script>
+"""
+
+
+class ReloadChannel:
+    """
+    Hands reload events from the watcher to every open event stream.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self.version = 0
+        self.kind = None
+
+    def publish(self, kind: str) -> None:
+        """
+        :param kind: 'css' to swap stylesheets, 'reload' to reload the page
+        """
+        with self._condition:
+            self.version += 1
+            self.kind = kind
+            self._condition.notify_all()
+
+    def wait(self, version: int, timeout: float) -> tuple:
+        """
+        Blocks until an event newer than version is published.
+
+        :param version: Last version the caller has seen
+        :param timeout: Seconds to wait
+        :return: Tuple of (version, kind), kind is None on timeout
+        """
+        with self._condition:
+            if self._condition.wait_for(lambda: self.version != version, timeout):
+                return self.version, self.kind
+            return version, None
+
+
+class DevServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple, channel: ReloadChannel):
+        self.channel = channel
+        super().__init__(address, DevRequestHandler)
+
+
+class DevRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """
+    Serves BASE_DIR uncached, injects the reload snippet into HTML and streams reload events.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=BASE_DIR, **kwargs)
+
+    def end_headers(self) -> None:
+        self.send_header('Cache-Control', 'no-store')
+        super().end_headers()
+
+    def log_request(self, code='-', size='-') -> None:
+        # Only failed requests are worth a line while editing
+        if isinstance(code, int) and code >= 400:
+            super().log_request(code, size)
+
+    def do_GET(self) -> None:
+        url_path = self.path.split('?', 1)[0].split('#', 1)[0]
+        if url_path == RELOAD_PATH:
+            self._stream_reloads()
+            return
+
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and url_path.endswith('/'):
+            path = os.path.join(path, 'index.html')
+        if path.endswith('.html') and os.path.isfile(path):
+            self._send_html(path)
+        else:
+            super().do_GET()
+
+    def _send_html(self, path: str) -> None:
+        with open(path, 'rb') as f:
+            body = f.read()
+        position = body.rfind(b'</body>')
+        if position == -1:
+            position = len(body)
+        body = body[:position] + RELOAD_SNIPPET.encode('utf-8') + body[position:]
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_reloads(self) -> None:
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        channel = self.server.channel
+        version = channel.version
+        try:
+            while True:
+                version, kind = channel.wait(version, PING_INTERVAL)
+                self.wfile.write(f'data: {kind}\n\n'.encode('utf-8') if kind else b': ping\n\n')
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def _image_sources() -> list:
+    # The PNG/JPEG sources only, the optimizer writes the WebP files next to them
+    sources = []
+    for directory in optimize_images.IMAGE_DIRS:
+        if os.path.isdir(directory):
+            sources.extend(entry.path for entry in os.scandir(directory)
+                           if entry.is_file() and entry.name.lower().endswith(('.png', '.jpg', '.jpeg')))
+    return sources
+
+
+def snapshot() -> dict:
+    """
+    Records the mtime and size of every watched file.
+
+    :return: Mapping of path to (mtime_ns, size)
+    """
+    paths = glob.glob(os.path.join(build_blogs.BLOGS_DIR, '*.md')) + [TEMPLATE_PATH, CSS_PATH]
+    paths += minify_assets.js_sources(os.path.dirname(JS_DIR))
+    paths += _image_sources()
+    state = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        state[path] = (stat.st_mtime_ns, stat.st_size)
+    return state
+
+
+def rebuild(changed: set, workers: int = 1) -> str:
+    """
+    Rebuilds the outputs affected by changed files.
+
+    :param changed: Paths that were added, modified or removed
+    :param workers: Processes used to render posts and encode images
+    :return: Reload kind for the browser: 'css' when only the stylesheet changed, else 'reload'
+    """
+    blog_sources = {path for path in changed if path.startswith(build_blogs.BLOGS_DIR + os.sep)}
+    scripts = {path for path in changed if path.startswith(JS_DIR + os.sep)}
+    images = changed - blog_sources - scripts - {TEMPLATE_PATH, CSS_PATH}
+
+    if images:
+        optimize_images.optimize_images(workers=workers)
+    if blog_sources or TEMPLATE_PATH in changed:
+        build_blogs.build_blogs(workers=workers)
+    if CSS_PATH in changed or scripts:
+        minify_assets.process_assets(css=CSS_PATH in changed, js=bool(scripts))
+    return 'css' if changed == {CSS_PATH} else 'reload'
+
+
+def watch(channel: ReloadChannel, interval: float = POLL_INTERVAL) -> None:
+    """
+    Polls the watched files, rebuilds on change and publishes reload events. Runs until interrupted.
+
+    :param channel: Channel of the open event streams
+    :param interval: Seconds between polls
+    """
+    state = snapshot()
+    while True:
+        time.sleep(interval)
+        current = snapshot()
+        changed = {path for path in state.keys() | current.keys() if state.get(path) != current.get(path)}
+        state = current
+        if not changed:
+            continue
+
+        names = ', '.join(sorted(os.path.relpath(path, BASE_DIR) for path in changed))
+        print(f"Changed: {names}")
+        started = time.perf_counter()
+        try:
+            kind = rebuild(changed)
+        except Exception:
+            # Keep serving, the next save gets another try
+            traceback.print_exc()
+            continue
+        print(f"Rebuilt in {time.perf_counter() - started:.2f}s, sending {kind}")
+        channel.publish(kind)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the site locally, rebuild on change and live-reload the browser.")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on")
+    parser.add_argument('--port', type=int, default=8000, help="Port to listen on")
+    parser.add_argument('--no-build', action='store_true', help="Skip the initial build")
+    args = parser.parse_args()
+
+    if not args.no_build:
+        optimize_images.optimize_images(workers=os.cpu_count())
+        build_blogs.build_blogs(workers=os.cpu_count())
+        minify_assets.process_assets()
+
+    reload_channel = ReloadChannel()
+    server = DevServer((args.host, args.port), reload_channel)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"\nServing {BASE_DIR} at http://{args.host}:{args.port}/ (Ctrl+C to stop)")
+    try:
+        watch(reload_channel)
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    finally:
+        server.shutdown()
@@ -0,0 +1,250 @@
+"""
+This script generates the service worker of the built site.
+
+It runs after fingerprint_assets and reads assets/asset-manifest.json. The
+shell, every stylesheet and script plus the section modules they import and
+the images all pages share (the memoji, the favicon), is precached under its fingerprinted URL. At runtime:
+
+- pages (navigations) and assets/data/*.json are served stale-while-revalidate,
+  and an uncached page falls back to the home page when offline
+- images are cache-first, in a cache capped at MAX_IMAGES entries; a hit
+  moves the entry to the back, so the least recently used images go first
+
+The cache names of the shell, pages and data carry a revision hashed from the
+manifest and the worker code, so a deploy that changes any asset installs a
+new worker that drops the old caches. The image cache survives deploys, only
+fingerprinted images that left the manifest are evicted from it.
+
+The worker is written to sw.js at the root, and a registration snippet is
+added before </body> of every page. Running the script again is a no-op.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+
+import instrumentation
+from fingerprint_assets import HASH_LENGTH, MANIFEST_PATH
+from instrumentation import NULL_PROFILER, Profiler
+from site_pages import SITE_DIR, add_root_argument, find_pages
+
+WORKER_NAME = 'sw.js'
+CACHE_PREFIX = 'sayyedasif'
+MAX_IMAGES = 80
+SHELL_EXTENSIONS = ('.css', '.js')
+IMAGE_EXTENSIONS = ('.webp', '.avif', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico')
+
+REGISTER_SNIPPET = ("<script data-service-worker>if('serviceWorker' in navigator)"
+                    "addEventListener('load',()=>navigator.serviceWorker.register('/sw.js'))</script>")
+
+WORKER_TEMPLATE = """// Generated by scripts/service_worker.py, do not edit
+const REVISION = %(revision)s;
+const PRECACHE_URLS = %(precache)s;
+const FINGERPRINTED_IMAGES = new Set(%(images)s);
+const MAX_IMAGES = %(max_images)d;
+
+const PRECACHE = `%(prefix)s-shell-${REVISION}`;
+const PAGES = `%(prefix)s-pages-${REVISION}`;
+const DATA = `%(prefix)s-data-${REVISION}`;
+const IMAGES = '%(prefix)s-images';
+const HASHED_RE = /\\.[0-9a-f]{%(hash_length)d}\\.\\w+$/;
+
+self.addEventListener('install', (event) => {
+  event.waitUntil((async () => {
+    await (await caches.open(PRECACHE)).addAll(PRECACHE_URLS);
+    // The offline fallback of pages not visited yet
+    await (await caches.open(PAGES)).add('/');
+    await self.skipWaiting();
+  })());
+});
+
+self.addEventListener('activate', (event) => {
+  event.waitUntil((async () => {
+    const current = [PRECACHE, PAGES, DATA, IMAGES];
+    for (const name of await caches.keys()) {
+      if (name.startsWith('%(prefix)s-') && !current.includes(name)) await caches.delete(name);
+    }
+    const images = await caches.open(IMAGES);
+    for (const request of await images.keys()) {
+      const path = new URL(request.url).pathname;
+      if (HASHED_RE.test(path) && !FINGERPRINTED_IMAGES.has(path)) await images.delete(request);
+    }
+    await self.clients.claim();
+  })());
+});
+
+const staleWhileRevalidate = async (event, cacheName, fallback) => {
+  const cache = await caches.open(cacheName);
+  const cached = await cache.match(event.request, { ignoreSearch: event.request.mode === 'navigate' });
+  const network = fetch(event.request).then((response) => {
+    // A redirected response can not answer a navigation, it is only passed through
+    if (response.ok && !response.redirected) return cache.put(event.request, response.clone()).then(() => response);
+    return response;
+  });
+  if (cached) {
+    event.waitUntil(network.catch(() => {}));
+    return cached;
+  }
+  return network.catch(async (error) => {
+    const offline = fallback && await cache.match(fallback);
+    if (offline) return offline;
+    throw error;
+  });
+};
+
+const cacheFirstImage = async (event) => {
+  const cache = await caches.open(IMAGES);
+  const cached = await cache.match(event.request);
+  if (cached) {
+    // Re-inserted, so the keys stay in least recently used order
+    event.waitUntil(cache.delete(event.request).then(() => cache.put(event.request, cached.clone())));
+    return cached;
+  }
+  const response = await fetch(event.request);
+  if (response.ok) {
+    event.waitUntil((async () => {
+      await cache.put(event.request, response.clone());
+      const keys = await cache.keys();
+      for (const request of keys.slice(0, Math.max(0, keys.length - MAX_IMAGES))) await cache.delete(request);
+    })());
+  }
+  return response;
+};
+
+self.addEventListener('fetch', (event) => {
+  const request = event.request;
+  const url = new URL(request.url);
+  if (request.method !== 'GET' || url.origin !== self.location.origin) return;
+
+  if (PRECACHE_URLS.includes(url.pathname)) {
+    event.respondWith(caches.match(request, { cacheName: PRECACHE }).then((cached) => cached || fetch(request)));
+  } else if (request.mode === 'navigate') {
+    event.respondWith(staleWhileRevalidate(event, PAGES, '/'));
+  } else if (url.pathname.startsWith('/assets/data/') && url.pathname.endsWith('.json')) {
+    event.respondWith(staleWhileRevalidate(event, DATA));
+  } else if (request.destination === 'image') {
+    event.respondWith(cacheFirstImage(event));
+  }
+});
+"""
+
+
+def _url(path: str) -> str:
+    return '/' + path.replace(os.sep, '/')
+
+
+def shell_urls(manifest: dict, pages: list, scripts: dict = None) -> list:
+    """
+    Lists the fingerprinted URLs of the shell: every stylesheet and script a
+    page links, the modules those scripts import, and the images linked by
+    every page.
+
+    :param manifest: Original to hashed path, relative to the root
+    :param pages: Texts of the built pages
+    :param scripts: Hashed path to text of the fingerprinted scripts, to follow their imports
+    :return: Sorted root-absolute URLs
+    """
+    scripts = scripts or {}
+    shell = set()
+    for hashed in manifest.values():
+        name = os.path.basename(hashed)
+        extension = os.path.splitext(name)[1].lower()
+        if extension in SHELL_EXTENSIONS and any(name in page for page in pages):
+            shell.add(hashed)
+        elif extension in IMAGE_EXTENSIONS and pages and all(name in page for page in pages):
+            shell.add(hashed)
+
+    # Modules are imported by path from the scripts, which may import further modules
+    pending = [hashed for hashed in shell if hashed in scripts]
+    while pending:
+        text = scripts[pending.pop()]
+        for hashed in scripts:
+            if hashed not in shell and _url(hashed) in text:
+                shell.add(hashed)
+                pending.append(hashed)
+    return sorted(_url(hashed) for hashed in shell)
+
+
+def generate_worker(manifest: dict, precache: list) -> str:
+    """
+    Returns the code of the service worker.
+
+    :param manifest: Original to hashed path, relative to the root
+    :param precache: URLs of the shell, from shell_urls()
+    :return: JavaScript source of sw.js
+    """
+    images = sorted(_url(hashed) for hashed in manifest.values()
+                    if os.path.splitext(hashed)[1].lower() in IMAGE_EXTENSIONS)
+    # Changes with any asset and with the worker code itself
+    revision = hashlib.sha256(json.dumps([WORKER_TEMPLATE, MAX_IMAGES, manifest], sort_keys=True)
+                              .encode('utf-8')).hexdigest()[:HASH_LENGTH]
+    return WORKER_TEMPLATE % {'revision': json.dumps(revision), 'precache': json.dumps(precache),
+                              'images': json.dumps(images), 'max_images': MAX_IMAGES, 'prefix': CACHE_PREFIX,
+                              'hash_length': HASH_LENGTH}
+
+
+def add_registration(page_html: str) -> str:
+    """
+    Adds the registration snippet before </body>, unless the page already has it.
+
+    :param page_html: HTML of the page
+    :return: The page with the snippet
+    """
+    if 'data-service-worker' in page_html:
+        return page_html
+    position = page_html.rfind('</body>')
+    if position == -1:
+        position = len(page_html)
+    return page_html[:position] + REGISTER_SNIPPET + page_html[position:]
+
+
+def build_service_worker(root: str = SITE_DIR, profiler: Profiler = NULL_PROFILER) -> None:
+    """
+    Writes sw.js and registers it in every page under root.
+
+    :param root: Root directory of the built site (edited in place)
+    :param profiler: Records the phases of the run
+    """
+    try:
+        with open(os.path.join(root, MANIFEST_PATH), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        print(f"No asset manifest at {os.path.join(root, MANIFEST_PATH)}, run fingerprint_assets.py first.")
+        return
+
+    page_paths = find_pages(root)
+    pages = {}
+    for page_path in page_paths:
+        with open(page_path, 'r', encoding='utf-8') as f:
+            pages[page_path] = f.read()
+
+    with profiler.phase('generate worker'):
+        scripts = {}
+        for hashed in manifest.values():
+            if hashed.endswith('.js'):
+                with open(os.path.join(root, hashed), 'r', encoding='utf-8') as f:
+                    scripts[hashed] = f.read()
+        precache = shell_urls(manifest, list(pages.values()), scripts)
+        code = generate_worker(manifest, precache)
+    worker_path = os.path.join(root, WORKER_NAME)
+    with open(worker_path, 'w', encoding='utf-8') as f:
+        f.write(code)
+    print(f"Wrote {worker_path} ({len(code):,} bytes, {len(precache)} precached URLs)")
+
+    with profiler.phase('register in pages'):
+        for page_path, page_html in pages.items():
+            registered = add_registration(page_html)
+            if registered != page_html:
+                with open(page_path, 'w', encoding='utf-8') as f:
+                    f.write(registered)
+                print(f"Registered the service worker in: {os.path.relpath(page_path, root)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate sw.js from the asset manifest and register it in every page.")
+    add_root_argument(parser)
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    with Profiler.from_args('service_worker', args) as profiler:
+        build_service_worker(args.root, profiler=profiler)
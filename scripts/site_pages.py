@@ -0,0 +1,72 @@
+"""
+This module locates the HTML pages of the built site.
+
+The pages are index.html plus the index.html of every section and blog post
+directory. The repository root holds their sources, the build writes the
+blog pages next to them; export_site.py copies what is served into _site/,
+the directory the deploy stages rewrite and the workflow publishes.
+"""
+
+import argparse
+import os
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Copy of the site the deploy stages rewrite, written by export_site.py
+SITE_DIR = os.path.join(BASE_DIR, '_site')
+
+# Directories that never contain served pages
+EXCLUDED_DIRS = {'assets', 'scripts', 'node_modules'}
+
+
+def find_pages(root: str = BASE_DIR) -> list:
+    """
+    Lists every served HTML page under root.
+
+    :param root: Root directory of the site
+    :return: Sorted list of absolute page paths
+    """
+    pages = []
+    for directory, subdirs, filenames in os.walk(root):
+        # Hidden and underscore directories (.git, .cache, _blogs) are sources, not pages
+        subdirs[:] = sorted(d for d in subdirs if not d.startswith(('.', '_')) and d not in EXCLUDED_DIRS)
+        pages.extend(os.path.join(directory, f) for f in filenames if f.endswith('.html'))
+    return sorted(pages)
+
+
+def _deploy_root(path: str) -> str:
+    root = os.path.abspath(path)
+    if root == BASE_DIR:
+        raise argparse.ArgumentTypeError("the deploy stages rewrite pages in place, run them on the export "
+                                         "(python scripts/export_site.py), not on the repository")
+    if not os.path.isdir(root):
+        raise argparse.ArgumentTypeError(f"{root} does not exist, run python scripts/export_site.py first")
+    return root
+
+
+def add_root_argument(parser: argparse.ArgumentParser, edited: bool = True) -> None:
+    """
+    Adds --root to the parser of a deploy stage: the exported site, never the repository itself.
+
+    :param parser: Parser of the script
+    :param edited: Whether the script rewrites the files under root
+    """
+    parser.add_argument('--root', default=SITE_DIR, type=_deploy_root,
+                        help=f"Root directory of the exported site{' (edited in place)' if edited else ''} "
+                             f"(default: _site)")
+
+
+def resolve_url(url: str, page_path: str, root: str = BASE_DIR) -> str:
+    """
+    Maps a URL referenced by a page to a file under root.
+
+    :param url: URL as written in the page
+    :param page_path: Path of the page referencing it
+    :param root: Root directory of the site
+    :return: Absolute file path, or None for external and data URLs
+    """
+    if not url or url.startswith(('http:', 'https:', '//', 'data:', 'mailto:', '#')):
+        return None
+    path = url.split('#', 1)[0].split('?', 1)[0]
+    if path.startswith('/'):
+        return os.path.normpath(os.path.join(root, path.lstrip('/')))
+    return os.path.normpath(os.path.join(os.path.dirname(page_path), path))
@@ -0,0 +1,9 @@
+"""
+Makes the scripts importable the way they import each other: as top-level
+modules from scripts/.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
@@ -0,0 +1,89 @@
+"""
+Runs the browser search of assets/js/modules/blog-search.js, source and
+minified, with Node against an index written by search_index.py.
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from search_index import SearchIndex, extract_terms
+
+MODULES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets', 'js', 'modules')
+IMPORT_RE = re.compile(r'''import\s*\{[^}]*\}\s*from\s*['"][^'"]+['"];?''')
+DOCS = {
+    'learning': ('Learning in public', 'What I learned from writing about machine learning.'),
+    'caching': ('Caching responses', 'Revalidation with ETags, and caching in the service worker.'),
+    'images': ('Responsive images', 'Smaller images for smaller screens.'),
+}
+# Reads the module with fetchJson served from the index directory, then prints the results of every query
+RUNNER = """
+import { readFileSync } from 'node:fs';
+const [modulePath, root, queries] = process.argv.slice(2);
+globalThis.fetchJson = async (url) => JSON.parse(readFileSync(root + url, 'utf8'));
+const { blogSearch } = await import(modulePath);
+const results = {};
+for (const query of JSON.parse(queries)) {
+  results[query] = (await blogSearch.search(query)).map(([slug]) => slug);
+}
+console.log(JSON.stringify(results));
+"""
+
+
+@pytest.fixture(scope='module')
+def search(tmp_path_factory):
+    if not shutil.which('node'):
+        pytest.skip('node is not installed')
+    root = tmp_path_factory.mktemp('site')
+    index = SearchIndex(str(root / 'assets' / 'data' / 'search'))
+    for slug, (title, body) in DOCS.items():
+        index.add(slug, title, '2025-01-01', extract_terms({'title': title, 'tags': []}, f'<p>{body}</p>'))
+    index.save()
+
+    with open(root / 'runner.mjs', 'w', encoding='utf-8') as f:
+        f.write(RUNNER)
+    for name in ('blog-search.js', 'blog-search.min.js'):
+        with open(os.path.join(MODULES_DIR, name), 'r', encoding='utf-8') as f:
+            source = f.read()
+        # The stub replaces the shared module, blogSearch is exported for the runner
+        with open(root / name.replace('.js', '.mjs'), 'w', encoding='utf-8') as f:
+            f.write(IMPORT_RE.sub('const { fetchJson } = globalThis;', source, count=1) + '\nexport { blogSearch };\n')
+
+    def run(queries: list, module: str = 'blog-search.mjs') -> dict:
+        process = subprocess.run(['node', str(root / 'runner.mjs'), str(root / module), str(root), json.dumps(queries)],
+                                 capture_output=True, text=True, check=True)
+        return json.loads(process.stdout)
+    return run
+
+
+def test_last_word_matches_while_typing(search):
+    results = search(['lea', 'learn', 'learnin', 'learning', 'cachi', 'revalidati', 'imag'])
+    assert results == {
+        'lea': ['learning'],
+        'learn': ['learning'],
+        # Typed past the stem: "learnin" and "cachi" are the start of "learning" and "caching"
+        'learnin': ['learning'],
+        'learning': ['learning'],
+        'cachi': ['caching'],
+        'revalidati': ['caching'],
+        'imag': ['images'],
+    }
+
+
+def test_typed_words_that_complete_nothing_match_nothing(search):
+    assert search(['learnix', 'cachingz', 'imagery']) == {'learnix': [], 'cachingz': [], 'imagery': []}
+
+
+def test_only_the_last_word_is_a_prefix(search):
+    results = search(['learnin public', 'learning publi', 'smaller imag', 'caching learnin'])
+    assert results == {'learnin public': [], 'learning publi': ['learning'], 'smaller imag': ['images'],
+                       'caching learnin': []}
+
+
+def test_minified_module_matches_the_source(search):
+    queries = ['learnin', 'cachi', 'learning publi', 'smaller imag', 'service work', 'learnix']
+    assert search(queries, 'blog-search.min.mjs') == search(queries)
@@ -0,0 +1,179 @@
+"""
+Runs the build orchestrator on stub stages in a temporary tree: which
+stages .cache/build_state.json lets it skip and what makes a stage run again.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import build
+from build import Stage
+
+# Appends its stage name to runs.log and writes out/<name>.txt, or fails when the input says so
+STAGE_SCRIPT = """
+import os
+import sys
+
+name, source = sys.argv[1], sys.argv[2]
+with open(source, encoding='utf-8') as f:
+    content = f.read()
+with open('runs.log', 'a', encoding='utf-8') as f:
+    f.write(name + '\\n')
+if content == 'fail':
+    sys.exit('stage failed')
+os.makedirs('out', exist_ok=True)
+with open(os.path.join('out', name + '.txt'), 'w', encoding='utf-8') as f:
+    f.write(content)
+"""
+
+
+def write(root, name: str, content: str) -> None:
+    path = os.path.join(root, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
+def stage(name: str, source: str, deps: list = (), always: bool = False, extra: list = ()) -> Stage:
+    return Stage(name, 'stage.py', args=[name, source, *extra], inputs=build._files(source),
+                 outputs=[f'out/{name}.txt'], deps=deps, always=always)
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    """
+    A tree with a stage script and one source per stage, with build.py pointed at it.
+    """
+    monkeypatch.setattr(build, 'BASE_DIR', str(tmp_path))
+    monkeypatch.setattr(build, 'SCRIPTS_DIR', str(tmp_path / 'scripts'))
+    monkeypatch.setattr(build, 'STATE_PATH', str(tmp_path / '.cache' / 'build_state.json'))
+    write(tmp_path, 'scripts/stage.py', STAGE_SCRIPT)
+    for name in ('a', 'b', 'c'):
+        write(tmp_path, f'src/{name}.txt', name)
+    return tmp_path
+
+
+def stages(**overrides) -> dict:
+    """
+    a and b are independent, c depends on both.
+    """
+    defined = {'a': stage('a', 'src/a.txt'), 'b': stage('b', 'src/b.txt'),
+               'c': stage('c', 'src/c.txt', deps=['a', 'b'])}
+    defined.update(overrides)
+    return defined
+
+
+def runs(root) -> list:
+    """
+    Returns the stages run since the last call, in order.
+    """
+    path = os.path.join(root, 'runs.log')
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        names = f.read().split()
+    os.remove(path)
+    return names
+
+
+def test_unchanged_stages_are_skipped(tree):
+    assert build.build(['a', 'b', 'c'], stages())
+    ran = runs(tree)
+    assert sorted(ran) == ['a', 'b', 'c'] and ran[-1] == 'c'
+    with open(build.STATE_PATH, encoding='utf-8') as f:
+        state = json.load(f)
+    assert state['a']['args'] == ['a', 'src/a.txt']
+    assert list(state['a']['inputs']) == ['src/a.txt']
+
+    assert build.build(['a', 'b', 'c'], stages())
+    assert runs(tree) == []
+
+
+def test_changed_input_reruns_only_that_stage(tree):
+    build.build(['a', 'b', 'c'], stages())
+    runs(tree)
+
+    write(tree, 'src/b.txt', 'b changed')
+    assert build.build(['a', 'b', 'c'], stages())
+    assert runs(tree) == ['b']
+
+
+def test_touched_input_with_the_same_content_is_skipped(tree):
+    build.build(['a'], stages())
+    runs(tree)
+
+    stat = os.stat(tree / 'src' / 'a.txt')
+    os.utime(tree / 'src' / 'a.txt', ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    build.build(['a'], stages())
+    assert runs(tree) == []
+
+
+def test_new_input_file_reruns_the_stage(tree):
+    defined = stages(a=Stage('a', 'stage.py', args=['a', 'src/a.txt'], inputs=build._files('src/a*.txt'),
+                             outputs=['out/a.txt']))
+    build.build(['a'], defined)
+    runs(tree)
+
+    write(tree, 'src/a2.txt', 'another input')
+    build.build(['a'], defined)
+    assert runs(tree) == ['a']
+
+
+def test_changed_arguments_rerun_the_stage(tree):
+    build.build(['a'], stages())
+    runs(tree)
+
+    build.build(['a'], stages(a=stage('a', 'src/a.txt', extra=['--verbose'])))
+    assert runs(tree) == ['a']
+
+
+def test_missing_output_reruns_the_stage(tree):
+    build.build(['a', 'b'], stages())
+    runs(tree)
+
+    os.remove(tree / 'out' / 'a.txt')
+    build.build(['a', 'b'], stages())
+    assert runs(tree) == ['a']
+
+
+def test_force_and_always_run_regardless(tree):
+    build.build(['a', 'b'], stages())
+    runs(tree)
+
+    build.build(['a', 'b'], stages(), force=True)
+    assert sorted(runs(tree)) == ['a', 'b']
+    build.build(['a', 'b'], stages(b=stage('b', 'src/b.txt', always=True)))
+    assert runs(tree) == ['b']
+
+
+def test_failed_stage_blocks_dependents_and_runs_again(tree):
+    write(tree, 'src/a.txt', 'fail')
+    assert not build.build(['a', 'b', 'c'], stages())
+    assert sorted(runs(tree)) == ['a', 'b']
+    with open(build.STATE_PATH, encoding='utf-8') as f:
+        assert sorted(json.load(f)) == ['b']
+
+    # Nothing changed, but a failed stage has no state to be current against
+    assert not build.build(['a', 'b', 'c'], stages())
+    assert runs(tree) == ['a']
+
+    write(tree, 'src/a.txt', 'a fixed')
+    assert build.build(['a', 'b', 'c'], stages())
+    assert runs(tree) == ['a', 'c']
+
+
+def test_deselected_dependencies_are_ignored(tree):
+    assert build.build(['c'], stages())
+    assert runs(tree) == ['c']
+
+
+
+def test_site_must_not_be_the_repository():
+    process = subprocess.run([sys.executable, os.path.join(build.SCRIPTS_DIR, 'build.py'), 'prerender',
+                              '--site', build.BASE_DIR], capture_output=True, text=True)
+    assert process.returncode == 2
+    assert '--site must not be the repository root' in process.stderr
@@ -0,0 +1,236 @@
+"""
+Runs build_blogs on a few posts in a temporary tree: what the manifest lets
+it skip, what invalidates it, and that rendering across processes writes
+the same files as rendering serially.
+"""
+
+import os
+import shutil
+from functools import partial
+
+import pytest
+
+import build_blogs
+from code_highlight import CachedHighlightExtension
+from search_index import SearchIndex
+
+POST = """---
+title: "{title}"
+date: "{date}"
+description: "About {topic}"
+tags: ["{topic}", "testing"]
+---
+
+## {title}
+
+Some text about {topic}, with a [link](https://example.com/{slug}).
+
+```python
+def {slug_name}():
+    return "{topic}"
+```
+"""
+
+
+def write_post(root, slug: str, date: str, topic: str, title: str = None) -> None:
+    with open(os.path.join(root, '_blogs', f'{slug}.md'), 'w', encoding='utf-8') as f:
+        f.write(POST.format(title=title or f'Post {slug}', date=date, topic=topic, slug=slug,
+                            slug_name=slug.replace('-', '_')))
+
+
+def built_posts(output: str) -> list:
+    return sorted(line.split(': ', 1)[1] for line in output.splitlines() if line.startswith('Built post: '))
+
+
+def snapshot(root) -> dict:
+    """
+    Every file the build wrote, by path relative to root.
+    """
+    files = {}
+    for directory in ('blogs', 'assets'):
+        for dirpath, _, filenames in os.walk(os.path.join(root, directory)):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                with open(path, 'rb') as f:
+                    files[os.path.relpath(path, root)] = f.read()
+    return files
+
+
+def search_postings(directory: str) -> tuple:
+    """
+    The documents and postings of a search index, keyed by slug since doc ids depend on the order of updates.
+    """
+    index = SearchIndex(directory)
+    slugs = [doc[0] if doc else None for doc in index.docs]
+    postings = {prefix: {term: {slugs[doc_id]: weight for doc_id, weight in docs.items()}
+                         for term, docs in index._shard(prefix).items()}
+                for prefix in index.shard_names}
+    return {doc[0]: doc[1:] for doc in index.docs if doc}, postings
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    """
+    A tree with the site's template and five posts, with build_blogs pointed at it.
+    """
+    os.makedirs(tmp_path / '_blogs')
+    shutil.copy(build_blogs.TEMPLATE_PATH, tmp_path / 'index.html')
+    data = tmp_path / 'assets' / 'data'
+    for name, path in (('BLOGS_DIR', tmp_path / '_blogs'), ('OUTPUT_DIR', tmp_path / 'blogs'),
+                       ('TEMPLATE_PATH', tmp_path / 'index.html'), ('DATA_PATH', data / 'blogs.json'),
+                       ('DATA_DIR', data / 'blogs'), ('SEARCH_DIR', data / 'search'),
+                       ('MANIFEST_PATH', tmp_path / '.cache' / 'blogs_manifest.json')):
+        monkeypatch.setattr(build_blogs, name, str(path))
+    monkeypatch.setattr(build_blogs.code_highlight, 'write_stylesheet', lambda: False)
+    monkeypatch.setattr(build_blogs, 'CachedHighlightExtension',
+                        partial(CachedHighlightExtension, cache_dir=str(tmp_path / '.cache' / 'highlight')))
+    for number, topic in enumerate(('search', 'images', 'caching', 'parsing', 'workers'), start=1):
+        write_post(tmp_path, f'post-{number}', f'2025-0{number}-01', topic)
+    return tmp_path
+
+
+def test_first_build_writes_every_post(site, capsys):
+    build_blogs.build_blogs()
+    assert built_posts(capsys.readouterr().out) == [f'post-{number}' for number in range(1, 6)]
+    for number in range(1, 6):
+        assert os.path.isfile(site / 'blogs' / f'post-{number}' / 'index.html')
+        assert os.path.isfile(site / 'assets' / 'data' / 'blogs' / 'posts' / f'post-{number}.json')
+    assert os.path.isfile(site / 'blogs' / 'index.html')
+
+
+def test_unchanged_posts_are_skipped(site, capsys):
+    build_blogs.build_blogs()
+    before = snapshot(site)
+    capsys.readouterr()
+
+    build_blogs.build_blogs()
+    output = capsys.readouterr().out
+    assert built_posts(output) == []
+    assert 'Blogs are up to date.' in output
+    assert snapshot(site) == before
+
+
+def test_changed_source_rebuilds_only_that_post(site, capsys):
+    build_blogs.build_blogs()
+    capsys.readouterr()
+
+    with open(site / '_blogs' / 'post-2.md', 'a', encoding='utf-8') as f:
+        f.write('\nA new paragraph.\n')
+    build_blogs.build_blogs()
+    output = capsys.readouterr().out
+    assert built_posts(output) == ['post-2']
+    # The front matter did not change, so neither did the listing
+    assert 'Built listing' not in output
+    with open(site / 'blogs' / 'post-2' / 'index.html', encoding='utf-8') as f:
+        assert 'A new paragraph.' in f.read()
+
+
+def test_changed_front_matter_rewrites_the_listing(site, capsys):
+    build_blogs.build_blogs()
+    capsys.readouterr()
+
+    write_post(site, 'post-3', '2025-03-01', 'caching', title='Renamed post')
+    build_blogs.build_blogs()
+    output = capsys.readouterr().out
+    assert built_posts(output) == ['post-3']
+    assert 'Built listing' in output
+    with open(site / 'blogs' / 'index.html', encoding='utf-8') as f:
+        assert 'Renamed post' in f.read()
+
+
+def test_template_change_rebuilds_every_post(site, capsys):
+    build_blogs.build_blogs()
+    capsys.readouterr()
+
+    with open(site / 'index.html', 'r', encoding='utf-8') as f:
+        template = f.read()
+    with open(site / 'index.html', 'w', encoding='utf-8') as f:
+        f.write(template.replace('</head>', '<meta name="x-test" content="changed">\n</head>', 1))
+    build_blogs.build_blogs()
+    output = capsys.readouterr().out
+    assert built_posts(output) == [f'post-{number}' for number in range(1, 6)]
+    assert 'Built listing' in output
+    with open(site / 'blogs' / 'post-1' / 'index.html', encoding='utf-8') as f:
+        assert 'name="x-test"' in f.read()
+
+
+def test_build_version_change_rebuilds_every_post(site, capsys, monkeypatch):
+    build_blogs.build_blogs()
+    capsys.readouterr()
+
+    monkeypatch.setattr(build_blogs, 'BUILD_VERSION', build_blogs.BUILD_VERSION + 1)
+    build_blogs.build_blogs()
+    assert built_posts(capsys.readouterr().out) == [f'post-{number}' for number in range(1, 6)]
+
+
+def test_missing_output_is_rebuilt(site, capsys):
+    build_blogs.build_blogs()
+    capsys.readouterr()
+
+    os.remove(site / 'blogs' / 'post-4' / 'index.html')
+    build_blogs.build_blogs()
+    assert built_posts(capsys.readouterr().out) == ['post-4']
+    assert os.path.isfile(site / 'blogs' / 'post-4' / 'index.html')
+
+
+def test_deleted_source_removes_the_post(site, capsys):
+    build_blogs.build_blogs()
+    capsys.readouterr()
+
+    os.remove(site / '_blogs' / 'post-5.md')
+    build_blogs.build_blogs()
+    output = capsys.readouterr().out
+    assert 'Removed post: post-5' in output
+    assert not os.path.exists(site / 'blogs' / 'post-5')
+    assert not os.path.exists(site / 'assets' / 'data' / 'blogs' / 'posts' / 'post-5.json')
+    with open(site / 'blogs' / 'index.html', encoding='utf-8') as f:
+        assert 'post-5' not in f.read()
+
+
+def test_parallel_build_matches_serial_build(site):
+    build_blogs.build_blogs(workers=1)
+    serial = snapshot(site)
+    shutil.rmtree(site / 'blogs')
+    shutil.rmtree(site / 'assets')
+
+    build_blogs.build_blogs(force=True, workers=4)
+    assert snapshot(site) == serial
+
+
+def test_incremental_search_index_matches_forced_build(site):
+    build_blogs.build_blogs()
+    write_post(site, 'post-2', '2025-02-01', 'compression')
+    os.remove(site / '_blogs' / 'post-5.md')
+    write_post(site, 'post-6', '2025-06-01', 'prefetching')
+    build_blogs.build_blogs()
+    search_dir = build_blogs.SEARCH_DIR
+    incremental = search_postings(search_dir)
+    assert 'post-5' not in incremental[0]
+    assert any('compression' in terms for terms in incremental[1].values())
+
+    build_blogs.build_blogs(force=True)
+    assert search_postings(search_dir) == incremental
+    assert sorted(os.listdir(search_dir)) == sorted([f'{prefix}.json' for prefix in incremental[1]] + ['docs.json'])
+
+
+def test_listing_is_paginated_and_shrinks_back(site):
+    build_blogs.build_blogs(listing_page_size=2)
+    pages = site / 'blogs' / build_blogs.LISTING_PAGES_DIR
+    assert sorted(os.listdir(pages)) == ['2', '3']
+    with open(pages / '3' / 'index.html', encoding='utf-8') as f:
+        last = f.read()
+    assert 'href="../../../blogs/post-1/"' in last and 'href="/blogs/page/2/"' in last and 'rel="next"' not in last
+
+    build_blogs.build_blogs(listing_page_size=4)
+    assert os.listdir(pages) == ['2']
+    build_blogs.build_blogs(listing_page_size=10)
+    assert not os.path.exists(pages)
+    with open(site / 'blogs' / 'index.html', encoding='utf-8') as f:
+        assert 'blog-pagination' not in f.read()
+
+
+def test_post_cannot_take_the_listing_pages_slug(site):
+    write_post(site, build_blogs.LISTING_PAGES_DIR, '2025-07-01', 'pagination')
+    with pytest.raises(SystemExit, match="reserved for the listing pages"):
+        build_blogs.build_blogs()
+    assert not os.path.exists(site / 'blogs' / build_blogs.LISTING_PAGES_DIR)
@@ -0,0 +1,18 @@
+import pytest
+
+from css_minifier import minify
+
+
+@pytest.mark.parametrize('css, expected', [
+    ('a { margin: 0px 0.50em; color: #FFFFFF }', 'a{margin:0 .5em;color:#fff}'),
+    ('a { width: calc(100% - 0px) }', 'a{width:calc(100% - 0px)}'),
+    ('p { font-weight: bold }', 'p{font-weight:700}'),
+])
+def test_shortens_values(css, expected):
+    assert minify(css) == expected
+
+
+@pytest.mark.parametrize('value', ['U+0025-00FF', 'U+0000', 'u+4??', 'U+0-7F', 'U+0025-00FF,U+4??'])
+def test_keeps_unicode_ranges(value):
+    css = f'@font-face {{ font-family: x; unicode-range: {value.replace(",", ", ")} }}'
+    assert minify(css) == f'@font-face{{font-family:x;unicode-range:{value}}}'
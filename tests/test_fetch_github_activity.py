@@ -0,0 +1,50 @@
+"""
+Checks how fetch_repos_graphql reads GraphQL responses, errors included.
+"""
+
+from fetch_github_activity import fetch_repos_graphql
+
+
+class FakeResponse:
+    def __init__(self, payload: dict):
+        self.payload = payload
+
+    def raise_for_status(self) -> None:
+        pass
+
+    def json(self) -> dict:
+        return self.payload
+
+
+class FakeClient:
+    """
+    Answers every GraphQL query with the same payload.
+    """
+
+    def __init__(self, payload: dict):
+        self.payload = payload
+
+    def post(self, url: str, json_body: dict = None) -> FakeResponse:
+        return FakeResponse(self.payload)
+
+
+def repository(pushed_at: str, *topics: str) -> dict:
+    return {'pushedAt': pushed_at, 'repositoryTopics': {'nodes': [{'topic': {'name': t}} for t in topics]}}
+
+
+def test_partial_data_is_kept_and_errors_are_logged(capsys):
+    client = FakeClient({
+        'data': {'r0': repository('2025-01-01T00:00:00Z', 'python'), 'r1': None},
+        'errors': [{'type': 'NOT_FOUND', 'path': ['r1'], 'message': "Could not resolve to a Repository."}]
+    })
+    results = fetch_repos_graphql(client, ['me/kept', 'me/renamed'])
+    assert results == {'me/kept': {'pushed_at': '2025-01-01T00:00:00Z', 'topics': ['python']}}
+    assert "GraphQL error for me/renamed: Could not resolve to a Repository." in capsys.readouterr().out
+
+
+def test_errors_without_data_are_logged_before_falling_back(capsys):
+    client = FakeClient({'data': None, 'errors': [{'message': "Bad credentials"}]})
+    assert fetch_repos_graphql(client, ['me/a', 'me/b']) == {}
+    output = capsys.readouterr().out
+    assert "GraphQL error for batch of 2 repositories: Bad credentials" in output
+    assert "returned no data, falling back to REST" in output
@@ -0,0 +1,126 @@
+"""
+Runs fingerprint_assets on a small site: the module paths of import() and
+import ... from, the references of pages and stylesheets, and the stability
+of the hashed names across builds.
+"""
+
+import json
+import os
+import re
+
+import pytest
+
+from fingerprint_assets import MANIFEST_PATH, fingerprint_assets
+
+FILES = {
+    'index.html': '<!DOCTYPE html><html><head>'
+                  '<link rel="stylesheet" href="./assets/css/style.css">'
+                  '<link rel="preload" href="/assets/css/style.css?v=2" as="style">'
+                  '<link rel="stylesheet" href="https://fonts.example.com/font.css">'
+                  '<script type="module" src="/assets/js/main.js"></script>'
+                  '</head><body><img src="./assets/images/logo.png" alt=""></body></html>',
+    'blogs/post/index.html': '<!DOCTYPE html><html><head>'
+                             '<link rel="stylesheet" href="../../assets/css/style.css">'
+                             '</head><body><img src="../../assets/images/logo.png" alt=""></body></html>',
+    'assets/css/style.css': '.hero{background:url(../images/bg.png)}',
+    'assets/js/main.js': "const load = () => import('/assets/js/modules/lazy.js');\n"
+                         "fetch('/assets/data/items.json');\n",
+    'assets/js/modules/lazy.js': "import { shared } from '/assets/js/modules/shared.js';\nexport const lazy = shared;\n",
+    'assets/js/modules/shared.js': 'export const shared = 1;\n',
+    'assets/js/modules/unused.js': 'export const unused = 1;\n',
+    'assets/data/items.json': '{"image": "/assets/images/logo.png"}',
+    'assets/images/logo.png': 'logo',
+    'assets/images/bg.png': 'background',
+}
+HASHED_NAME_RE = r'\.[0-9a-f]{10}\.'
+
+
+def write_site(root) -> None:
+    for name, content in FILES.items():
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+
+def read(root, name: str) -> str:
+    with open(os.path.join(root, name), encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.fixture
+def site(tmp_path):
+    root = str(tmp_path / 'site')
+    write_site(root)
+    return root
+
+
+def test_module_paths_are_rewritten(site):
+    manifest = fingerprint_assets(site)
+    main = read(site, manifest['assets/js/main.js'])
+    lazy = read(site, manifest['assets/js/modules/lazy.js'])
+    assert f"import('/{manifest['assets/js/modules/lazy.js']}')" in main
+    assert f"fetch('/{manifest['assets/data/items.json']}')" in main
+    assert f"from '/{manifest['assets/js/modules/shared.js']}'" in lazy
+    assert f"\"/{manifest['assets/images/logo.png']}\"" in read(site, manifest['assets/data/items.json'])
+
+
+def test_page_and_stylesheet_references_are_rewritten(site):
+    manifest = fingerprint_assets(site)
+    page = read(site, 'index.html')
+    style = os.path.basename(manifest['assets/css/style.css'])
+    assert f'href="./assets/css/{style}"' in page
+    assert f'href="/assets/css/{style}?v=2"' in page
+    assert f'src="/{manifest["assets/js/main.js"]}"' in page
+    assert f'src="./{manifest["assets/images/logo.png"]}"' in page
+    assert 'href="https://fonts.example.com/font.css"' in page
+
+    post = read(site, os.path.join('blogs', 'post', 'index.html'))
+    assert f'href="../../assets/css/{style}"' in post
+    assert f'src="../../{manifest["assets/images/logo.png"]}"' in post
+
+    bg = os.path.basename(manifest['assets/images/bg.png'])
+    assert read(site, manifest['assets/css/style.css']) == f'.hero{{background:url(../images/{bg})}}'
+
+
+def test_only_referenced_assets_are_fingerprinted(site):
+    manifest = fingerprint_assets(site)
+    assert sorted(manifest) == sorted(name for name in FILES if name.startswith('assets/')
+                                      and name != 'assets/js/modules/unused.js')
+    for original, hashed in manifest.items():
+        assert re.search(HASHED_NAME_RE, hashed), hashed
+        # The originals stay for URLs built at runtime
+        assert read(site, original) == FILES[original]
+    with open(os.path.join(site, MANIFEST_PATH), encoding='utf-8') as f:
+        assert json.load(f) == manifest
+
+
+def test_hashes_are_stable_and_cover_dependencies(site, tmp_path):
+    manifest = fingerprint_assets(site)
+    again = str(tmp_path / 'again')
+    write_site(again)
+    assert fingerprint_assets(again) == manifest
+
+    # A changed module renames itself and every module that imports it, and nothing else
+    changed = str(tmp_path / 'changed')
+    write_site(changed)
+    with open(os.path.join(changed, 'assets', 'js', 'modules', 'shared.js'), 'w', encoding='utf-8') as f:
+        f.write('export const shared = 2;\n')
+    renamed = {name for name, hashed in fingerprint_assets(changed).items() if manifest[name] != hashed}
+    assert renamed == {'assets/js/main.js', 'assets/js/modules/lazy.js', 'assets/js/modules/shared.js'}
+
+
+def test_circular_imports_terminate(site):
+    for name, other in (('a', 'b'), ('b', 'a')):
+        with open(os.path.join(site, 'assets', 'js', 'modules', f'{name}.js'), 'w', encoding='utf-8') as f:
+            f.write(f"import '/assets/js/modules/{other}.js';\n")
+    with open(os.path.join(site, 'assets', 'js', 'main.js'), 'a', encoding='utf-8') as f:
+        f.write("import('/assets/js/modules/a.js');\n")
+
+    manifest = fingerprint_assets(site)
+    a, b = manifest['assets/js/modules/a.js'], manifest['assets/js/modules/b.js']
+    assert f"import('/{a}')" in read(site, manifest['assets/js/main.js'])
+    # a is reached first, so b, written while a is being processed, keeps a's original name
+    assert read(site, b) == "import '/assets/js/modules/a.js';\n"
+    assert read(site, a) == f"import '/{b}';\n"
+
@@ -0,0 +1,209 @@
+"""
+Runs HttpClient and HostLimiter against a stub HTTP server on 127.0.0.1.
+"""
+
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import http_client
+from http_client import HostLimiter, HttpClient
+
+LAST_MODIFIED = 'Wed, 01 Jan 2025 00:00:00 GMT'
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """
+    Serves a few endpoints and records the headers of every request in server.seen.
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b'', headers: dict = None) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.seen.append((self.path, dict(self.headers)))
+            server.hits[self.path] = server.hits.get(self.path, 0) + 1
+            hits = server.hits[self.path]
+
+        if self.path == '/etag':
+            if self.headers.get('If-None-Match') == '"v1"':
+                return self._send(304)
+            return self._send(200, b'etag body', {'ETag': '"v1"', 'Content-Type': 'text/plain'})
+        if self.path == '/modified':
+            if self.headers.get('If-Modified-Since') == LAST_MODIFIED:
+                return self._send(304)
+            return self._send(200, b'modified body', {'Last-Modified': LAST_MODIFIED})
+        if self.path == '/whoami':
+            # The body depends on the credentials, the ETag does not
+            return self._send(200, (self.headers.get('Authorization') or 'anonymous').encode(), {'ETag': '"same"'})
+        if self.path == '/flaky':
+            if hits <= server.failures:
+                return self._send(503, b'unavailable')
+            return self._send(200, b'recovered')
+        if self.path == '/slow':
+            with server.lock:
+                server.in_flight += 1
+                server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            time.sleep(server.delay)
+            with server.lock:
+                server.in_flight -= 1
+            return self._send(200, b'slow body')
+        return self._send(404)
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+    server.lock = threading.Lock()
+    server.seen = []
+    server.hits = {}
+    server.failures = 0
+    server.delay = 0.05
+    server.in_flight = server.max_in_flight = 0
+    server.url = f'http://127.0.0.1:{server.server_address[1]}'
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(tmp_path):
+    with HttpClient(cache_dir=str(tmp_path / 'http'), timeout=2) as client:
+        yield client
+
+
+def test_etag_is_revalidated_and_replayed(stub, client):
+    first = client.get(f'{stub.url}/etag')
+    second = client.get(f'{stub.url}/etag')
+    assert (first.status_code, first.content, first.from_cache) == (200, b'etag body', False)
+    assert (second.status_code, second.content, second.from_cache) == (200, b'etag body', True)
+    assert second.headers['Content-Type'] == 'text/plain'
+    assert stub.seen[1][1].get('If-None-Match') == '"v1"'
+    assert client.stats == {'requests': 2, 'not_modified': 1}
+
+
+def test_last_modified_is_revalidated_and_replayed(stub, client):
+    client.get(f'{stub.url}/modified')
+    replayed = client.get(f'{stub.url}/modified')
+    assert (replayed.content, replayed.from_cache) == (b'modified body', True)
+    assert stub.seen[1][1].get('If-Modified-Since') == LAST_MODIFIED
+
+
+def test_cache_is_not_shared_between_credentials(stub, client):
+    alice = client.get(f'{stub.url}/whoami', headers={'Authorization': 'token alice'})
+    bob = client.get(f'{stub.url}/whoami', headers={'Authorization': 'token bob'})
+    anonymous = client.get(f'{stub.url}/whoami')
+    assert (alice.content, bob.content, anonymous.content) == (b'token alice', b'token bob', b'anonymous')
+    assert not any(headers.get('If-None-Match') for _, headers in stub.seen)
+    # The key holds a digest of the credentials, the token itself is never written to disk
+    for name in os.listdir(client.cache_dir):
+        with open(os.path.join(client.cache_dir, name), 'rb') as f:
+            assert b'alice' not in f.read().split(b'\n', 1)[0]
+
+
+def test_uncached_requests_skip_the_cache(stub, client):
+    client.get(f'{stub.url}/etag', use_cache=False)
+    client.get(f'{stub.url}/etag', use_cache=False)
+    assert not any(headers.get('If-None-Match') for _, headers in stub.seen)
+    assert not os.path.exists(client.cache_dir)
+
+
+def test_timeout_raises_after_retries(stub, tmp_path):
+    stub.delay = 0.5
+    with HttpClient(cache_dir=str(tmp_path), timeout=0.1, retries=1) as client:
+        with pytest.raises(requests.exceptions.ConnectionError):
+            client.get(f'{stub.url}/slow')
+    # The first attempt and one retry
+    time.sleep(stub.delay)
+    assert stub.hits['/slow'] == 2
+
+
+def test_server_errors_are_retried(stub, client, monkeypatch):
+    monkeypatch.setattr(http_client, 'BACKOFF', 0)
+    stub.failures = 2
+    response = client.get(f'{stub.url}/flaky')
+    assert (response.status_code, response.content) == (200, b'recovered')
+    assert stub.hits['/flaky'] == 3
+
+
+def test_last_error_is_returned_when_retries_run_out(stub, tmp_path):
+    stub.failures = 5
+    with HttpClient(cache_dir=str(tmp_path), retries=1) as client:
+        response = client.get(f'{stub.url}/flaky')
+    assert response.status_code == 503
+    with pytest.raises(requests.exceptions.HTTPError):
+        response.raise_for_status()
+    assert stub.hits['/flaky'] == 2
+
+
+def test_host_limiter_caps_concurrent_requests(stub, client):
+    limiter = HostLimiter(per_host=2)
+
+    def fetch():
+        with limiter.slot(f'{stub.url}/slow'):
+            client.get(f'{stub.url}/slow', use_cache=False)
+
+    threads = [threading.Thread(target=fetch) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stub.hits['/slow'] == 6
+    assert stub.max_in_flight == 2
+
+
+def test_host_limiter_spaces_request_starts():
+    limiter = HostLimiter(per_host=4, delay=0.05)
+    starts = []
+
+    def start():
+        with limiter.slot('http://example.test/a'):
+            starts.append(time.monotonic())
+
+    threads = [threading.Thread(target=start) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    starts.sort()
+    assert all(later - earlier >= 0.045 for earlier, later in zip(starts, starts[1:]))
+
+
+def test_failed_cache_write_leaves_no_entry(stub, client, monkeypatch):
+    def crash(src, dst):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(http_client.os, 'replace', crash)
+    with pytest.raises(OSError):
+        client.get(f'{stub.url}/etag')
+    assert os.listdir(client.cache_dir) == []
+
+    monkeypatch.undo()
+    assert not client.get(f'{stub.url}/etag').from_cache
+    assert client.get(f'{stub.url}/etag').from_cache
+
+
+def test_corrupt_cache_entry_is_a_miss(stub, client):
+    client.get(f'{stub.url}/etag')
+    (entry,) = os.listdir(client.cache_dir)
+    with open(os.path.join(client.cache_dir, entry), 'wb') as f:
+        f.write(b'{"url": "truncat')
+    response = client.get(f'{stub.url}/etag')
+    assert (response.content, response.from_cache) == (b'etag body', False)
+    assert 'If-None-Match' not in stub.seen[-1][1]
@@ -0,0 +1,184 @@
+"""
+Checks minify_html against an independent parser: every page, as the deploy
+stages before it leave it, and the minified page must parse into the same
+document with html5lib, a parser implementing the HTML standard's tree
+construction. Nothing here reuses the minifier's tables of omittable end
+tags or inline elements.
+"""
+
+import json
+import os
+import re
+
+import html5lib
+import pytest
+
+from critical_css import inline_critical_css
+from export_site import export_site
+from fingerprint_assets import fingerprint_assets
+from minify_html import minify_html
+from prerender_sections import prerender_sections
+from responsive_images import rewrite_images
+from service_worker import build_service_worker
+from site_pages import find_pages
+
+# Whitespace next to these never renders: block-level boxes and elements that are not rendered at all
+BLOCK = {'address', 'article', 'aside', 'base', 'blockquote', 'body', 'caption', 'col', 'colgroup', 'dd', 'details',
+         'dialog', 'div', 'dl', 'dt', 'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4',
+         'h5', 'h6', 'head', 'header', 'hgroup', 'hr', 'html', 'li', 'link', 'main', 'meta', 'nav', 'noscript', 'ol',
+         'optgroup', 'option', 'p', 'pre', 'script', 'section', 'source', 'style', 'summary', 'table', 'tbody', 'td',
+         'template', 'tfoot', 'th', 'thead', 'title', 'tr', 'ul'}
+PREFORMATTED = {'pre', 'textarea', 'code'}
+SPACE_RE = re.compile(r'[ \t\n\r\f]+')
+
+FIXTURE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="utf-8">
+  <title>Fixture</title>
+  <!-- dropped comment -->
+  <style>
+    .note { margin : 0 ; color : red ; }
+    p > a::after { content: "</p>"; }
+  </style>
+  <script type="application/ld+json">
+    { "@context": "https://schema.org", "name": "Fixture" }
+  </script>
+</head>
+<body class="page">
+  <p>First   paragraph with <a href="/x">a link</a> and <strong>bold</strong> text.</p>
+  <p style="margin-top: 6px; color: var(--a)">Second paragraph</p>
+  <ul>
+    <li>One</li>
+    <li>Two <em>items</em></li>
+  </ul>
+  <dl><dt>Term</dt><dd>Definition</dd><dt>Other</dt><dd>More</dd></dl>
+  <table>
+    <tr><th>Head</th><th>Cell</th></tr>
+    <tr><td>1</td><td>2</td></tr>
+  </table>
+  <select name="s"><option value="a">A</option><option value="b" selected>B</option></select>
+  <pre><code>def f(x):
+    return  x   *  2
+</code></pre>
+  <textarea name="t">
+  keep   this
+    as written </textarea>
+  <p>Inline <code>  spaced  code  </code> text</p>
+  <script>
+    // comment
+    var closing = "<\\/script>";
+    function greet(name) { return 'hi ' + name; }
+  </script>
+</body>
+</html>
+"""
+
+
+@pytest.fixture(scope='session')
+def deployed_pages(tmp_path_factory) -> dict:
+    """
+    The site's pages as the deploy stages leave them just before minify_html.
+    """
+    root = str(tmp_path_factory.mktemp('site') / 'site')
+    export_site(root)
+    prerender_sections(root)
+    rewrite_images(root)
+    inline_critical_css(root)
+    fingerprint_assets(root)
+    build_service_worker(root)
+    pages = {}
+    for page_path in find_pages(root):
+        with open(page_path, 'r', encoding='utf-8') as f:
+            pages[os.path.relpath(page_path, root)] = f.read()
+    return pages
+
+
+def _normalize_css(css: str) -> str:
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s*([{};:,>])\s*', r'\1', SPACE_RE.sub(' ', css))
+    # 0.5 and .5 are the same number
+    css = re.sub(r'(?<![\w.#-])0+(?=\.\d)', '', css)
+    return css.replace(';}', '}').strip().rstrip(';')
+
+
+def _normalize_raw_text(tag: str, attrs: dict, text: str):
+    if attrs.get('type') == 'application/ld+json':
+        return json.loads(text)
+    if tag == 'style':
+        return _normalize_css(text)
+    # Minified scripts differ from the source only in whitespace and comments
+    text = re.sub(r'^\s*//[^\n]*$', '', text, flags=re.M)
+    return re.sub(r'\s+', '', text)
+
+
+def _tree(element, preformatted: bool = False) -> tuple:
+    """
+    Returns an html5lib element as (tag, attributes, children), with the
+    whitespace a browser would not render dropped.
+    """
+    tag = element.tag
+    attrs = dict(element.attrib)
+    if 'style' in attrs:
+        attrs['style'] = _normalize_css(attrs['style'])
+    if tag in ('script', 'style'):
+        return tag, attrs, [_normalize_raw_text(tag, attrs, element.text or '')]
+    preformatted = preformatted or tag in PREFORMATTED
+
+    # Text and elements in order, comments left out and the text around them joined
+    items = [element.text or '']
+    for child in element:
+        if isinstance(child.tag, str):
+            items.append(child)
+            items.append('')
+        items[-1] += child.tail or ''
+    if not preformatted:
+        for index in range(0, len(items), 2):
+            text = SPACE_RE.sub(' ', items[index])
+            previous = items[index - 1].tag if index else tag
+            following = items[index + 1].tag if index + 1 < len(items) else tag
+            if previous in BLOCK:
+                text = text.lstrip(' ')
+            if following in BLOCK:
+                text = text.rstrip(' ')
+            items[index] = text
+    children = [item if isinstance(item, str) else _tree(item, preformatted) for item in items]
+    return tag, attrs, [child for child in children if child != '']
+
+
+def parse(page_html: str) -> tuple:
+    return _tree(html5lib.parse(page_html, treebuilder='etree', namespaceHTMLElements=False))
+
+
+def test_fixture_parses_the_same():
+    assert parse(minify_html(FIXTURE)) == parse(FIXTURE)
+
+
+def test_site_pages_parse_the_same(deployed_pages):
+    assert deployed_pages
+    for name, page_html in deployed_pages.items():
+        assert parse(minify_html(page_html)) == parse(page_html), name
+
+
+def test_drops_optional_end_tags():
+    minified = minify_html(FIXTURE)
+    for end_tag in ('</li>', '</dt>', '</dd>', '</option>', '</td>', '</th>', '</tr>', '</head>', '</body>',
+                    '</html>'):
+        assert end_tag not in minified, end_tag
+    # </p> before <ul> is implied, and the paragraph still ends there
+    assert 'Second paragraph<ul>' in minified
+
+
+def test_keeps_preformatted_text():
+    minified = minify_html(FIXTURE)
+    assert '<pre><code>def f(x):\n    return  x   *  2\n</code></pre>' in minified
+    assert '\n  keep   this\n    as written </textarea>' in minified
+    assert '<code>  spaced  code  </code>' in minified
+
+
+def test_inline_script_and_style_stay_inside_their_element():
+    document = html5lib.parse(minify_html(FIXTURE), treebuilder='etree', namespaceHTMLElements=False)
+    scripts = [element.text for element in document.iter('script') if not element.get('type')]
+    styles = [element.text for element in document.iter('style')]
+    assert len(scripts) == 1 and '<\\/script>' in scripts[0] and '// comment' not in scripts[0]
+    assert len(styles) == 1 and '"</p>"' in styles[0]
@@ -0,0 +1,109 @@
+"""
+Checks that the search index updated in place, one document at a time,
+holds the same postings as one built from scratch.
+"""
+
+import json
+import os
+
+from search_index import SearchIndex, extract_terms, stem, tokenize
+
+DOCS = {
+    'caching': ('Caching HTTP responses', '2025-01-01', 'Revalidating cached responses with ETags saves bandwidth.'),
+    'images': ('Responsive images', '2025-02-01', 'Serving smaller images to smaller screens.'),
+    'search': ('Searching the blog', '2025-03-01', 'An inverted index of stemmed terms, sharded by prefix.'),
+    'workers': ('Process pools', '2025-04-01', 'Rendering posts across workers and caching the highlighting.'),
+    'search-v2': ('Searching the blog', '2025-03-02', 'Prefix matching while typing.'),
+}
+
+
+def terms_of(slug: str) -> dict:
+    title, _, body = DOCS[slug]
+    return extract_terms({'title': title, 'tags': [slug], 'description': ''}, f'<p>{body}</p>')
+
+
+def build(directory, slugs, reset=False) -> dict:
+    """
+    Adds the documents to the index in directory and saves it.
+
+    :return: Shards each document was written to
+    """
+    index = SearchIndex(str(directory), reset=reset)
+    shards = {slug: index.add(slug, DOCS[slug][0], DOCS[slug][1], terms_of(slug)) for slug in slugs}
+    index.save()
+    return shards
+
+
+def decode(directory) -> tuple:
+    """
+    Reads an index back as ({slug: [title, date]}, {shard: {term: {slug: weight}}}).
+
+    Doc ids differ between an updated and a fresh index, so postings are keyed by slug.
+    """
+    with open(os.path.join(directory, 'docs.json'), encoding='utf-8') as f:
+        data = json.load(f)
+    docs = {doc[0]: doc[1:] for doc in data['docs'] if doc}
+    files = {name[:-5] for name in os.listdir(directory) if name != 'docs.json'}
+    assert files == set(data['shards'])
+
+    shards = {}
+    for prefix in data['shards']:
+        with open(os.path.join(directory, f'{prefix}.json'), encoding='utf-8') as f:
+            encoded = json.load(f)
+        shard = {}
+        for term, flat in encoded.items():
+            assert term.startswith(prefix)
+            doc_id = 0
+            shard[term] = {}
+            for i in range(0, len(flat), 2):
+                doc_id += flat[i]
+                shard[term][data['docs'][doc_id][0]] = flat[i + 1]
+        shards[prefix] = shard
+    return docs, shards
+
+
+def test_stem_and_tokenize():
+    assert [stem(word) for word in ('caching', 'images', 'process', 'status', 'revalidating', 'api')] == \
+        ['cach', 'image', 'process', 'status', 'revalidat', 'api']
+    assert tokenize('The caching of HTTP responses, a b 42') == ['cach', 'http', 'response', '42']
+
+
+def test_removing_and_adding_matches_a_fresh_build(tmp_path):
+    build(tmp_path / 'updated', ['caching', 'images', 'search'])
+    index = SearchIndex(str(tmp_path / 'updated'))
+    index.remove('images', sorted({term[:2] for term in terms_of('images')}))
+    index.add('workers', *DOCS['workers'][:2], terms_of('workers'))
+    index.save()
+
+    build(tmp_path / 'fresh', ['caching', 'search', 'workers'])
+    assert decode(tmp_path / 'updated') == decode(tmp_path / 'fresh')
+    # The freed doc id was reused
+    with open(tmp_path / 'updated' / 'docs.json', encoding='utf-8') as f:
+        assert [doc[0] for doc in json.load(f)['docs']] == ['caching', 'workers', 'search']
+
+
+def test_updating_a_document_matches_a_fresh_build(tmp_path):
+    shards = build(tmp_path / 'updated', ['caching', 'search'])
+    index = SearchIndex(str(tmp_path / 'updated'))
+    index.remove('search', shards['search'])
+    index.add('search-v2', *DOCS['search-v2'][:2], terms_of('search-v2'))
+    index.save()
+
+    build(tmp_path / 'fresh', ['caching', 'search-v2'])
+    assert decode(tmp_path / 'updated') == decode(tmp_path / 'fresh')
+
+
+def test_emptied_shards_are_deleted(tmp_path):
+    shards = build(tmp_path, ['images'])
+    index = SearchIndex(str(tmp_path))
+    index.remove('images', shards['images'])
+    index.save()
+    assert os.listdir(tmp_path) == ['docs.json']
+    assert decode(tmp_path) == ({}, {})
+
+
+def test_reset_drops_the_old_index(tmp_path):
+    build(tmp_path, ['caching', 'images'])
+    build(tmp_path, ['search'], reset=True)
+    docs, _ = decode(tmp_path)
+    assert list(docs) == ['search']